@@ -45,6 +45,93 @@ CREATE TABLE product_categories (
     UNIQUE(product_id, category_id)
 );
 
--- Índices para performance
+-- Imagens enviadas dos produtos; as miniaturas são geradas em segundo plano
+-- (api/image_pipeline.py) e listadas em `variants`
+CREATE TABLE product_images (
+    id SERIAL PRIMARY KEY,
+    product_id INT NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    key VARCHAR(100) NOT NULL,
+    original_format VARCHAR(10) NOT NULL,
+    width INT NOT NULL,
+    height INT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    variants TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX ix_product_images_product_id ON product_images(product_id);
+
+-- Agregados do catálogo servidos por GET /stats, recalculados por
+-- api/catalog_stats.py (INSERT ... SELECT ... GROUP BY)
+CREATE TABLE catalog_stats (
+    dimension VARCHAR(20) NOT NULL,
+    key VARCHAR(50) NOT NULL,
+    products INT NOT NULL DEFAULT 0,
+    active INT NOT NULL DEFAULT 0,
+    qtt BIGINT NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (dimension, key)
+);
+
+-- Histórico de movimentações de estoque (somente inclusão), gravado com a
+-- alteração atômica de products.qtt (api/stock.py); sem chave estrangeira
+-- para manter o histórico de produtos excluídos
+CREATE TABLE stock_movements (
+    id SERIAL PRIMARY KEY,
+    product_id INT NOT NULL,
+    delta INT NOT NULL,
+    qtt_after INT NOT NULL,
+    movements INT NOT NULL DEFAULT 1,
+    reason VARCHAR(50),
+    reference VARCHAR(100),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_stock_movements_product_id ON stock_movements(product_id, id);
+
+-- Versão dos dados de referência (cache de marcas/categorias entre workers)
+CREATE TABLE reference_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0
+);
+INSERT INTO reference_versions (name, version) VALUES ('brands_categories', 0);
+
+-- Exclusões físicas registradas para a sincronização incremental (GET /sync)
+CREATE TABLE tombstones (
+    id SERIAL PRIMARY KEY,
+    entity VARCHAR(20) NOT NULL,
+    entity_id INT NOT NULL,
+    deleted_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX ix_tombstones_deleted_at ON tombstones(deleted_at);
+
+-- Migrações de esquema aplicadas (ver api/migrations.py); as migrações são
+-- idempotentes e, neste esquema, apenas registradas na primeira inicialização
+CREATE TABLE schema_migrations (
+    version INT PRIMARY KEY,
+    description VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Índices para performance (declarados também em api/models/product.py)
 CREATE INDEX idx_product_categories_product_id ON product_categories(product_id);
-CREATE INDEX idx_product_categories_category_id ON product_categories(category_id);
\ No newline at end of file
+CREATE INDEX idx_product_categories_category_product ON product_categories(category_id, product_id);
+
+-- Filtros da listagem de produtos (paginada por id)
+CREATE INDEX idx_products_brand_id ON products (brand_id, id) WHERE brand_id IS NOT NULL;
+CREATE INDEX idx_products_measure_type ON products (measure_type, id) WHERE measure_type IS NOT NULL;
+CREATE INDEX idx_products_status ON products (status, id);
+
+-- Sincronização incremental (migração 1 em api/migrations.py)
+CREATE INDEX idx_products_updated_at ON products (updated_at, id);
+CREATE INDEX idx_brands_updated_at ON brands (updated_at);
+CREATE INDEX idx_categories_updated_at ON categories (updated_at);
+
+-- Busca textual (tsvector) e por similaridade (pg_trgm)
+-- Mantidos também pela migração 2 (api/migrations.py)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX idx_products_search_document ON products
+    USING GIN ((to_tsvector('simple', coalesce(products.name, '') || ' ' || coalesce(products.description, ''))));
+CREATE INDEX idx_products_name_trgm ON products USING GIN (name gin_trgm_ops);
+CREATE INDEX idx_products_barcode_trgm ON products USING GIN (barcode gin_trgm_ops);
+CREATE INDEX idx_brands_name_trgm ON brands USING GIN (name gin_trgm_ops);
+CREATE INDEX idx_categories_name_trgm ON categories USING GIN (name gin_trgm_ops);
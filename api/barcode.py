@@ -0,0 +1,74 @@
+from typing import List, Optional
+
+# Comprimentos aceitos: EAN-8, UPC-A e EAN-13
+SUPPORTED_LENGTHS = {8: "EAN-8", 12: "UPC-A", 13: "EAN-13"}
+
+
+class InvalidBarcodeError(ValueError):
+    """Código de barras com formato ou dígito verificador inválido"""
+
+
+def _check_digit(payload: str) -> int:
+    """
+    Calcula o dígito verificador GS1 (módulo 10) para os dígitos informados.
+
+    Os pesos alternam entre 3 e 1 a partir do dígito mais à direita.
+    """
+    total = 0
+    for position, digit in enumerate(reversed(payload)):
+        total += int(digit) * (3 if position % 2 == 0 else 1)
+    return (10 - total % 10) % 10
+
+
+def normalize_barcode(code: str) -> str:
+    """
+    Valida e normaliza um código EAN-13, UPC-A ou EAN-8.
+
+    Espaços e hífens são removidos e o dígito verificador é conferido.
+    Códigos UPC-A são convertidos para a forma EAN-13 equivalente (prefixo 0),
+    de forma que o mesmo produto tenha sempre a mesma representação.
+
+    Args:
+        code (str): Código lido pelo scanner ou digitado
+
+    Returns:
+        str: Código normalizado (8 ou 13 dígitos)
+
+    Raises:
+        InvalidBarcodeError: Se o código não for um EAN/UPC válido
+    """
+    digits = "".join((code or "").split()).replace("-", "")
+    
+    if not digits.isdigit() or len(digits) not in SUPPORTED_LENGTHS:
+        raise InvalidBarcodeError(
+            "Barcode must be a valid EAN-13, UPC-A or EAN-8 code"
+        )
+    
+    if _check_digit(digits[:-1]) != int(digits[-1]):
+        raise InvalidBarcodeError(
+            f"Invalid check digit for {SUPPORTED_LENGTHS[len(digits)]} barcode"
+        )
+    
+    if len(digits) == 12:
+        digits = "0" + digits
+    
+    return digits
+
+
+def barcode_variants(normalized: str) -> List[str]:
+    """
+    Retorna as representações armazenáveis de um código normalizado.
+
+    Um EAN-13 iniciado em 0 também pode estar cadastrado como UPC-A (12 dígitos).
+    """
+    if len(normalized) == 13 and normalized.startswith("0"):
+        return [normalized, normalized[1:]]
+    return [normalized]
+
+
+def try_normalize_barcode(code: str) -> Optional[str]:
+    """Versão de normalize_barcode que retorna None para códigos inválidos"""
+    try:
+        return normalize_barcode(code)
+    except InvalidBarcodeError:
+        return None
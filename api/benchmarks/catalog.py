@@ -0,0 +1,148 @@
+"""
+Gerador de catálogo sintético para os benchmarks.
+
+Grava marcas, categorias, produtos (com códigos EAN-13 válidos) e ligações
+produto-categoria no banco de DATABASE_URL, com inserções em massa e
+resultado determinístico para a mesma semente. Use um banco dedicado:
+com --reset, todas as tabelas do catálogo são esvaziadas antes.
+
+Gere o catálogo com a API parada (os caches em memória da API são
+carregados na inicialização).
+
+Uso:
+    DATABASE_URL=sqlite:///bench.db python benchmarks/catalog.py \\
+        --products 100000 --brands 500 --categories 200 --links 2 --reset
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import delete, insert, select, text  # noqa: E402
+
+from barcode import _check_digit  # noqa: E402
+from database import create_db_and_tables, engine  # noqa: E402
+from models.brand import Brand  # noqa: E402
+from models.category import Category  # noqa: E402
+from models.product import MeasureEnum, Product, ProductCategory  # noqa: E402
+from models.tombstone import Tombstone  # noqa: E402
+
+# Vocabulário dos nomes gerados (as buscas dos cenários usam estas palavras)
+NOUNS = [
+    "Arroz", "Feijão", "Café", "Leite", "Açúcar", "Biscoito", "Sabão", "Detergente",
+    "Refrigerante", "Suco", "Macarrão", "Óleo", "Farinha", "Chocolate", "Iogurte",
+    "Queijo", "Manteiga", "Shampoo", "Sabonete", "Achocolatado",
+]
+ADJECTIVES = [
+    "Integral", "Tradicional", "Premium", "Light", "Zero", "Orgânico", "Extra",
+    "Especial", "Natural", "Clássico",
+]
+
+# Linhas por comando INSERT/commit
+BATCH_SIZE = 5000
+
+
+def ean13(number: int) -> str:
+    """EAN-13 válido na faixa de uso interno (prefixo 2) para o número informado"""
+    payload = f"2{number:011d}"
+    return payload + str(_check_digit(payload))
+
+
+def _reset() -> None:
+    with engine.begin() as connection:
+        for model in (ProductCategory, Product, Category, Brand, Tombstone):
+            connection.execute(delete(model))
+
+
+def _insert_batches(connection, model, rows) -> None:
+    for start in range(0, len(rows), BATCH_SIZE):
+        connection.execute(insert(model), rows[start:start + BATCH_SIZE])
+
+
+def generate(products: int, brands: int, categories: int, links: int, seed: int) -> dict:
+    """Gera o catálogo e retorna as quantidades gravadas"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    links = min(links, categories)
+
+    with engine.begin() as connection:
+        _insert_batches(connection, Brand, [
+            {"name": f"Marca {i:05d}", "created_at": now, "updated_at": now}
+            for i in range(1, brands + 1)
+        ])
+        _insert_batches(connection, Category, [
+            {"name": f"Categoria {i:04d}", "description": f"Categoria sintética {i}",
+             "created_at": now, "updated_at": now}
+            for i in range(1, categories + 1)
+        ])
+        brand_ids = list(connection.execute(select(Brand.id).order_by(Brand.id)).scalars())
+        category_ids = list(connection.execute(select(Category.id).order_by(Category.id)).scalars())
+
+    measures = list(MeasureEnum)
+    link_total = 0
+    for start in range(0, products, BATCH_SIZE):
+        numbers = range(start + 1, min(start + BATCH_SIZE, products) + 1)
+        rows = []
+        for number in numbers:
+            noun, adjective = rng.choice(NOUNS), rng.choice(ADJECTIVES)
+            rows.append({
+                "barcode": ean13(number),
+                "name": f"{noun} {adjective} {number}",
+                "description": f"{noun} {adjective.lower()} da {rng.choice(NOUNS).lower()} sintética",
+                "brand_id": rng.choice(brand_ids) if brand_ids else None,
+                "measure_type": rng.choice(measures),
+                "measure_value": Decimal(rng.choice(("0.5", "1", "2", "5", "200", "500"))),
+                "qtt": rng.randint(0, 500),
+                "status": rng.random() > 0.05,
+                "created_at": now,
+                "updated_at": now,
+            })
+
+        with engine.begin() as connection:
+            product_ids = connection.execute(
+                insert(Product).returning(Product.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            link_rows = [
+                {"product_id": product_id, "category_id": category_id, "created_at": now}
+                for product_id in product_ids
+                for category_id in rng.sample(category_ids, links)
+            ]
+            _insert_batches(connection, ProductCategory, link_rows)
+            link_total += len(link_rows)
+
+    # Estatísticas atualizadas para o planejador de consultas
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+
+    return {"brands": brands, "categories": categories, "products": products, "links": link_total}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--brands", type=int, default=200)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--links", type=int, default=2, help="Categorias por produto")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reset", action="store_true", help="Esvaziar as tabelas do catálogo antes")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    create_db_and_tables()
+    if args.reset:
+        _reset()
+
+    started = time.perf_counter()
+    counts = generate(args.products, args.brands, args.categories, args.links, args.seed)
+    print(f"Catálogo gerado em {time.perf_counter() - started:.1f}s: {counts}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Benchmark de throughput HTTP da API.
+
+Dispara requisições GET concorrentes (conexões keep-alive, uma por thread)
+contra uma API já em execução e informa requisições por segundo e latências.
+Para comparar duas versões, rode cada uma com o mesmo número de workers do
+uvicorn e salve os resultados com --save; depois use --compare.
+
+Uso:
+    uvicorn main:app --workers 1 --port 8000 --log-level warning
+    python benchmarks/http_throughput.py --url http://127.0.0.1:8000 \\
+        --path /api/v1/products/?limit=20 --concurrency 32 --duration 10 --save async.json
+    python benchmarks/http_throughput.py ... --compare sync.json
+"""
+import argparse
+import http.client
+import json
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def _worker(host: str, port: int, paths, deadline: float, latencies: list, errors: list) -> None:
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    index = 0
+    while time.perf_counter() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        start = time.perf_counter()
+        try:
+            connection.request("GET", path)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+    connection.close()
+
+
+def run(url: str, paths, concurrency: int, duration: float) -> dict:
+    """Executa o benchmark e retorna um resumo com rps e percentis (ms)"""
+    parts = urlsplit(url)
+    deadline = time.perf_counter() + duration
+    latencies, errors = [], []
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(parts.hostname, parts.port or 80, paths, deadline, latencies, errors)
+        )
+        for _ in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    
+    if not latencies:
+        raise RuntimeError(f"Nenhuma requisição concluída ({len(errors)} erros)")
+    
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {
+        "paths": list(paths),
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(quantiles[49] * 1000, 2),
+        "p95_ms": round(quantiles[94] * 1000, 2),
+        "p99_ms": round(quantiles[98] * 1000, 2),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de throughput HTTP da API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", action="append", dest="paths",
+                        help="Caminho a requisitar (pode ser repetido)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--save", help="Salvar o resultado em um arquivo JSON")
+    parser.add_argument("--compare", help="Comparar com um resultado salvo anteriormente")
+    args = parser.parse_args(argv)
+    
+    result = run(args.url, args.paths or ["/api/v1/products/?limit=20"], args.concurrency, args.duration)
+    print(json.dumps(result, indent=2))
+    
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent=2)
+    
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(
+            f"rps: {baseline['rps']} -> {result['rps']} "
+            f"({(result['rps'] / baseline['rps'] - 1) * 100:+.1f}%), "
+            f"p99: {baseline['p99_ms']}ms -> {result['p99_ms']}ms"
+        )
+    
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Benchmark de escalabilidade por número de workers.
+
+Para cada quantidade de workers, inicia a API com serve.py, aguarda o
+/health, aquece e executa a mesma mistura de benchmarks/scenarios.py,
+gerando a carga em processos separados (o cliente em um único processo
+esbarra no GIL antes do servidor). Informa requisições por segundo, ganho
+em relação à primeira rodada, eficiência por worker e p95.
+
+Os números só fazem sentido com núcleos livres para servidor e cliente:
+em uma máquina de N núcleos, meça até cerca de N/2 workers.
+
+Uso:
+    DATABASE_URL=sqlite:///bench.db python benchmarks/catalog.py --products 100000 --reset
+    DATABASE_URL=sqlite:///bench.db python benchmarks/scaling.py --workers 1 2 4 --mix read
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scenarios  # noqa: E402
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _wait_healthy(port: int, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            connection.request("GET", "/health")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.25)
+    raise RuntimeError(f"API não respondeu em {timeout:.0f}s")
+
+
+def start_server(workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, LOG_REQUESTS="false")
+    return subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port),
+         "--host", "127.0.0.1", "--log-level", "warning"],
+        cwd=API_DIR,
+        env=env,
+    )
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def _client(args: tuple) -> dict:
+    url, sample, weights, concurrency, duration, seed = args
+    # Cada processo amostra o próprio catálogo (o objeto não é serializável)
+    catalog = scenarios.load_catalog(url, sample)
+    return scenarios.run(url, catalog, weights, concurrency, duration, seed=seed)
+
+
+def measure(url: str, weights: Dict[str, int], clients: int, concurrency: int,
+            duration: float, sample: int) -> dict:
+    """Executa a mistura em `clients` processos e soma os resultados"""
+    per_client = max(concurrency // clients, 1)
+    jobs = [(url, sample, weights, per_client, duration, 1000 * index) for index in range(clients)]
+    with multiprocessing.get_context("spawn").Pool(clients) as pool:
+        results = pool.map(_client, jobs)
+    totals = [result["total"] for result in results]
+    return {
+        "requests": sum(total["requests"] for total in totals),
+        "errors": sum(total["errors"] for total in totals),
+        "rps": round(sum(total["rps"] for total in totals), 1),
+        # p95 do pior cliente (aproximação conservadora do p95 global)
+        "p95_ms": max(total["p95_ms"] for total in totals),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--mix", choices=sorted(scenarios.MIXES), default="read")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=2, help="Processos geradores de carga")
+    parser.add_argument("--concurrency", type=int, default=32, help="Conexões simultâneas no total")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=3.0)
+    parser.add_argument("--sample", type=int, default=1000)
+    parser.add_argument("--save", help="Salvar os resultados em um arquivo JSON")
+    args = parser.parse_args(argv)
+
+    url = f"http://127.0.0.1:{args.port}"
+    weights = scenarios.MIXES[args.mix]
+    rows: List[dict] = []
+    for workers in args.workers:
+        process = start_server(workers, args.port)
+        try:
+            _wait_healthy(args.port, 60)
+            if args.warmup:
+                measure(url, weights, args.clients, args.concurrency, args.warmup, args.sample)
+            result = measure(url, weights, args.clients, args.concurrency, args.duration, args.sample)
+        finally:
+            stop_server(process)
+        result["workers"] = workers
+        rows.append(result)
+        print(f"{workers} worker(s): {result['rps']} rps, p95 {result['p95_ms']} ms", flush=True)
+
+    base = rows[0]["rps"] / rows[0]["workers"]
+    print()
+    print(f"{'workers':>7} {'rps':>9} {'ganho':>7} {'eficiência':>10} {'p95 ms':>8} {'erros':>6}")
+    for row in rows:
+        speedup = row["rps"] / rows[0]["rps"] if rows[0]["rps"] else 0
+        efficiency = row["rps"] / (base * row["workers"]) if base else 0
+        print(
+            f"{row['workers']:>7} {row['rps']:>9} {speedup:>6.2f}x {efficiency:>9.0%} "
+            f"{row['p95_ms']:>8} {row['errors']:>6}"
+        )
+
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump({"mix": args.mix, "cpus": os.cpu_count(), "results": rows}, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
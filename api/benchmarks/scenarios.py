@@ -0,0 +1,367 @@
+"""
+Benchmark de cenários dos caminhos críticos da API.
+
+Dispara uma mistura ponderada de operações (leitura por código de barras,
+página da listagem, busca, criação e atualização) contra uma API já em
+execução, com conexões keep-alive (uma por thread), e informa por operação
+e no total: requisições por segundo, latências p50/p95/p99 e queries ao
+banco por requisição (lidas do /metrics antes e depois da rodada).
+
+Os produtos usados vêm de uma amostra da própria API, então rode antes o
+gerador de catálogo (benchmarks/catalog.py) no mesmo banco. Com mais de um
+worker do uvicorn, o /metrics reflete apenas o processo que respondeu e as
+queries por requisição ficam aproximadas.
+
+Uso:
+    DATABASE_URL=sqlite:///bench.db python benchmarks/catalog.py --products 100000 --reset
+    DATABASE_URL=sqlite:///bench.db LOG_REQUESTS=false uvicorn main:app --port 8000 --log-level warning
+    python benchmarks/scenarios.py --mix mixed --concurrency 16 --duration 30 --save base.json
+    python benchmarks/scenarios.py --mix mixed --concurrency 16 --duration 30 \\
+        --compare base.json --max-regression 10
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from barcode import _check_digit  # noqa: E402
+
+API_PREFIX = "/api/v1/products"
+
+# Pesos das operações em cada mistura
+MIXES = {
+    "scan": {"scan": 1},
+    "read": {"scan": 70, "list": 15, "search": 15},
+    "mixed": {"scan": 60, "list": 10, "search": 10, "create": 10, "update": 10},
+    "write": {"create": 50, "update": 50},
+}
+
+# Rota (como rotulada no /metrics) atendida por cada operação
+OPERATION_ROUTES = {
+    "scan": ("GET", API_PREFIX + "/barcode/{code}"),
+    "list": ("GET", API_PREFIX + "/"),
+    "search": ("GET", API_PREFIX + "/search/"),
+    "create": ("POST", API_PREFIX + "/"),
+    "update": ("PUT", API_PREFIX + "/{product_id}"),
+}
+
+# Faixas de EAN-13 internos (prefixo 2): o catálogo gerado usa números
+# baixos; criações e códigos inexistentes ficam em faixas separadas
+_CREATE_BASE = 50_000_000_000
+_MISSING_BASE = 90_000_000_000
+
+_METRIC_LINE = re.compile(
+    r'^http_request_db_queries_(sum|count)\{method="([^"]*)",route="([^"]*)"\} (\S+)$'
+)
+
+
+def ean13(number: int) -> str:
+    payload = f"2{number:011d}"
+    return payload + str(_check_digit(payload))
+
+
+class Catalog:
+    """Amostra de produtos da API usada para montar as requisições"""
+
+    def __init__(self, products: List[dict]):
+        if not products:
+            raise RuntimeError("Nenhum produto na API; gere o catálogo com benchmarks/catalog.py")
+        self.ids = [product["id"] for product in products]
+        self.barcodes = [product["barcode"] for product in products]
+        self.brand_ids = sorted({product["brand_id"] for product in products if product["brand_id"]})
+        self.category_ids = sorted({
+            category["id"] for product in products for category in product.get("categories") or []
+        })
+        self.words = sorted({
+            word for product in products for word in product["name"].split() if word.isalpha()
+        })
+        # Códigos das criações: base por rodada, para não colidir com rodadas anteriores
+        self._created = itertools.count(_CREATE_BASE + (int(time.time()) % 4_000_000) * 10_000)
+        self._lock = threading.Lock()
+
+    def new_barcode(self) -> str:
+        with self._lock:
+            return ean13(next(self._created))
+
+
+def _request(connection: http.client.HTTPConnection, method: str, path: str, body: Optional[dict] = None):
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+    response = connection.getresponse()
+    return response.status, response.read()
+
+
+def _build_request(operation: str, catalog: Catalog, rng: random.Random, miss_ratio: float, page_size: int):
+    """Método, caminho, corpo e status esperados de uma operação"""
+    if operation == "scan":
+        if rng.random() < miss_ratio:
+            return "GET", f"{API_PREFIX}/barcode/{ean13(_MISSING_BASE + rng.randrange(10**9))}", None, (404,)
+        return "GET", f"{API_PREFIX}/barcode/{rng.choice(catalog.barcodes)}", None, (200,)
+    if operation == "list":
+        return "GET", f"{API_PREFIX}/?limit={page_size}&skip={rng.randrange(0, 20) * page_size}", None, (200,)
+    if operation == "search":
+        return "GET", f"{API_PREFIX}/search/?name={quote(rng.choice(catalog.words))}&limit={page_size}", None, (200,)
+    if operation == "create":
+        body = {
+            "barcode": catalog.new_barcode(),
+            "name": f"Produto benchmark {rng.choice(catalog.words)}",
+            "brand_id": rng.choice(catalog.brand_ids) if catalog.brand_ids else None,
+            "category_ids": rng.sample(catalog.category_ids, min(2, len(catalog.category_ids))),
+            "qtt": rng.randint(0, 500),
+        }
+        return "POST", f"{API_PREFIX}/", body, (201,)
+    if operation == "update":
+        return "PUT", f"{API_PREFIX}/{rng.choice(catalog.ids)}", {"qtt": rng.randint(0, 500)}, (200,)
+    raise ValueError(f"Operação desconhecida: {operation}")
+
+
+def _worker(host, port, catalog, weights, seed, deadline, miss_ratio, page_size, results, errors) -> None:
+    rng = random.Random(seed)
+    operations, cumulative = list(weights), list(itertools.accumulate(weights.values()))
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    failures: Dict[str, int] = defaultdict(int)
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    while time.perf_counter() < deadline:
+        operation = rng.choices(operations, cum_weights=cumulative)[0]
+        method, path, body, expected = _build_request(operation, catalog, rng, miss_ratio, page_size)
+        start = time.perf_counter()
+        try:
+            status_code, _ = _request(connection, method, path, body)
+        except (OSError, http.client.HTTPException):
+            failures[operation] += 1
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        latencies[operation].append(time.perf_counter() - start)
+        if status_code not in expected:
+            failures[operation] += 1
+    connection.close()
+    results.append(latencies)
+    errors.append(failures)
+
+
+def _query_totals(host: str, port: int) -> Dict[Tuple[str, str], List[float]]:
+    """Soma e contagem de queries por requisição, por (método, rota), do /metrics"""
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        status_code, body = _request(connection, "GET", "/metrics")
+    finally:
+        connection.close()
+    totals: Dict[Tuple[str, str], List[float]] = defaultdict(lambda: [0.0, 0.0])
+    if status_code != 200:
+        return totals
+    for line in body.decode().splitlines():
+        match = _METRIC_LINE.match(line)
+        if match:
+            kind, method, route, value = match.groups()
+            totals[(method, route)][0 if kind == "sum" else 1] = float(value)
+    return totals
+
+
+def _summary(latencies: List[float], errors: int, elapsed: float) -> dict:
+    if len(latencies) >= 2:
+        quantiles = statistics.quantiles(latencies, n=100)
+        p50, p95, p99 = quantiles[49], quantiles[94], quantiles[98]
+    else:
+        p50 = p95 = p99 = latencies[0] if latencies else 0.0
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(p50 * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+        "p99_ms": round(p99 * 1000, 2),
+    }
+
+
+def load_catalog(url: str, sample: int) -> Catalog:
+    """Amostra produtos pela própria API (primeira página da listagem)"""
+    parts = urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    try:
+        status_code, body = _request(connection, "GET", f"{API_PREFIX}/?limit={sample}")
+    finally:
+        connection.close()
+    if status_code != 200:
+        raise RuntimeError(f"Falha ao amostrar produtos: HTTP {status_code}")
+    return Catalog(json.loads(body))
+
+
+def run(
+    url: str,
+    catalog: Catalog,
+    weights: Dict[str, int],
+    concurrency: int,
+    duration: float,
+    seed: int = 42,
+    miss_ratio: float = 0.0,
+    page_size: int = 50
+) -> dict:
+    """Executa a mistura e retorna o resumo por operação e total"""
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    weights = {operation: weight for operation, weight in weights.items() if weight > 0}
+
+    before = _query_totals(host, port)
+    deadline = time.perf_counter() + duration
+    results, errors = [], []
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(host, port, catalog, weights, seed + index, deadline, miss_ratio, page_size, results, errors)
+        )
+        for index in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    after = _query_totals(host, port)
+
+    operations = {}
+    all_latencies, all_errors, all_queries, all_counted = [], 0, 0.0, 0.0
+    for operation in weights:
+        latencies = [value for worker in results for value in worker.get(operation, [])]
+        failures = sum(worker.get(operation, 0) for worker in errors)
+        summary = _summary(latencies, failures, elapsed)
+        route = OPERATION_ROUTES[operation]
+        queries = after[route][0] - before[route][0]
+        counted = after[route][1] - before[route][1]
+        summary["queries_per_request"] = round(queries / counted, 2) if counted else None
+        operations[operation] = summary
+        all_latencies += latencies
+        all_errors += failures
+        all_queries += queries
+        all_counted += counted
+
+    if not all_latencies:
+        raise RuntimeError(f"Nenhuma requisição concluída ({all_errors} erros)")
+
+    total = _summary(all_latencies, all_errors, elapsed)
+    total["queries_per_request"] = round(all_queries / all_counted, 2) if all_counted else None
+    return {
+        "weights": weights,
+        "concurrency": concurrency,
+        "duration": round(elapsed, 1),
+        "miss_ratio": miss_ratio,
+        "page_size": page_size,
+        "operations": operations,
+        "total": total,
+    }
+
+
+def _print_result(result: dict) -> None:
+    print(f"{'operação':<9} {'reqs':>8} {'erros':>6} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'q/req':>6}")
+    rows = list(result["operations"].items()) + [("total", result["total"])]
+    for name, summary in rows:
+        queries = summary["queries_per_request"]
+        print(
+            f"{name:<9} {summary['requests']:>8} {summary['errors']:>6} {summary['rps']:>9} "
+            f"{summary['p50_ms']:>8} {summary['p95_ms']:>8} {summary['p99_ms']:>8} "
+            f"{'-' if queries is None else queries:>6}"
+        )
+
+
+def compare(baseline: dict, result: dict, max_regression: Optional[float]) -> bool:
+    """
+    Imprime a variação em relação à referência.
+
+    Retorna False se alguma operação perder mais que `max_regression`
+    por cento de rps, ou piorar nessa proporção o p95 ou as queries por
+    requisição.
+    """
+    ok = True
+    rows = [(name, baseline["operations"].get(name), summary) for name, summary in result["operations"].items()]
+    rows.append(("total", baseline["total"], result["total"]))
+    for name, before, after in rows:
+        if before is None or not before["requests"]:
+            continue
+        rps_change = (after["rps"] / before["rps"] - 1) * 100 if before["rps"] else 0.0
+        p95_change = (after["p95_ms"] / before["p95_ms"] - 1) * 100 if before["p95_ms"] else 0.0
+        line = (
+            f"{name:<9} rps {before['rps']} -> {after['rps']} ({rps_change:+.1f}%), "
+            f"p95 {before['p95_ms']}ms -> {after['p95_ms']}ms ({p95_change:+.1f}%), "
+            f"q/req {before['queries_per_request']} -> {after['queries_per_request']}"
+        )
+        regressed = []
+        if max_regression is not None:
+            if rps_change < -max_regression:
+                regressed.append("rps")
+            if p95_change > max_regression:
+                regressed.append("p95")
+            if (before["queries_per_request"] and after["queries_per_request"] is not None
+                    and after["queries_per_request"] > before["queries_per_request"] * (1 + max_regression / 100)):
+                regressed.append("queries")
+        if regressed:
+            ok = False
+            line += f"  REGRESSÃO ({', '.join(regressed)})"
+        print(line)
+    return ok
+
+
+def _parse_weights(value: str) -> Dict[str, int]:
+    """Pesos no formato "scan=80,list=10,update=10" """
+    weights = {}
+    for item in value.split(","):
+        operation, _, weight = item.partition("=")
+        operation = operation.strip()
+        if operation not in OPERATION_ROUTES:
+            raise argparse.ArgumentTypeError(f"Operação desconhecida: {operation}")
+        weights[operation] = int(weight or 1)
+    return weights
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--weights", type=_parse_weights, help='Pesos próprios, ex.: "scan=80,update=20"')
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sample", type=int, default=1000, help="Produtos amostrados da API")
+    parser.add_argument("--page-size", type=int, default=50, help="Limite das listagens e buscas")
+    parser.add_argument("--miss-ratio", type=float, default=0.0,
+                        help="Fração das leituras por código com códigos inexistentes")
+    parser.add_argument("--save", help="Salvar o resultado em um arquivo JSON")
+    parser.add_argument("--compare", help="Comparar com um resultado salvo anteriormente")
+    parser.add_argument("--max-regression", type=float,
+                        help="Perda máxima (%%) de rps/p95 aceita no --compare; acima dela, sai com código 1")
+    args = parser.parse_args(argv)
+
+    catalog = load_catalog(args.url, args.sample)
+    result = run(
+        args.url, catalog, args.weights or MIXES[args.mix], args.concurrency, args.duration,
+        seed=args.seed, miss_ratio=args.miss_ratio, page_size=args.page_size
+    )
+    _print_result(result)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(baseline, result, args.max_regression):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Benchmark do custo de serialização por item das respostas de produtos.
+
+Monta páginas sintéticas de produtos (com marca e duas categorias, como em
+list_products) em memória, sem banco, e compara:
+
+- antes: `product.model_dump()` -> `ProductRead(**dados)` -> validação do
+  `response_model` pelo FastAPI -> `dump_json` (o caminho anterior das rotas);
+- depois: `serialization.product_payloads` (dicionários lidos direto das
+  instâncias, sem validação) -> `serialization.dumps` (orjson), o caminho
+  atual das rotas via `serialization.json_response`.
+
+Os dois caminhos precisam gerar exatamente o mesmo JSON.
+
+Uso:
+    python benchmarks/serialization.py --page-size 100 --rounds 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter  # noqa: E402
+
+from models.brand import Brand  # noqa: E402
+from models.category import Category  # noqa: E402
+from models.product import MeasureEnum, Product, ProductRead  # noqa: E402
+from serialization import dumps, product_payloads  # noqa: E402
+
+ProductRead.model_rebuild()
+
+
+def _catalog(page_size: int):
+    now = datetime.now(timezone.utc)
+    brands = {i: Brand(id=i, name=f"Marca {i}", created_at=now, updated_at=now) for i in range(1, 11)}
+    categories = [
+        Category(id=i, name=f"Categoria {i}", description="Descrição", created_at=now, updated_at=now)
+        for i in range(1, 21)
+    ]
+    products = [
+        Product(
+            id=i,
+            barcode=f"{7890000000000 + i}",
+            name=f"Produto {i}",
+            description="Produto sintético para o benchmark",
+            brand_id=i % 10 + 1,
+            measure_type=MeasureEnum.GRAM,
+            measure_value=Decimal("500.0000"),
+            qtt=i,
+            status=True,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(1, page_size + 1)
+    ]
+    categories_by_product = {
+        product.id: [categories[product.id % 20], categories[(product.id + 7) % 20]]
+        for product in products
+    }
+    return products, brands, categories_by_product
+
+
+def _before(products, brands, categories_by_product, adapter: TypeAdapter) -> bytes:
+    responses = []
+    for product in products:
+        product_dict = product.model_dump()
+        product_dict["brand"] = brands.get(product.brand_id)
+        product_dict["categories"] = categories_by_product[product.id]
+        responses.append(ProductRead(**product_dict))
+    # Equivalente ao que o FastAPI faz com o response_model: validar e serializar
+    return adapter.dump_json(adapter.validate_python(responses))
+
+
+def _after(products, brands, categories_by_product, adapter: TypeAdapter) -> bytes:
+    return dumps(product_payloads(products, brands, categories_by_product))
+
+
+def _measure(fn, rounds: int, page_size: int, *args) -> List[float]:
+    fn(*args)  # aquecimento
+    per_item = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn(*args)
+        per_item.append((time.perf_counter() - start) / page_size * 1_000_000)
+    return per_item
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100, help="Produtos por página")
+    parser.add_argument("--rounds", type=int, default=200, help="Páginas serializadas por caminho")
+    args = parser.parse_args()
+
+    adapter = TypeAdapter(List[ProductRead])
+    data = _catalog(args.page_size)
+    assert _before(*data, adapter) == _after(*data, adapter), "Os dois caminhos devem gerar o mesmo JSON"
+
+    results = {
+        "antes": _measure(_before, args.rounds, args.page_size, *data, adapter),
+        "depois": _measure(_after, args.rounds, args.page_size, *data, adapter),
+    }
+    print(f"Página de {args.page_size} produtos, {args.rounds} rodadas (µs por item)")
+    for name, values in results.items():
+        print(f"  {name:<7} mediana {statistics.median(values):7.2f}   mínimo {min(values):7.2f}")
+    speedup = statistics.median(results["antes"]) / statistics.median(results["depois"])
+    print(f"  ganho   {speedup:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
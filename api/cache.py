@@ -0,0 +1,183 @@
+from collections import OrderedDict
+from dotenv import load_dotenv
+import os
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Sentinela para diferenciar "não está no cache" de um valor em cache
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Cache LRU em memória com tempo de expiração por entrada.
+
+    Thread-safe, pois as rotas síncronas do FastAPI rodam no threadpool.
+    Valores None são aceitos e servem como cache negativo.
+
+    `generation` muda a cada invalidação: quem lê o banco para preencher o
+    cache captura o valor antes da consulta e o passa para `set`, que
+    descarta o valor se uma escrita invalidou o cache nesse meio tempo.
+    """
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Hashable) -> Any:
+        """Retorna o valor em cache ou MISSING se ausente/expirado"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, generation: Optional[int] = None) -> None:
+        """Armazena um valor, removendo a entrada menos usada se necessário
+
+        Com `generation`, o valor só é gravado se não houve invalidação
+        desde que ela foi lida.
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def invalidate(self, *keys: Hashable) -> None:
+        """Remove as chaves informadas do cache"""
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._data.pop(key, None)
+    
+    def clear(self) -> None:
+        """Remove todas as entradas do cache"""
+        with self._lock:
+            self.generation += 1
+            self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class VersionedCache:
+    """
+    Cache LRU de respostas serializadas, limitado pelo total de bytes.
+
+    Cada tabela tem um número de versão, incrementado (`bump`) pelas rotas
+    que a alteram. As chaves incluem as versões das tabelas que a resposta
+    lê, então uma escrita torna as entradas anteriores inacessíveis sem
+    percorrer o cache; elas saem pelo LRU. As versões são do processo: com
+    vários workers, escritas feitas em outro worker só aparecem depois do
+    `ttl` ou da próxima verificação do cache_sync (PRODUCT_CACHE_SYNC).
+    """
+    def __init__(self, tables: Tuple[str, ...], max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._versions: Dict[str, int] = dict.fromkeys(tables, 0)
+        # chave -> (expira em, valor, tamanho)
+        self._data: "OrderedDict[Hashable, tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def versions(self, *tables: str) -> Tuple[int, ...]:
+        """Versões atuais das tabelas, para compor a chave"""
+        return tuple(self._versions[table] for table in tables)
+    
+    def bump(self, *tables: str) -> None:
+        """Invalida as entradas que leem as tabelas informadas"""
+        with self._lock:
+            for table in tables:
+                self._versions[table] += 1
+    
+    def get(self, key: Hashable) -> Any:
+        """Retorna o valor em cache ou MISSING se ausente/expirado"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._discard(key)
+                self.misses += 1
+                return MISSING
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+    
+    def set(self, key: Hashable, value: Any, size: int) -> None:
+        """Armazena um valor de `size` bytes, removendo as entradas menos
+        usadas até caber no limite"""
+        # Uma resposta muito grande expulsaria boa parte do cache
+        if size > self.max_bytes // 4:
+            return
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._discard(key)
+            self._data[key] = (expires_at, value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+    
+    def _discard(self, key: Hashable) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+    
+    def clear(self) -> None:
+        """Remove todas as entradas do cache"""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+    
+    def snapshot(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Cache de leituras por código de barras (payload ProductRead serializado)
+barcode_cache = TTLCache(
+    maxsize=int(os.getenv("BARCODE_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("BARCODE_CACHE_TTL", "300")),
+)
+
+# Tempo de vida das entradas negativas (códigos não cadastrados)
+BARCODE_NEGATIVE_TTL = float(os.getenv("BARCODE_CACHE_NEGATIVE_TTL", "30"))
+
+# Páginas da listagem de produtos (corpo serializado, cursor e ETag)
+list_cache = VersionedCache(
+    tables=("products", "brands", "categories"),
+    max_bytes=int(os.getenv("LIST_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl=float(os.getenv("LIST_CACHE_TTL", "5")),
+)
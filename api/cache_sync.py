@@ -0,0 +1,133 @@
+"""
+Sincronização dos caches de produtos entre workers.
+
+Os caches de leitura de produtos (códigos de barras, páginas da listagem e
+índices de busca em memória) são do processo: uma escrita os invalida só
+no worker que a atendeu. Com PRODUCT_CACHE_SYNC ativo (o serve.py ativa
+com mais de um worker), as edições do catálogo (criação, alteração e
+exclusão de produtos, importação) incrementam, na mesma transação, o
+contador "products" da tabela reference_versions; as leituras comparam
+esse contador e o de marcas e categorias com os últimos vistos, no máximo
+a cada PRODUCT_CACHE_POLL_INTERVAL segundos, e, se algum mudou, o worker
+descarta os próprios caches de produtos.
+
+Movimentações de estoque e imagens processadas não incrementam o
+contador: são frequentes, e uma linha única serializaria as transações e
+esvaziaria os caches de todos os workers a cada venda. Elas invalidam só
+as chaves afetadas no worker que as grava; nos demais, aparecem quando as
+entradas expiram (BARCODE_CACHE_TTL, LIST_CACHE_TTL).
+"""
+from dotenv import load_dotenv
+import logging
+import os
+import time
+from typing import Optional, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from cache import barcode_cache, list_cache
+from models.reference_version import ReferenceVersion
+from reference_cache import REFERENCE_VERSION_NAME
+from search import invalidate_search_indexes
+from single_flight import invalidate_flights
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Nome da linha incrementada pelas escritas em produtos
+PRODUCT_VERSION_NAME = "products"
+
+PRODUCT_CACHE_SYNC = os.getenv("PRODUCT_CACHE_SYNC", "false").lower() in ("1", "true", "yes")
+PRODUCT_CACHE_POLL_INTERVAL = float(os.getenv("PRODUCT_CACHE_POLL_INTERVAL", "1.0"))
+
+# Produtos em cache embutem marca e categorias: os dois contadores valem
+_WATCHED_VERSIONS = (PRODUCT_VERSION_NAME, REFERENCE_VERSION_NAME)
+
+
+def _bump_statement():
+    return (
+        update(ReferenceVersion)
+        .where(ReferenceVersion.name == PRODUCT_VERSION_NAME)
+        .values(version=ReferenceVersion.version + 1)
+    )
+
+
+def clear_product_caches() -> None:
+    """Descarta todos os caches de leitura de produtos do processo"""
+    barcode_cache.clear()
+    invalidate_search_indexes()
+    invalidate_flights()
+    list_cache.bump("products", "brands", "categories")
+
+
+class ProductCacheSync:
+    """Compara os contadores de versão do banco com os últimos vistos pelo processo"""
+    def __init__(self, enabled: bool = PRODUCT_CACHE_SYNC, poll_interval: float = PRODUCT_CACHE_POLL_INTERVAL):
+        self.enabled = enabled
+        self.poll_interval = poll_interval
+        self._versions: Optional[Tuple] = None
+        self._checked_at = 0.0
+        self.clears = 0
+
+    async def _read_versions(self, session: AsyncSession) -> Tuple:
+        rows = (await session.exec(
+            select(ReferenceVersion.name, ReferenceVersion.version)
+            .where(ReferenceVersion.name.in_(_WATCHED_VERSIONS))
+        )).all()
+        return tuple(sorted(tuple(row) for row in rows))
+
+    async def warm(self, session: AsyncSession) -> None:
+        """Cria a linha do contador e registra as versões atuais"""
+        if not self.enabled:
+            return
+        exists = (await session.exec(
+            select(ReferenceVersion.name).where(ReferenceVersion.name == PRODUCT_VERSION_NAME)
+        )).first()
+        if exists is None:
+            session.add(ReferenceVersion(name=PRODUCT_VERSION_NAME))
+            try:
+                await session.commit()
+            except IntegrityError:
+                # Outro worker criou a linha ao mesmo tempo
+                await session.rollback()
+        self._versions = await self._read_versions(session)
+        self._checked_at = time.monotonic()
+
+    async def ensure_fresh(self, session: AsyncSession) -> None:
+        """Descarta os caches locais se outro processo alterou os dados"""
+        if not self.enabled or time.monotonic() - self._checked_at < self.poll_interval:
+            return
+        self._checked_at = time.monotonic()
+        versions = await self._read_versions(session)
+        if versions == self._versions:
+            return
+        if self._versions is not None:
+            clear_product_caches()
+            self.clears += 1
+        self._versions = versions
+
+    async def mark_changed(self, session: AsyncSession) -> None:
+        """Registra uma edição do catálogo; deve ser chamado antes do commit"""
+        if self.enabled:
+            await session.exec(_bump_statement())
+
+    def mark_changed_sync(self, session: Session) -> None:
+        """Versão síncrona de `mark_changed` (importação em lote)"""
+        if self.enabled:
+            session.exec(_bump_statement())
+
+    def snapshot(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "poll_interval": self.poll_interval,
+            "clears": self.clears,
+        }
+
+
+# Compartilhado pelas rotas e pelas escritas em produtos
+product_cache_sync = ProductCacheSync()
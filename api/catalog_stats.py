@@ -0,0 +1,183 @@
+"""
+Estatísticas agregadas do catálogo (GET /stats).
+
+Os agregados ficam na tabela `catalog_stats`, recalculada inteira por
+INSERT ... SELECT ... GROUP BY no próprio banco. A leitura devolve as linhas
+prontas; só quando elas são mais antigas que STATS_MAX_AGE_SECONDS o
+recálculo é feito (uma vez por processo, as demais requisições aguardam).
+Assim, o custo de varrer o catálogo é pago no máximo uma vez por janela,
+independente de quantos painéis consultam.
+"""
+from dotenv import load_dotenv
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import String, case, cast, delete, func, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from database import async_session_maker
+from models.catalog_stat import CatalogStat
+from models.product import MeasureEnum, Product, ProductCategory
+from reference_cache import reference_cache
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Idade máxima dos agregados servidos (segundos)
+STATS_MAX_AGE_SECONDS = float(os.getenv("STATS_MAX_AGE_SECONDS", "60"))
+
+
+def _aggregate(dimension: str, key, refreshed_at: datetime):
+    """SELECT agrupado no formato das colunas de catalog_stats"""
+    return select(
+        literal(dimension, String),
+        key,
+        func.count(),
+        func.coalesce(func.sum(case((Product.status == True, 1), else_=0)), 0),  # noqa: E712
+        func.coalesce(func.sum(Product.qtt), 0),
+        literal(refreshed_at, CatalogStat.__table__.c.refreshed_at.type),
+    )
+
+
+def refresh_statements(refreshed_at: datetime) -> List[Any]:
+    """Comandos que recalculam catalog_stats (executados em uma transação)"""
+    columns = ["dimension", "key", "products", "active", "qtt", "refreshed_at"]
+    status_key = case((Product.status == True, "true"), else_="false")  # noqa: E712
+    queries = [
+        _aggregate("total", literal("", String), refreshed_at).select_from(Product),
+        _aggregate("status", status_key, refreshed_at).group_by(Product.status),
+        _aggregate("brand", func.coalesce(cast(Product.brand_id, String), ""), refreshed_at)
+        .group_by(Product.brand_id),
+        _aggregate("category", cast(ProductCategory.category_id, String), refreshed_at)
+        .select_from(ProductCategory)
+        .join(Product, Product.id == ProductCategory.product_id)
+        .group_by(ProductCategory.category_id),
+        _aggregate("measure_type", func.coalesce(cast(Product.measure_type, String), ""), refreshed_at)
+        .group_by(Product.measure_type),
+    ]
+    return [delete(CatalogStat)] + [
+        insert(CatalogStat).from_select(columns, query) for query in queries
+    ]
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def _bucket(row: CatalogStat) -> Dict[str, int]:
+    return {"products": row.products, "active": row.active, "qtt": row.qtt}
+
+
+def _measure_type(key: str) -> Optional[str]:
+    # O banco guarda o nome do membro (ex.: "KILOGRAM"); a API usa o valor
+    return MeasureEnum[key].value if key in MeasureEnum.__members__ else None
+
+
+class CatalogStatsService:
+    """Leitura dos agregados com limite de idade e recálculo sob demanda"""
+    def __init__(self, max_age: float = STATS_MAX_AGE_SECONDS):
+        self.max_age = max_age
+        self._lock = asyncio.Lock()
+        self.refreshes = 0
+
+    async def _rows(self, session: AsyncSession) -> List[CatalogStat]:
+        # populate_existing: após um recálculo, a mesma sessão relê os valores novos
+        return list((await session.exec(
+            select(CatalogStat)
+            .order_by(CatalogStat.dimension, CatalogStat.key)
+            .execution_options(populate_existing=True)
+        )).scalars())
+
+    @staticmethod
+    def _refreshed_at(rows: List[CatalogStat]) -> Optional[datetime]:
+        total = next((row for row in rows if row.dimension == "total"), None)
+        return _as_utc(total.refreshed_at) if total else None
+
+    def _age(self, refreshed_at: Optional[datetime]) -> Optional[float]:
+        if refreshed_at is None:
+            return None
+        return max((datetime.now(timezone.utc) - refreshed_at).total_seconds(), 0.0)
+
+    async def refresh(self) -> None:
+        """Recalcula catalog_stats no primário"""
+        async with async_session_maker() as session:
+            try:
+                for statement in refresh_statements(datetime.now(timezone.utc)):
+                    await session.exec(statement)
+                await session.commit()
+                self.refreshes += 1
+            except IntegrityError:
+                # Outro worker recalculou ao mesmo tempo: as linhas dele valem
+                await session.rollback()
+                logger.info("Estatísticas recalculadas por outro processo")
+
+    async def load(self, session: AsyncSession, max_age: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Agregados com no máximo `max_age` segundos (limitado a self.max_age).
+
+        A leitura usa a sessão da requisição (que pode ser uma réplica); o
+        recálculo e a releitura, quando necessários, usam o primário.
+        """
+        limit = self.max_age if max_age is None else min(max_age, self.max_age)
+        rows = await self._rows(session)
+        age = self._age(self._refreshed_at(rows))
+        if age is None or age > limit:
+            async with self._lock:
+                async with async_session_maker() as primary:
+                    rows = await self._rows(primary)
+                    age = self._age(self._refreshed_at(rows))
+                    if age is None or age > limit:
+                        await self.refresh()
+                        rows = await self._rows(primary)
+        return await self._payload(session, rows)
+
+    async def _payload(self, session: AsyncSession, rows: List[CatalogStat]) -> Dict[str, Any]:
+        by_dimension: Dict[str, List[CatalogStat]] = {}
+        for row in rows:
+            by_dimension.setdefault(row.dimension, []).append(row)
+
+        brand_ids = [int(row.key) for row in by_dimension.get("brand", []) if row.key]
+        category_ids = [int(row.key) for row in by_dimension.get("category", [])]
+        await reference_cache.resolve(session, brand_ids=brand_ids, category_ids=category_ids)
+
+        def name(item) -> Optional[str]:
+            return item.name if item is not None else None
+
+        refreshed_at = self._refreshed_at(rows)
+        totals = by_dimension["total"][0]
+        by_brand = [
+            {"brand_id": int(row.key) if row.key else None,
+             "name": name(reference_cache.brand(int(row.key))) if row.key else None,
+             **_bucket(row)}
+            for row in by_dimension.get("brand", [])
+        ]
+        by_category = [
+            {"category_id": int(row.key), "name": name(reference_cache.category(int(row.key))), **_bucket(row)}
+            for row in by_dimension.get("category", [])
+        ]
+        return {
+            "refreshed_at": refreshed_at,
+            "age_seconds": round(self._age(refreshed_at), 3),
+            "totals": _bucket(totals),
+            "by_status": [
+                {"status": row.key == "true", **_bucket(row)}
+                for row in by_dimension.get("status", [])
+            ],
+            # Maiores grupos primeiro
+            "by_brand": sorted(by_brand, key=lambda item: -item["products"]),
+            "by_category": sorted(by_category, key=lambda item: -item["products"]),
+            "by_measure_type": sorted(
+                ({"measure_type": _measure_type(row.key), **_bucket(row)}
+                 for row in by_dimension.get("measure_type", [])),
+                key=lambda item: -item["products"]
+            ),
+        }
+
+
+catalog_stats = CatalogStatsService()
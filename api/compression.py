@@ -0,0 +1,99 @@
+from dotenv import load_dotenv
+import os
+from typing import Set
+
+import anyio.to_thread
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # em requirements.txt; sem ele, apenas gzip
+    brotli = None
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Respostas menores que isso (em bytes) não são comprimidas
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1000"))
+GZIP_COMPRESSION_LEVEL = int(os.getenv("GZIP_COMPRESSION_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Corpos maiores que isso são comprimidos fora do event loop
+_THREAD_MINIMUM_SIZE = 128 * 1024
+
+
+def accepted_encodings(header: str) -> Set[str]:
+    """Codificações aceitas no Accept-Encoding (ignora as com q=0)"""
+    encodings = set()
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            encodings.add(coding.strip().lower())
+    return encodings
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int = BROTLI_QUALITY):
+        super().__init__(app, minimum_size)
+        self.quality = quality
+        self._compressor = None
+
+    async def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if len(body) >= _THREAD_MINIMUM_SIZE:
+            return await anyio.to_thread.run_sync(self._compress_body, body, more_body)
+        return self._compress_body(body, more_body)
+
+    def _compress_body(self, body: bytes, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=self.quality)
+        data = self._compressor.process(body)
+        # Em streaming, cada parte é enviada já decodificável pelo cliente
+        return data + (self._compressor.flush() if more_body else self._compressor.finish())
+
+
+class CompressionMiddleware:
+    """
+    Comprime respostas com brotli (se instalado e aceito) ou gzip.
+
+    Segue o GZipMiddleware do Starlette: respostas menores que
+    `minimum_size`, já codificadas ou de tipos binários não são comprimidas,
+    e respostas em streaming são comprimidas parte a parte.
+    """
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        gzip_level: int = GZIP_COMPRESSION_LEVEL,
+        brotli_quality: int = BROTLI_QUALITY
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encodings = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in encodings:
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+        elif "gzip" in encodings:
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+
+        await responder(scope, receive, send)
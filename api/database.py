@@ -1,11 +1,19 @@
+from fastapi import Request
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from dotenv import load_dotenv
+import asyncio
 import os
 import time
 import logging
 from sqlalchemy.exc import OperationalError
 from sqlalchemy import text
-from typing import Generator
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from typing import AsyncGenerator, Generator, List
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from migrations import run_migrations
+from pool_stats import PoolStats, attach_pool_stats, instrumented_pool_class
+from replicas import Replica, ReplicaRouter, is_connection_error
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -19,22 +27,109 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL não encontrada nas variáveis de ambiente")
 
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+# init_db na inicialização de cada processo; serve.py desativa nos workers,
+# pois já inicializou o banco antes de iniciá-los
+DB_INIT_ON_STARTUP = _env_bool("DB_INIT_ON_STARTUP", True)
+
+# Configurações do pool de conexões (ajustáveis por variáveis de ambiente)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))  # Recicla conexões (segundos, -1 desativa)
+# Verifica conexões antes de usar (um round-trip extra por checkout);
+# com DB_POOL_RECYCLE abaixo do timeout do servidor pode ser desativado
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+
+def _engine_options(url: str, base_pool, stats: PoolStats) -> dict:
+    """Opções comuns aos engines síncrono e assíncrono"""
+    options = {
+        "echo": False,  # Set to True para debug SQL queries
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+    if "sqlite" in url:
+        options["connect_args"] = {"check_same_thread": False}
+        # SQLite em memória usa um pool próprio, sem dimensionamento
+        if ":memory:" in url or url.rstrip("/").endswith(":"):
+            return options
+    options.update({
+        "poolclass": instrumented_pool_class(base_pool, stats),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    })
+    return options
+
+# Estatísticas dos pools (expostas em /metrics e /health)
+pool_stats = PoolStats("sync")
+async_pool_stats = PoolStats("async")
+
 # Configurações do engine
-engine = create_engine(
-    DATABASE_URL,
-    echo=False,  # Set to True para debug SQL queries
-    pool_pre_ping=True,  # Verifica conexões antes de usar
-    pool_recycle=300,    # Recicla conexões a cada 5 minutos
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL, QueuePool, pool_stats))
+attach_pool_stats(engine, pool_stats, DB_POOL_SIZE + DB_MAX_OVERFLOW)
+
+def _async_database_url(url: str) -> str:
+    """
+    Converte a URL do banco para o driver assíncrono equivalente
+    (asyncpg para PostgreSQL, aiosqlite para SQLite).
+    """
+    scheme, separator, rest = url.partition("://")
+    dialect = scheme.split("+")[0]
+    
+    if dialect in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{separator}{rest}"
+    if dialect == "sqlite":
+        return f"sqlite+aiosqlite{separator}{rest}"
+    
+    raise ValueError(f"Sem driver assíncrono configurado para o banco '{dialect}'")
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_database_url(DATABASE_URL)
+
+# Engine assíncrono usado pelas rotas da API
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **_engine_options(ASYNC_DATABASE_URL, AsyncAdaptedQueuePool, async_pool_stats)
 )
+attach_pool_stats(async_engine.sync_engine, async_pool_stats, DB_POOL_SIZE + DB_MAX_OVERFLOW)
+
+# expire_on_commit=False evita recarregamentos implícitos (não suportados em async)
+async_session_maker = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
+def _replica_urls() -> List[str]:
+    """URLs das réplicas de leitura (DATABASE_REPLICA_URLS separadas por vírgula)"""
+    urls = os.getenv("DATABASE_REPLICA_URLS") or os.getenv("DATABASE_REPLICA_URL") or ""
+    return [url.strip() for url in urls.split(",") if url.strip()]
+
+def _create_replica(index: int, url: str) -> Replica:
+    async_url = _async_database_url(url)
+    stats = PoolStats(f"replica{index}")
+    replica_engine = create_async_engine(async_url, **_engine_options(async_url, AsyncAdaptedQueuePool, stats))
+    attach_pool_stats(replica_engine.sync_engine, stats, DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    return Replica(stats.name, replica_engine, stats)
+
+# Réplicas de leitura (opcionais): requisições GET/HEAD são distribuídas entre elas
+read_router = ReplicaRouter([_create_replica(index, url) for index, url in enumerate(_replica_urls(), start=1)])
 
 def create_db_and_tables():
     """
-    Cria todas as tabelas definidas nos modelos SQLModel
+    Cria todas as tabelas definidas nos modelos SQLModel e aplica as
+    migrações pendentes
     """
     try:
         SQLModel.metadata.create_all(engine)
         logger.info("✅ Tabelas criadas/verificadas com sucesso!")
+        # Índices e alterações de tabelas existentes (create_all não os aplica)
+        run_migrations(engine)
     except Exception as e:
         logger.error(f"❌ Erro ao criar tabelas: {str(e)}")
         raise
@@ -56,6 +151,45 @@ def get_session() -> Generator[Session, None, None]:
         finally:
             session.close()
 
+async def get_async_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency para obter sessão assíncrona do banco de dados no FastAPI.
+    
+    Com réplicas configuradas, requisições GET/HEAD usam uma réplica (exceto
+    logo após uma escrita do mesmo cliente) e as demais usam o primário.
+    
+    Yields:
+        AsyncSession: Sessão assíncrona do SQLAlchemy
+    """
+    client = request.client.host if request.client else None
+    replica = read_router.route(request.method, client, request.cookies)
+    maker = replica.session_maker if replica is not None else async_session_maker
+    async with maker() as session:
+        try:
+            yield session
+        except Exception as e:
+            await session.rollback()
+            if replica is not None and is_connection_error(e):
+                read_router.mark_down(replica, e)
+            logger.error(f"Erro na sessão do banco: {str(e)}")
+            raise
+
+async def get_primary_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency para rotas de leitura que também escrevem ou exigem dados
+    sem atraso de replicação; sempre usa o primário.
+    
+    Yields:
+        AsyncSession: Sessão assíncrona do SQLAlchemy
+    """
+    async with async_session_maker() as session:
+        try:
+            yield session
+        except Exception as e:
+            await session.rollback()
+            logger.error(f"Erro na sessão do banco: {str(e)}")
+            raise
+
 def check_database_connection(retries: int = 3, delay: int = 2) -> bool:
     """
     Testa a conexão com o banco de dados.
@@ -92,6 +226,60 @@ def check_database_connection(retries: int = 3, delay: int = 2) -> bool:
             return False
     return False
 
+async def check_database_connection_async(retries: int = 1, delay: float = 2) -> bool:
+    """
+    Versão assíncrona de check_database_connection, segura para o event loop.
+    
+    Args:
+        retries (int): Número de tentativas de conexão
+        delay (float): Tempo de espera entre tentativas em segundos
+        
+    Returns:
+        bool: True se a conexão for bem-sucedida, False caso contrário
+    """
+    for attempt in range(retries):
+        try:
+            async with async_engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+                return True
+        except Exception as e:
+            if attempt < retries - 1:
+                logger.warning(
+                    f"⚠️ Falha na conexão (tentativa {attempt + 1}/{retries}). "
+                    f"Tentando novamente em {delay} segundos..."
+                )
+                await asyncio.sleep(delay)
+            else:
+                logger.error(f"❌ Falha ao conectar ao banco de dados: {str(e)}")
+    return False
+
+# Janela em que atividade recente do pool dispensa um SELECT 1 no health check
+DB_HEALTH_WINDOW = float(os.getenv("DB_HEALTH_WINDOW", "15"))
+
+async def database_health() -> dict:
+    """
+    Estado do banco para o health check, baseado nas estatísticas do pool.
+
+    Só abre uma conexão de teste (SELECT 1) quando o pool não teve nenhum
+    checkout bem-sucedido na janela DB_HEALTH_WINDOW, evitando carga extra
+    no banco a cada probe.
+    """
+    connected = async_pool_stats.recently_healthy(DB_HEALTH_WINDOW)
+    if not connected:
+        connected = await check_database_connection_async(retries=1)
+    
+    pool = async_pool_stats.snapshot()
+    health = {
+        "connected": connected,
+        "pool": {
+            key: pool[key]
+            for key in ("size", "checked_out", "overflow", "max_connections", "saturation")
+        },
+    }
+    if read_router.enabled:
+        health["replicas"] = {replica.name: replica.snapshot() for replica in read_router.replicas}
+    return health
+
 def init_db():
     """
     Inicializa o banco de dados: verifica conexão e cria tabelas
@@ -0,0 +1,188 @@
+from dotenv import load_dotenv
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, delete, or_
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.brand import Brand
+from models.category import Category
+from models.product import Product, ProductCategory
+from models.tombstone import Tombstone
+from pagination import decode_cursor, encode_cursor
+from serialization import BRAND_COLUMNS, CATEGORY_COLUMNS, PRODUCT_COLUMNS, model_payload
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Alterações dos últimos segundos são reenviadas na sincronização seguinte,
+# cobrindo transações longas e diferenças de relógio entre os workers
+SYNC_SAFETY_WINDOW = float(os.getenv("SYNC_SAFETY_WINDOW", "30"))
+
+# Exclusões mais antigas que isso são descartadas; tokens anteriores
+# exigem uma sincronização completa
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "30"))
+
+# Seção de `deleted` de cada entidade registrada
+_DELETED_SECTIONS = {"product": "products", "brand": "brands", "category": "categories"}
+
+# Intervalo mínimo (segundos) entre limpezas de registros de exclusão
+_PRUNE_INTERVAL = 3600
+_last_prune = 0.0
+
+# Índices usados pela sincronização (produtos paginados por updated_at, id),
+# criados pela migração 1 (migrations.py)
+SYNC_INDEX_DDL = [
+    "CREATE INDEX IF NOT EXISTS idx_products_updated_at ON products (updated_at, id)",
+    "CREATE INDEX IF NOT EXISTS idx_brands_updated_at ON brands (updated_at)",
+    "CREATE INDEX IF NOT EXISTS idx_categories_updated_at ON categories (updated_at)",
+]
+
+
+def record_deletion(session: AsyncSession, entity: str, entity_id: int) -> None:
+    """Registra a exclusão física de uma entidade, na transação da rota"""
+    session.add(Tombstone(entity=entity, entity_id=entity_id))
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """
+    Decodifica um token de sincronização.
+
+    Raises:
+        HTTPException: 400 se o token for inválido
+    """
+    position = decode_cursor(token)
+    try:
+        after = position.get("a")
+        return {
+            "since": _parse_time(position.get("s")),
+            "watermark": _parse_time(position.get("w")),
+            "after": (datetime.fromisoformat(after[0]), int(after[1])) if after else None,
+        }
+    except (TypeError, ValueError, IndexError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync token"
+        )
+
+
+def encode_token(
+    since: Optional[datetime],
+    watermark: Optional[datetime] = None,
+    after: Optional[Product] = None
+) -> str:
+    position: Dict[str, Any] = {"s": since.isoformat() if since else None}
+    if after is not None:
+        position["w"] = watermark.isoformat()
+        position["a"] = [after.updated_at.isoformat(), after.id]
+    return encode_cursor(position)
+
+
+async def prune_tombstones(session: AsyncSession) -> None:
+    """Remove registros de exclusão fora do período de retenção (no máximo a cada hora)"""
+    global _last_prune
+    if time.monotonic() - _last_prune < _PRUNE_INTERVAL:
+        return
+    _last_prune = time.monotonic()
+
+    horizon = datetime.now(timezone.utc) - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+    await session.exec(delete(Tombstone).where(Tombstone.deleted_at < horizon))
+    await session.commit()
+
+
+async def build_delta(session: AsyncSession, token: Optional[str], limit: int) -> Dict[str, Any]:
+    """
+    Monta as alterações desde o token (formato de SyncRead).
+
+    Sem token, ou com token mais antigo que a retenção das exclusões, a
+    resposta traz o catálogo completo e `reset` verdadeiro. Os produtos são
+    paginados por (updated_at, id); enquanto `has_more` for verdadeiro, o
+    token devolvido continua a mesma sincronização e as demais seções vêm
+    vazias. A marca d'água final é o início da sincronização menos
+    `SYNC_SAFETY_WINDOW`, então alterações recentes podem vir repetidas.
+    """
+    now = datetime.now(timezone.utc)
+    position = decode_token(token) if token else {"since": None, "watermark": None, "after": None}
+
+    since = position["since"]
+    horizon = now - timedelta(days=SYNC_TOMBSTONE_RETENTION_DAYS)
+    reset = token is None or since is None or since < horizon
+    if reset and since is not None:
+        position = {"since": None, "watermark": None, "after": None}
+        since = None
+
+    after = position["after"]
+    watermark = position["watermark"] or now - timedelta(seconds=SYNC_SAFETY_WINDOW)
+    if since is not None and watermark < since:
+        watermark = since
+
+    delta: Dict[str, Any] = {
+        "reset": reset and after is None,
+        "products": [],
+        "brands": [],
+        "categories": [],
+        "product_categories": [],
+        "deleted": {"products": [], "brands": [], "categories": []},
+    }
+
+    # Marcas, categorias e exclusões vão apenas na primeira página
+    if after is None:
+        brand_query = select(Brand).order_by(Brand.id)
+        category_query = select(Category).order_by(Category.id)
+        if since is not None:
+            brand_query = brand_query.where(Brand.updated_at > since)
+            category_query = category_query.where(Category.updated_at > since)
+            tombstones = (await session.exec(
+                select(Tombstone.entity, Tombstone.entity_id)
+                .where(Tombstone.deleted_at > since)
+                .order_by(Tombstone.id)
+            )).all()
+            for entity, entity_id in tombstones:
+                delta["deleted"][_DELETED_SECTIONS[entity]].append(entity_id)
+
+        delta["brands"] = [
+            model_payload(brand, BRAND_COLUMNS) for brand in (await session.exec(brand_query)).all()
+        ]
+        delta["categories"] = [
+            model_payload(category, CATEGORY_COLUMNS) for category in (await session.exec(category_query)).all()
+        ]
+
+    product_query = select(Product).order_by(Product.updated_at, Product.id).limit(limit + 1)
+    if since is not None:
+        product_query = product_query.where(Product.updated_at > since)
+    if after is not None:
+        product_query = product_query.where(or_(
+            Product.updated_at > after[0],
+            and_(Product.updated_at == after[0], Product.id > after[1])
+        ))
+    products = list((await session.exec(product_query)).all())
+
+    has_more = len(products) > limit
+    products = products[:limit]
+    delta["products"] = [model_payload(product, PRODUCT_COLUMNS) for product in products]
+
+    # Conjunto completo de ligações dos produtos retornados
+    if products:
+        links = (await session.exec(
+            select(ProductCategory.product_id, ProductCategory.category_id)
+            .where(ProductCategory.product_id.in_([product.id for product in products]))
+            .order_by(ProductCategory.id)
+        )).all()
+        delta["product_categories"] = [
+            {"product_id": product_id, "category_id": category_id} for product_id, category_id in links
+        ]
+
+    delta["has_more"] = has_more
+    delta["token"] = encode_token(since, watermark, products[-1]) if has_more else encode_token(watermark)
+    return delta
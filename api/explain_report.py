@@ -0,0 +1,167 @@
+"""
+Relatório dos planos de execução (EXPLAIN) das consultas das rotas.
+
+Monta as consultas com os mesmos construtores usados pelas rotas de
+produtos e da sincronização, com valores de exemplo lidos do próprio banco,
+e imprime o plano de cada uma (EXPLAIN no PostgreSQL, EXPLAIN QUERY PLAN no
+SQLite). Consultas com varredura sequencial de tabela são sinalizadas.
+
+Uso:
+    python explain_report.py
+    python explain_report.py --analyze      # PostgreSQL: executa e mede (EXPLAIN ANALYZE)
+    python explain_report.py --only by-brand
+"""
+import argparse
+import logging
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from database import engine, init_db
+from models.product import MeasureEnum, Product, ProductCategory
+from routes.products import (
+    _barcode_query,
+    _brand_products_query,
+    _category_products_query,
+    _collection_versions_query,
+    _filtered_products_query,
+    _links_query,
+)
+
+logger = logging.getLogger(__name__)
+
+# Tamanho de página usado nas consultas paginadas (padrão das rotas)
+PAGE_SIZE = 100
+
+# Trechos de plano que indicam varredura sequencial da tabela
+_FULL_SCAN = {
+    "postgresql": re.compile(r"Seq Scan on (products|product_categories)\b"),
+    "sqlite": re.compile(r"\bSCAN (products|product_categories)\b(?! USING)"),
+}
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN de uma consulta, com os parâmetros processados pelo SQLAlchemy"""
+    inherit_cache = False
+
+    def __init__(self, statement, analyze: bool = False):
+        self.statement = statement
+        self.analyze = analyze
+
+
+@compiles(Explain, "postgresql")
+def _explain_postgresql(element, compiler, **kw):
+    options = "(ANALYZE, BUFFERS) " if element.analyze else ""
+    return f"EXPLAIN {options}" + compiler.process(element.statement, **kw)
+
+
+@compiles(Explain, "sqlite")
+def _explain_sqlite(element, compiler, **kw):
+    return "EXPLAIN QUERY PLAN " + compiler.process(element.statement, **kw)
+
+
+def _page(query):
+    return query.order_by(Product.id).limit(PAGE_SIZE + 1)
+
+
+def _samples(connection: Connection) -> dict:
+    """Valores reais para os parâmetros (marca, categoria, código etc.)"""
+    product = connection.execute(
+        select(Product.id, Product.barcode, Product.brand_id, Product.measure_type)
+        .where(Product.brand_id.is_not(None), Product.barcode.is_not(None))
+        .limit(1)
+    ).first()
+    category_id = connection.execute(select(ProductCategory.category_id).limit(1)).scalar()
+    page_ids = list(connection.execute(select(Product.id).order_by(Product.id).limit(PAGE_SIZE)).scalars())
+    return {
+        "product_id": product.id if product else 1,
+        "barcode": product.barcode if product else "0000000000000",
+        "brand_id": product.brand_id if product else 1,
+        "measure_type": MeasureEnum(product.measure_type) if product and product.measure_type else MeasureEnum.UNIT,
+        "category_id": category_id or 1,
+        "page_ids": page_ids or [1],
+    }
+
+
+def route_queries(samples: dict) -> List[Tuple[str, str, object]]:
+    """(nome, rota, consulta) de cada consulta relevante das rotas"""
+    since = datetime.now(timezone.utc) - timedelta(days=1)
+    return [
+        ("list", "GET /products/", _page(_filtered_products_query())),
+        ("list-status", "GET /products/?status=false",
+         _page(_filtered_products_query(status_filter=False))),
+        ("list-brand", "GET /products/?brand_id=",
+         _page(_filtered_products_query(brand_id=samples["brand_id"]))),
+        ("list-measure", "GET /products/?measure_type=",
+         _page(_filtered_products_query(measure_type=samples["measure_type"]))),
+        ("list-category", "GET /products/?category_id=",
+         _page(_filtered_products_query(category_id=samples["category_id"]))),
+        ("list-brand-etag", "GET /products/?brand_id= (versão para ETag)",
+         _collection_versions_query(_filtered_products_query(brand_id=samples["brand_id"]))),
+        ("list-category-etag", "GET /products/?category_id= (versão para ETag)",
+         _collection_versions_query(_filtered_products_query(category_id=samples["category_id"]))),
+        ("relations", "ligações produto-categoria de uma página", _links_query(samples["page_ids"])),
+        ("get", "GET /products/{product_id}", select(Product).where(Product.id == samples["product_id"])),
+        ("barcode", "GET /products/barcode/{code}", _barcode_query(samples["barcode"])),
+        ("by-brand", "GET /products/by-brand/{brand_id}", _brand_products_query(samples["brand_id"])),
+        ("by-category", "GET /products/by-category/{category_id}",
+         _category_products_query(samples["category_id"])),
+        ("sync", "GET /sync (página de produtos alterados)",
+         select(Product).where(Product.updated_at > since)
+         .order_by(Product.updated_at, Product.id).limit(1001)),
+    ]
+
+
+def _plan_lines(connection: Connection, query, analyze: bool) -> List[str]:
+    rows = connection.execute(Explain(query, analyze)).all()
+    if connection.dialect.name == "sqlite":
+        # (id, parent, notused, detail): indenta pela hierarquia
+        depth = {0: 0}
+        lines = []
+        for node_id, parent, _, detail in rows:
+            depth[node_id] = depth.get(parent, 0) + 1
+            lines.append("  " * (depth[node_id] - 1) + detail)
+        return lines
+    return [row[0] for row in rows]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Planos de execução das consultas das rotas")
+    parser.add_argument("--analyze", action="store_true",
+                        help="Executar as consultas e medir (EXPLAIN ANALYZE, apenas PostgreSQL)")
+    parser.add_argument("--only", action="append", help="Nome da consulta a incluir (pode ser repetido)")
+    args = parser.parse_args(argv)
+
+    dialect = engine.dialect.name
+    if dialect not in _FULL_SCAN:
+        logger.error(f"❌ Banco não suportado pelo relatório: {dialect}")
+        return 1
+
+    init_db()
+    full_scans = []
+    with engine.connect() as connection:
+        for name, route, query in route_queries(_samples(connection)):
+            if args.only and name not in args.only:
+                continue
+            lines = _plan_lines(connection, query, args.analyze and dialect == "postgresql")
+            scanned = any(_FULL_SCAN[dialect].search(line) for line in lines)
+            if scanned:
+                full_scans.append(name)
+            print(f"== {name}: {route}{'  [varredura sequencial]' if scanned else ''}")
+            for line in lines:
+                print(f"   {line}")
+            print()
+
+    if full_scans:
+        print(f"Consultas com varredura sequencial: {', '.join(full_scans)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+import csv
+import io
+from enum import Enum
+from typing import Any, Dict, List
+
+from importer import CSV_LIST_SEPARATOR
+from serialization import dumps
+
+SUPPORTED_FORMATS = ("ndjson", "csv")
+
+# Produtos lidos do cursor (e gravados na resposta) por vez
+DEFAULT_BATCH_SIZE = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Colunas do CSV; compatíveis com a importação (marca e categorias pelo nome)
+CSV_COLUMNS = (
+    "id", "barcode", "name", "description", "brand", "categories",
+    "measure_type", "measure_value", "qtt", "status", "images", "updated_at",
+)
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def csv_header() -> bytes:
+    """Linha de cabeçalho do CSV exportado"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(CSV_COLUMNS)
+    return buffer.getvalue().encode()
+
+
+def encode_batch(payloads: List[Dict[str, Any]], file_format: str) -> bytes:
+    """
+    Converte um lote de produtos (formato ProductRead) em bytes do arquivo.
+
+    NDJSON usa um objeto ProductRead por linha; o CSV usa `CSV_COLUMNS`.
+    """
+    if file_format == "ndjson":
+        return b"".join(dumps(payload) + b"\n" for payload in payloads)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for payload in payloads:
+        row = dict(payload)
+        row["brand"] = payload["brand"]["name"] if payload["brand"] else None
+        row["categories"] = CSV_LIST_SEPARATOR.join(category["name"] for category in payload["categories"])
+        writer.writerow([_csv_value(row[column]) for column in CSV_COLUMNS])
+    return buffer.getvalue().encode()
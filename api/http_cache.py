@@ -0,0 +1,95 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Iterable, Optional
+
+from dotenv import load_dotenv
+from fastapi import Request, Response, status
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Cache-Control das leituras; o padrão obriga revalidação (ETag) a cada uso
+CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "public, max-age=0, must-revalidate")
+
+
+def make_etag(*parts: Any) -> str:
+    """Gera um ETag forte a partir dos valores que identificam a versão do recurso"""
+    raw = "|".join(
+        value.isoformat() if isinstance(value, datetime) else repr(value)
+        for value in parts
+    )
+    return '"' + hashlib.sha1(raw.encode()).hexdigest() + '"'
+
+
+def latest(values: Iterable[Optional[datetime]]) -> Optional[datetime]:
+    """Maior data entre as informadas, normalizada para UTC"""
+    result = None
+    for value in values:
+        if value is None:
+            continue
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        if result is None or value > result:
+            result = value
+    return result
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    # If-None-Match usa comparação fraca (ignora o prefixo W/)
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == etag for candidate in candidates
+    )
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """
+    Avalia If-None-Match e If-Modified-Since de uma requisição condicional.
+
+    If-None-Match tem precedência; If-Modified-Since só é considerado
+    quando ele não foi enviado.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    
+    return False
+
+
+def set_cache_headers(response: Response, etag: str, last_modified: Optional[datetime]) -> None:
+    """Adiciona ETag, Last-Modified e Cache-Control à resposta"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if last_modified is not None:
+        response.headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime]
+) -> Optional[Response]:
+    """
+    Retorna uma resposta 304 se o cliente já tem a versão atual; caso
+    contrário adiciona os headers de cache à resposta e retorna None.
+    """
+    if is_not_modified(request, etag, last_modified):
+        not_modified = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+        set_cache_headers(not_modified, etag, last_modified)
+        return not_modified
+    
+    set_cache_headers(response, etag, last_modified)
+    return None
@@ -0,0 +1,239 @@
+from dotenv import load_dotenv
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import thumbnails
+from barcode import try_normalize_barcode
+from cache import barcode_cache, list_cache
+from database import async_session_maker
+from image_storage import image_storage
+from single_flight import invalidate_flights
+from models.product import Product
+from models.product_image import ProductImage
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Tamanhos das miniaturas (maior lado, em pixels) e formatos gerados
+IMAGE_SIZES = tuple(int(size) for size in os.getenv("IMAGE_SIZES", "160,320,640").split(","))
+IMAGE_FORMATS = tuple(
+    extension.strip() for extension in os.getenv("IMAGE_FORMATS", "webp,jpg").split(",")
+    if extension.strip() in thumbnails.OUTPUT_FORMATS
+)
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+
+# Processos que geram as miniaturas (fora do event loop e do GIL)
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+# Limites do upload: tamanho do arquivo e pixels (proteção contra "bombas")
+IMAGE_MAX_UPLOAD_BYTES = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", "40000000"))
+
+# Base das URLs das imagens: a própria API por padrão, ou um CDN/bucket público
+IMAGE_PUBLIC_URL = os.getenv("IMAGE_PUBLIC_URL", "/api/v1/images").rstrip("/") + "/"
+
+
+def image_key(data: bytes) -> str:
+    """Prefixo dos arquivos de uma imagem, derivado do conteúdo"""
+    digest = hashlib.sha256(data).hexdigest()
+    return f"products/{digest[:2]}/{digest}"
+
+
+def original_path(image: ProductImage) -> str:
+    return f"{image.key}/original.{image.original_format}"
+
+
+def _variant_names(image: ProductImage) -> List[str]:
+    return [name for name in (image.variants or "").split(",") if name]
+
+
+def _variant_order(name: str):
+    size, _, extension = name.partition(".")
+    return int(size), extension
+
+
+def image_payload(image: ProductImage) -> Dict[str, Any]:
+    """Imagem no formato de ProductImageRead"""
+    thumbnails_by_size: Dict[str, Dict[str, str]] = {}
+    for name in _variant_names(image):
+        size, _, extension = name.partition(".")
+        thumbnails_by_size.setdefault(size, {})[extension] = IMAGE_PUBLIC_URL + f"{image.key}/{name}"
+    return {
+        "id": image.id,
+        "status": image.status,
+        "width": image.width,
+        "height": image.height,
+        "original": IMAGE_PUBLIC_URL + original_path(image),
+        "thumbnails": thumbnails_by_size,
+    }
+
+
+async def load_gallery(session: AsyncSession, product_ids: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """Imagens prontas de cada produto, em uma única consulta"""
+    gallery: Dict[int, List[Dict[str, Any]]] = {}
+    images = (await session.exec(
+        select(ProductImage)
+        .where(ProductImage.product_id.in_(list(product_ids)), ProductImage.status == "ready")
+        .order_by(ProductImage.id)
+    )).all()
+    for image in images:
+        gallery.setdefault(image.product_id, []).append(image_payload(image))
+    return gallery
+
+
+async def touch_product(session: AsyncSession, product_id: int) -> Optional[str]:
+    """Marca o produto como alterado (ETag, sincronização); retorna o código
+    de barras para `product_changed`, chamado após o commit"""
+    return (await session.exec(
+        update(Product)
+        .where(Product.id == product_id)
+        .values(updated_at=datetime.now(timezone.utc))
+        .returning(Product.barcode)
+    )).scalar()
+
+
+def product_changed(barcode: Optional[str]) -> None:
+    """Limpa os caches de leitura do produto (depois do commit, para que uma
+    leitura concorrente não guarde o estado anterior)"""
+    normalized = try_normalize_barcode(barcode) if barcode else None
+    if normalized:
+        barcode_cache.invalidate(normalized)
+    invalidate_flights()
+    list_cache.bump("products")
+
+
+async def remove_unused_files(session: AsyncSession, images: List[ProductImage]) -> None:
+    """Apaga os arquivos de imagens excluídas que nenhuma outra linha usa
+
+    O mesmo arquivo pode estar em vários produtos (chave pelo conteúdo).
+    Chamar após o commit da exclusão.
+    """
+    keys = {image.key for image in images}
+    if not keys:
+        return
+    in_use = set((await session.exec(
+        select(ProductImage.key).where(ProductImage.key.in_(keys)).group_by(ProductImage.key)
+    )).all())
+    for image in images:
+        if image.key in in_use:
+            continue
+        for path in [original_path(image)] + [f"{image.key}/{name}" for name in _variant_names(image)]:
+            try:
+                await run_in_threadpool(image_storage.delete, path)
+            except Exception as e:
+                logger.warning(f"⚠️ Não foi possível apagar {path}: {str(e)}")
+
+
+class ImagePipeline:
+    """
+    Geração das miniaturas fora do caminho da requisição.
+
+    O upload grava o original e a linha "pending"; `submit` agenda a imagem
+    em uma tarefa do event loop, que redimensiona no pool de processos,
+    grava as miniaturas e marca a imagem como "ready" (ou "failed"). Imagens
+    pendentes de uma execução anterior são retomadas por `recover`.
+    """
+    def __init__(self, workers: int = IMAGE_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.processed = 0
+        self.failed = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: processos filhos leves (só importam thumbnails), sem
+            # herdar threads e conexões do servidor
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def submit(self, image_id: int) -> None:
+        task = asyncio.get_running_loop().create_task(self._process(image_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def recover(self, session: AsyncSession) -> None:
+        """Reagenda imagens que ficaram pendentes (ex.: reinício do servidor)"""
+        pending = (await session.exec(
+            select(ProductImage.id).where(ProductImage.status == "pending").order_by(ProductImage.id)
+        )).all()
+        for image_id in pending:
+            self.submit(image_id)
+        if pending:
+            logger.info(f"🖼️ {len(pending)} imagens pendentes reagendadas")
+
+    async def drain(self) -> None:
+        """Aguarda as tarefas em andamento (usado em testes e benchmarks)"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def _process(self, image_id: int) -> None:
+        try:
+            async with async_session_maker() as session:
+                image = await session.get(ProductImage, image_id)
+                if image is None or image.status != "pending":
+                    return
+
+                original = await run_in_threadpool(image_storage.read, original_path(image))
+                variants = await asyncio.get_running_loop().run_in_executor(
+                    self._pool(), thumbnails.render_variants,
+                    original, IMAGE_SIZES, IMAGE_FORMATS, IMAGE_QUALITY
+                )
+                for name, data in variants.items():
+                    extension = name.rpartition(".")[2]
+                    await run_in_threadpool(
+                        image_storage.write, f"{image.key}/{name}", data, thumbnails.CONTENT_TYPES[extension]
+                    )
+
+                # Outro worker pode ter concluído a mesma imagem nesse meio tempo
+                claimed = (await session.exec(
+                    update(ProductImage)
+                    .where(ProductImage.id == image_id, ProductImage.status == "pending")
+                    .values(status="ready", variants=",".join(sorted(variants, key=_variant_order)))
+                )).rowcount
+                barcode = await touch_product(session, image.product_id) if claimed else None
+                await session.commit()
+                if claimed:
+                    product_changed(barcode)
+                self.processed += 1
+        except asyncio.CancelledError:
+            # Desligamento: a imagem continua "pending" e é retomada depois
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"❌ Erro ao gerar miniaturas da imagem {image_id}: {str(e)}")
+            async with async_session_maker() as session:
+                # Não sobrescreve a imagem concluída por outro worker
+                await session.exec(
+                    update(ProductImage)
+                    .where(ProductImage.id == image_id, ProductImage.status == "pending")
+                    .values(status="failed")
+                )
+                await session.commit()
+
+    async def shutdown(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+image_pipeline = ImagePipeline()
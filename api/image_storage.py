@@ -0,0 +1,99 @@
+from dotenv import load_dotenv
+import os
+from pathlib import Path
+from typing import Optional
+
+try:
+    import boto3
+except ImportError:  # boto3 é opcional; necessário apenas com IMAGE_STORAGE=s3
+    boto3 = None
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Os arquivos são endereçados pelo conteúdo e nunca mudam: cache de um ano
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class LocalImageStorage:
+    """Arquivos de imagem em um diretório local (IMAGE_STORAGE_PATH)"""
+
+    def __init__(self, root: str):
+        self.root = Path(root).resolve()
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        # Chaves vêm da URL na rota de leitura: nada fora do diretório raiz
+        if self.root not in path.parents:
+            raise ValueError(f"Invalid image key: {key}")
+        return path
+
+    def write(self, key: str, data: bytes, content_type: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Escrita atômica: leitores nunca veem um arquivo pela metade
+        temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        temporary.write_bytes(data)
+        temporary.replace(path)
+
+    def read(self, key: str) -> bytes:
+        return self._path(key).read_bytes()
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Caminho do arquivo, servido diretamente pela API (None se ausente)"""
+        try:
+            path = self._path(key)
+        except ValueError:
+            return None
+        return path if path.is_file() else None
+
+
+class S3ImageStorage:
+    """Arquivos de imagem em um bucket S3 ou compatível (MinIO, R2 etc.)"""
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None):
+        if boto3 is None:
+            raise RuntimeError("IMAGE_STORAGE=s3 requer o pacote boto3")
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def write(self, key: str, data: bytes, content_type: str) -> None:
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self.prefix + key,
+            Body=data,
+            ContentType=content_type,
+            CacheControl=IMMUTABLE_CACHE_CONTROL,
+        )
+
+    def read(self, key: str) -> bytes:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)["Body"].read()
+        except self.client.exceptions.NoSuchKey:
+            raise FileNotFoundError(key)
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return None
+
+
+def _storage_from_env():
+    name = os.getenv("IMAGE_STORAGE", "local").lower()
+    if name == "s3":
+        return S3ImageStorage(
+            os.getenv("IMAGE_S3_BUCKET", ""),
+            prefix=os.getenv("IMAGE_S3_PREFIX", ""),
+            endpoint_url=os.getenv("IMAGE_S3_ENDPOINT_URL") or None,
+        )
+    if name != "local":
+        raise ValueError(f"Unknown IMAGE_STORAGE '{name}'")
+    return LocalImageStorage(os.getenv("IMAGE_STORAGE_PATH", "media"))
+
+
+image_storage = _storage_from_env()
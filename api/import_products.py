@@ -0,0 +1,59 @@
+"""
+Importação de catálogo de produtos pela linha de comando.
+
+Uso:
+    python import_products.py catalogo.csv
+    python import_products.py catalogo.ndjson --chunk-size 1000 --create-missing
+    cat catalogo.ndjson | python import_products.py - --format ndjson
+"""
+import argparse
+import logging
+import sys
+
+from sqlmodel import Session
+
+from database import engine, init_db
+from importer import DEFAULT_CHUNK_SIZE, SUPPORTED_FORMATS, detect_format, import_products
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Importa produtos de um arquivo CSV ou NDJSON")
+    parser.add_argument("path", help="Arquivo de entrada ('-' para stdin)")
+    parser.add_argument("--format", choices=SUPPORTED_FORMATS, dest="file_format",
+                        help="Formato do arquivo (detectado pela extensão se omitido)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Registros gravados por transação")
+    parser.add_argument("--create-missing", action="store_true",
+                        help="Criar marcas e categorias inexistentes")
+    args = parser.parse_args(argv)
+    
+    file_format = args.file_format or detect_format(args.path)
+    
+    init_db()
+    
+    stream = sys.stdin.buffer if args.path == "-" else open(args.path, "rb")
+    try:
+        with Session(engine) as session:
+            report = import_products(
+                session,
+                stream,
+                file_format,
+                chunk_size=args.chunk_size,
+                create_missing=args.create_missing
+            )
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+    
+    print(report.model_dump_json(indent=2))
+    logger.info(
+        f"Importação concluída: {report.upserted} gravados, "
+        f"{report.failed} com erro de {report.total_rows} registros"
+    )
+    return 0 if report.failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
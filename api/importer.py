@@ -0,0 +1,316 @@
+import csv
+import io
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from models.brand import Brand
+from models.category import Category
+from models.product import (
+    Product, ProductBase, ProductCategory,
+    ProductImportChunk, ProductImportError, ProductImportReport
+)
+from cache_sync import product_cache_sync
+from reference_cache import reference_cache
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ("csv", "ndjson")
+
+# Tamanho padrão dos lotes gravados por transação
+DEFAULT_CHUNK_SIZE = 500
+
+# Separador de categorias em colunas CSV
+CSV_LIST_SEPARATOR = "|"
+
+# Dialetos com suporte a INSERT ... ON CONFLICT
+_INSERT_BY_DIALECT = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+class ImportFormatError(ValueError):
+    """Formato de arquivo de importação não suportado"""
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> str:
+    """Detecta o formato (csv ou ndjson) pela extensão ou content-type"""
+    name = (filename or "").lower()
+    if name.endswith(".csv") or content_type == "text/csv":
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return "ndjson"
+    raise ImportFormatError("Could not detect file format; use csv or ndjson")
+
+
+def iter_records(stream: IO[str], file_format: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Lê registros de um stream de texto de forma incremental.
+
+    Yields:
+        Tuple[int, Dict]: Número do registro (a partir de 1) e seus campos
+    """
+    if file_format == "csv":
+        for line, row in enumerate(csv.DictReader(stream), start=1):
+            record = {}
+            for key, value in row.items():
+                if key is None:
+                    continue
+                value = (value or "").strip()
+                if key in ("categories", "category_ids"):
+                    record[key] = [item.strip() for item in value.split(CSV_LIST_SEPARATOR) if item.strip()]
+                else:
+                    # Células vazias viram None
+                    record[key.strip()] = value or None
+            yield line, record
+    elif file_format == "ndjson":
+        line = 0
+        for raw in stream:
+            if not raw.strip():
+                continue
+            line += 1
+            try:
+                record = json.loads(raw)
+            except json.JSONDecodeError as e:
+                record = {"__error__": f"Invalid JSON: {e.msg}"}
+            if not isinstance(record, dict):
+                record = {"__error__": "Each NDJSON line must be an object"}
+            yield line, record
+    else:
+        raise ImportFormatError(f"Unsupported format: {file_format}")
+
+
+def _chunked(records: Iterable[Tuple[int, Dict[str, Any]]], size: int) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class ProductImporter:
+    """
+    Importa produtos em lote com upsert pelo código de barras.
+
+    Marcas e categorias são resolvidas por mapas em memória carregados uma
+    única vez; cada lote é gravado em uma transação com um único
+    INSERT ... ON CONFLICT (barcode) DO UPDATE e as ligações com categorias
+    são substituídas com operações em massa.
+    """
+    def __init__(self, session: Session, chunk_size: int = DEFAULT_CHUNK_SIZE, create_missing: bool = False):
+        self.session = session
+        self.chunk_size = chunk_size
+        self.create_missing = create_missing
+        
+        dialect = session.get_bind().dialect.name
+        if dialect not in _INSERT_BY_DIALECT:
+            raise RuntimeError(f"Bulk import is not supported for dialect '{dialect}'")
+        self._insert = _INSERT_BY_DIALECT[dialect]
+        self._load_reference_maps()
+        # Marcas/categorias criadas no lote atual (invalidam o cache de referência)
+        self._created_references = False
+    
+    def _load_reference_maps(self) -> None:
+        """Carrega os mapas nome -> id de marcas e categorias"""
+        self.brands: Dict[str, int] = dict(self.session.exec(select(Brand.name, Brand.id)).all())
+        self.categories: Dict[str, int] = dict(self.session.exec(select(Category.name, Category.id)).all())
+        self.brand_ids = set(self.brands.values())
+        self.category_ids = set(self.categories.values())
+    
+    def run(self, records: Iterable[Tuple[int, Dict[str, Any]]]) -> ProductImportReport:
+        """Processa todos os registros e retorna o relatório da importação"""
+        report = ProductImportReport()
+        for number, chunk in enumerate(_chunked(records, self.chunk_size), start=1):
+            chunk_report = self._import_chunk(number, chunk)
+            report.chunks.append(chunk_report)
+            report.total_rows += chunk_report.rows
+            report.upserted += chunk_report.upserted
+            report.failed += chunk_report.rows - chunk_report.upserted
+            logger.info(
+                f"Lote {number}: {chunk_report.upserted}/{chunk_report.rows} produtos gravados"
+            )
+        return report
+    
+    def _resolve_brand(self, record: Dict[str, Any]) -> Optional[int]:
+        if record.get("brand_id") is not None:
+            brand_id = int(record["brand_id"])
+            if brand_id not in self.brand_ids:
+                raise ValueError(f"Brand with id {brand_id} not found")
+            return brand_id
+        
+        name = record.get("brand")
+        if not name:
+            return None
+        if name not in self.brands:
+            if not self.create_missing:
+                raise ValueError(f"Brand '{name}' not found")
+            brand = Brand(name=name)
+            self.session.add(brand)
+            self.session.flush()
+            self._created_references = True
+            self.brands[name] = brand.id
+            self.brand_ids.add(brand.id)
+        return self.brands[name]
+    
+    def _resolve_categories(self, record: Dict[str, Any]) -> Optional[List[int]]:
+        if record.get("category_ids") is not None:
+            category_ids = [int(category_id) for category_id in record["category_ids"]]
+            for category_id in category_ids:
+                if category_id not in self.category_ids:
+                    raise ValueError(f"Category with id {category_id} not found")
+            return list(dict.fromkeys(category_ids))
+        
+        if "categories" not in record:
+            return None
+        category_ids = []
+        for name in record["categories"] or []:
+            if name not in self.categories:
+                if not self.create_missing:
+                    raise ValueError(f"Category '{name}' not found")
+                category = Category(name=name)
+                self.session.add(category)
+                self.session.flush()
+                self._created_references = True
+                self.categories[name] = category.id
+                self.category_ids.add(category.id)
+            category_ids.append(self.categories[name])
+        return list(dict.fromkeys(category_ids))
+    
+    def _import_chunk(self, number: int, chunk: List[Tuple[int, Dict[str, Any]]]) -> ProductImportChunk:
+        chunk_report = ProductImportChunk(chunk=number, rows=len(chunk), upserted=0)
+        now = datetime.now(timezone.utc)
+        self._created_references = False
+        
+        # Validar registros; o último registro de um mesmo barcode prevalece
+        rows: Dict[str, Tuple[int, Dict[str, Any], set]] = {}
+        links: Dict[str, List[int]] = {}
+        try:
+            for line, record in chunk:
+                barcode = record.get("barcode")
+                try:
+                    if "__error__" in record:
+                        raise ValueError(record["__error__"])
+                    if not barcode:
+                        raise ValueError("barcode is required for import")
+                    
+                    fields = {
+                        key: value for key, value in record.items()
+                        if key in ProductBase.model_fields and key != "brand_id"
+                    }
+                    if "brand" in record or "brand_id" in record:
+                        fields["brand_id"] = self._resolve_brand(record)
+                    category_ids = self._resolve_categories(record)
+                    
+                    product = ProductBase.model_validate(fields)
+                except (ValueError, ValidationError) as e:
+                    chunk_report.errors.append(ProductImportError(line=line, barcode=barcode, error=str(e)))
+                    continue
+                
+                if product.barcode in rows:
+                    chunk_report.errors.append(ProductImportError(
+                        line=rows[product.barcode][0],
+                        barcode=product.barcode,
+                        error="Superseded by a later row with the same barcode"
+                    ))
+                rows[product.barcode] = (line, product.model_dump(), set(fields))
+                if category_ids is not None:
+                    links[product.barcode] = category_ids
+                else:
+                    links.pop(product.barcode, None)
+            
+            if not rows:
+                self.session.rollback()
+                return chunk_report
+            
+            # Agrupar por conjunto de colunas informadas, já que o UPDATE só
+            # deve sobrescrever o que veio no arquivo
+            groups: Dict[frozenset, List[Dict[str, Any]]] = {}
+            for _, values, provided in rows.values():
+                groups.setdefault(frozenset(provided), []).append(
+                    {**values, "created_at": now, "updated_at": now}
+                )
+            
+            product_ids: Dict[str, int] = {}
+            for provided, values in groups.items():
+                statement = self._insert(Product).values(values)
+                update_columns = {
+                    column: statement.excluded[column]
+                    for column in provided if column != "barcode"
+                }
+                update_columns["updated_at"] = statement.excluded.updated_at
+                statement = statement.on_conflict_do_update(
+                    index_elements=[Product.barcode],
+                    set_=update_columns
+                ).returning(Product.id, Product.barcode)
+                product_ids.update({barcode: product_id for product_id, barcode in self.session.execute(statement)})
+            
+            # Substituir ligações com categorias em massa
+            if links:
+                self.session.execute(
+                    delete(ProductCategory).where(
+                        ProductCategory.product_id.in_([product_ids[barcode] for barcode in links])
+                    )
+                )
+                link_rows = [
+                    {"product_id": product_ids[barcode], "category_id": category_id, "created_at": now}
+                    for barcode, category_ids in links.items()
+                    for category_id in category_ids
+                ]
+                if link_rows:
+                    self.session.execute(insert(ProductCategory), link_rows)
+            
+            if self._created_references:
+                reference_cache.mark_changed_sync(self.session)
+            product_cache_sync.mark_changed_sync(self.session)
+            self.session.commit()
+            chunk_report.upserted = len(rows)
+        except Exception as e:
+            self.session.rollback()
+            logger.error(f"❌ Erro ao importar lote {number}: {str(e)}")
+            # Mapas podem conter marcas/categorias criadas no lote revertido
+            self._load_reference_maps()
+            chunk_report.errors.append(ProductImportError(line=chunk[0][0], error=f"Chunk failed: {str(e)}"))
+        
+        return chunk_report
+
+
+def import_products(
+    session: Session,
+    stream: IO[bytes],
+    file_format: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    create_missing: bool = False
+) -> ProductImportReport:
+    """
+    Importa produtos de um stream binário CSV ou NDJSON (UTF-8).
+
+    Args:
+        session (Session): Sessão do banco de dados
+        stream (IO[bytes]): Arquivo de entrada
+        file_format (str): "csv" ou "ndjson"
+        chunk_size (int): Registros por transação
+        create_missing (bool): Criar marcas/categorias inexistentes
+
+    Returns:
+        ProductImportReport: Totais e erros por lote
+    """
+    if file_format not in SUPPORTED_FORMATS:
+        raise ImportFormatError(f"Unsupported format: {file_format}")
+    
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        importer = ProductImporter(session, chunk_size=chunk_size, create_missing=create_missing)
+        return importer.run(iter_records(text_stream, file_format))
+    finally:
+        # Não fechar o stream original junto com o wrapper
+        text_stream.detach()
@@ -1,15 +1,27 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
 import logging
 from contextlib import asynccontextmanager
-import time
 from routes.products import router as products_router
 
 # Imports do projeto
-from database import init_db, check_database_connection
+from database import init_db, database_health, async_engine, async_session_maker, read_router, DB_INIT_ON_STARTUP
+from image_pipeline import image_pipeline
+from metrics import MetricsMiddleware, render_metrics, PROMETHEUS_CONTENT_TYPE
+from compression import CompressionMiddleware
+from pagination import NEXT_CURSOR_HEADER
+from reference_cache import reference_cache
+from cache_sync import product_cache_sync
+from replicas import ReadYourWritesMiddleware
+from stock import stock_aggregator
 from routes.brands import router as brands_router
 from routes.categories import router as categories_router
+from routes.images import router as images_router
+from routes.stats import router as stats_router
+from routes.stock import router as stock_router
+from routes.sync import router as sync_router
 
 # Configurar logging
 logging.basicConfig(
@@ -27,7 +39,21 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Iniciando aplicação...")
     try:
-        init_db()
+        # init_db é síncrono (pode aguardar novas tentativas de conexão); com
+        # serve.py já foi executado uma vez, antes dos workers
+        if DB_INIT_ON_STARTUP:
+            await run_in_threadpool(init_db)
+        # Marcas e categorias ficam em memória desde a primeira requisição
+        async with async_session_maker() as session:
+            await reference_cache.warm(session)
+            # Contador de versão dos produtos (PRODUCT_CACHE_SYNC, vários workers)
+            await product_cache_sync.warm(session)
+            # Miniaturas que ficaram pendentes na execução anterior
+            await image_pipeline.recover(session)
+        # Réplicas de leitura (se configuradas): verificação inicial e periódica
+        await read_router.start()
+        # Agregador de movimentações de estoque (STOCK_AGGREGATE_INTERVAL > 0)
+        await stock_aggregator.start()
         logger.info("✅ Aplicação iniciada com sucesso!")
     except Exception as e:
         logger.error(f"❌ Erro ao inicializar aplicação: {str(e)}")
@@ -37,6 +63,11 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("🛑 Encerrando aplicação...")
+    # Grava as movimentações de estoque ainda em memória
+    await stock_aggregator.stop()
+    await image_pipeline.shutdown()
+    await read_router.stop()
+    await async_engine.dispose()
 
 # Criar instância do FastAPI
 app = FastAPI(
@@ -55,8 +86,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Compressão gzip/brotli das respostas acima de COMPRESSION_MINIMUM_SIZE bytes
+app.add_middleware(CompressionMiddleware)
+
+# Métricas por rota (latência, status, uso do banco) e log por requisição
+# (LOG_REQUESTS=false desativa o log)
+app.add_middleware(MetricsMiddleware)
+
+# Leitura do primário logo após uma escrita do cliente (com réplicas configuradas)
+app.add_middleware(ReadYourWritesMiddleware, router=read_router)
+
 # Handler global para exceções
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
@@ -83,14 +125,36 @@ async def root():
 async def health_check():
     """
     Endpoint para verificar saúde da aplicação
+
+    Usa as estatísticas do pool de conexões; o banco só é consultado quando
+    não houve atividade recente. Com o pool saturado o status é "degraded".
     """
-    db_status = check_database_connection(retries=1)
+    db = await database_health()
     
-    return {
-        "status": "healthy" if db_status else "unhealthy",
-        "database": "connected" if db_status else "disconnected",
+    if not db["connected"]:
+        app_status = "unhealthy"
+    elif db["pool"]["saturation"] >= 1:
+        app_status = "degraded"
+    else:
+        app_status = "healthy"
+    
+    health = {
+        "status": app_status,
+        "database": "connected" if db["connected"] else "disconnected",
+        "pool": db["pool"],
         "version": "1.0.0"
     }
+    # Réplicas fora do rodízio não afetam o status: as leituras vão para o primário
+    if "replicas" in db:
+        health["replicas"] = db["replicas"]
+    return health
+
+@app.get("/metrics", tags=["health"], include_in_schema=False)
+async def metrics():
+    """
+    Métricas da aplicação no formato texto do Prometheus
+    """
+    return Response(content=render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 # Registrar routers
 app.include_router(
@@ -108,29 +172,29 @@ app.include_router(
     prefix="/api/v1"
 )
 
-# Middleware para logging de requests (opcional)
-@app.middleware("http")
-async def log_requests(request, call_next):
-    """
-    Middleware para log de todas as requisições
-    """
-    start_time = time.time()
-    
-    response = await call_next(request)
-    
-    process_time = time.time() - start_time
-    logger.info(
-        f"{request.method} {request.url.path} - "
-        f"Status: {response.status_code} - "
-        f"Time: {process_time:.4f}s"
-    )
-    
-    return response
+app.include_router(
+    stock_router,
+    prefix="/api/v1"
+)
+
+app.include_router(
+    sync_router,
+    prefix="/api/v1"
+)
+
+app.include_router(
+    images_router,
+    prefix="/api/v1"
+)
+
+app.include_router(
+    stats_router,
+    prefix="/api/v1"
+)
 
-# Para desenvolvimento local
+# Para desenvolvimento local (em produção, use serve.py)
 if __name__ == "__main__":
     import uvicorn
-    import time
     
     uvicorn.run(
         "main:app",
@@ -0,0 +1,378 @@
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from cache import list_cache
+from cache_sync import product_cache_sync
+from database import async_engine, async_pool_stats, engine, pool_stats, read_router
+from pool_stats import PoolStats
+from single_flight import FLIGHT_GROUPS
+from stock import stock_aggregator
+
+logger = logging.getLogger(__name__)
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+# Content-type do formato texto de exposição do Prometheus
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Liga/desliga a linha de log por requisição
+LOG_REQUESTS = os.getenv("LOG_REQUESTS", "true").strip().lower() in ("1", "true", "yes", "on")
+
+# Buckets padrão de latência (segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Buckets para contagem de queries por requisição
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Base das métricas: nome, descrição, rótulos e lock"""
+    metric_type = ""
+    
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+    
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.metric_type}"]
+
+
+class Counter(_Metric):
+    metric_type = "counter"
+    
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+    
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labels, values)} {value}" for values, value in items
+        ]
+
+
+class Gauge(Counter):
+    metric_type = "gauge"
+    
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(_Metric):
+    metric_type = "histogram"
+    
+    def __init__(self, name: str, description: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        # rótulos -> [contagem por bucket..., soma, total]
+        self._values: Dict[LabelValues, List[float]] = {}
+    
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(label_values)
+            if data is None:
+                data = self._values[label_values] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                data[index] += 1
+            data[-2] += value
+            data[-1] += 1
+    
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((values, list(data)) for values, data in self._values.items())
+        lines = self._header()
+        for values, data in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, data):
+                cumulative += count
+                bucket_labels = _format_labels(self.labels, values, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            bucket_labels = _format_labels(self.labels, values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {data[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {round(data[-2], 6)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {data[-1]}")
+        return lines
+
+
+# Métricas HTTP
+http_requests_total = Counter(
+    "http_requests_total", "Requisições HTTP concluídas", ("method", "route", "status")
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "Latência das requisições HTTP", ("method", "route")
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "Requisições HTTP em andamento"
+)
+http_request_db_queries = Histogram(
+    "http_request_db_queries", "Queries ao banco por requisição", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+http_request_db_seconds = Histogram(
+    "http_request_db_seconds", "Tempo gasto no banco por requisição", ("method", "route")
+)
+
+# Métricas do banco
+db_queries_total = Counter("db_queries_total", "Queries executadas", ("engine",))
+db_query_duration_seconds = Histogram("db_query_duration_seconds", "Duração das queries", ("engine",))
+
+REGISTRY = [
+    http_requests_total,
+    http_request_duration_seconds,
+    http_requests_in_flight,
+    http_request_db_queries,
+    http_request_db_seconds,
+    db_queries_total,
+    db_query_duration_seconds,
+]
+
+
+class RequestDBStats:
+    """Queries e tempo de banco acumulados durante uma requisição"""
+    __slots__ = ("queries", "seconds")
+    
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# Estatísticas de banco da requisição atual (propagadas para o threadpool e greenlets)
+current_request_db: contextvars.ContextVar[Optional[RequestDBStats]] = contextvars.ContextVar(
+    "current_request_db", default=None
+)
+
+
+def instrument_engine(target: Engine, name: str) -> None:
+    """Registra eventos que medem cada query executada pelo engine"""
+    # O início fica no contexto de execução da query: uma query com erro não
+    # chega ao after_cursor_execute e não deixa resíduo na conexão do pool
+    @event.listens_for(target, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        context.query_started_at = time.perf_counter()
+    
+    @event.listens_for(target, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context.query_started_at
+        db_queries_total.inc(name)
+        db_query_duration_seconds.observe(elapsed, name)
+        stats = current_request_db.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+
+
+instrument_engine(engine, "sync")
+instrument_engine(async_engine.sync_engine, "async")
+for _replica in read_router.replicas:
+    instrument_engine(_replica.engine.sync_engine, _replica.name)
+
+
+def _route_template(scope) -> str:
+    """Template da rota atendida (ex.: /api/v1/products/{product_id})"""
+    # Versões recentes do FastAPI guardam o caminho completo da rota (com o
+    # prefixo do router incluído) no contexto efetivo; nas anteriores, a
+    # própria rota já tem o caminho completo
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    path = getattr(context, "path", None) or getattr(scope.get("route"), "path", None)
+    return path or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede latência, status, requisições em andamento e o
+    uso do banco por requisição, rotulando pela rota (template) e não pelo
+    caminho bruto. Opcionalmente escreve uma linha de log por requisição.
+    """
+    def __init__(self, app, log_requests: bool = LOG_REQUESTS):
+        self.app = app
+        self.log_requests = log_requests
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        status_code = 500
+        
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        db_stats = RequestDBStats()
+        token = current_request_db.set(db_stats)
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec()
+            current_request_db.reset(token)
+            
+            route_path = _route_template(scope)
+            method = scope["method"]
+            
+            http_requests_total.inc(method, route_path, str(status_code))
+            http_request_duration_seconds.observe(elapsed, method, route_path)
+            http_request_db_queries.observe(db_stats.queries, method, route_path)
+            http_request_db_seconds.observe(db_stats.seconds, method, route_path)
+            
+            if self.log_requests:
+                logger.info(
+                    "%s %s - Status: %s - Time: %.4fs - DB: %d queries/%.4fs",
+                    method, scope["path"], status_code, elapsed, db_stats.queries, db_stats.seconds
+                )
+
+
+# Métricas do pool: chave do snapshot -> (nome, tipo, descrição)
+_POOL_METRICS = [
+    ("size", "db_pool_size", "gauge", "Conexões mantidas pelo pool"),
+    ("checked_out", "db_pool_checked_out", "gauge", "Conexões em uso"),
+    ("overflow", "db_pool_overflow", "gauge", "Conexões abertas além de pool_size"),
+    ("max_connections", "db_pool_max_connections", "gauge", "Limite de conexões (pool_size + max_overflow)"),
+    ("saturation", "db_pool_saturation", "gauge", "Fração do limite de conexões em uso"),
+    ("checkouts_total", "db_pool_checkouts_total", "counter", "Checkouts de conexão"),
+    ("checkout_timeouts_total", "db_pool_checkout_timeouts_total", "counter", "Checkouts que excederam pool_timeout"),
+    ("checkout_wait_seconds_total", "db_pool_checkout_wait_seconds_total", "counter", "Tempo total de espera no checkout"),
+    ("checkout_wait_seconds_max", "db_pool_checkout_wait_seconds_max", "gauge", "Maior espera no checkout"),
+    ("connects_total", "db_pool_connects_total", "counter", "Conexões abertas com o banco"),
+    ("connect_seconds_total", "db_pool_connect_seconds_total", "counter", "Tempo total abrindo conexões"),
+    ("connect_seconds_max", "db_pool_connect_seconds_max", "gauge", "Maior tempo de abertura de conexão"),
+    ("disconnect_errors_total", "db_pool_disconnect_errors_total", "counter", "Erros de desconexão detectados"),
+]
+
+
+def _pool_lines(pools: Iterable[PoolStats]) -> List[str]:
+    snapshots = [(stats.name, stats.snapshot()) for stats in pools]
+    lines = []
+    for key, name, metric_type, description in _POOL_METRICS:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for pool_name, snapshot in snapshots:
+            lines.append(f'{name}{{pool="{pool_name}"}} {snapshot[key]}')
+    return lines
+
+
+def _replica_lines() -> List[str]:
+    if not read_router.enabled:
+        return []
+    snapshot = read_router.snapshot()
+    lines = [
+        "# HELP db_replica_healthy Réplica no rodízio de leituras (1) ou fora (0)",
+        "# TYPE db_replica_healthy gauge",
+    ]
+    for name, replica in snapshot["replicas"].items():
+        lines.append(f'db_replica_healthy{{replica="{name}"}} {int(replica["healthy"])}')
+    lines.extend([
+        "# HELP db_replica_lag_seconds Atraso de replicação na última verificação",
+        "# TYPE db_replica_lag_seconds gauge",
+    ])
+    for name, replica in snapshot["replicas"].items():
+        lines.append(f'db_replica_lag_seconds{{replica="{name}"}} {replica["lag_seconds"]}')
+    lines.extend([
+        "# HELP db_routed_reads_total Leituras roteadas por destino",
+        "# TYPE db_routed_reads_total counter",
+        f'db_routed_reads_total{{target="replica"}} {snapshot["replica_reads"]}',
+        f'db_routed_reads_total{{target="primary"}} {snapshot["primary_reads"]}',
+    ])
+    return lines
+
+
+def _single_flight_lines() -> List[str]:
+    lines = [
+        "# HELP single_flight_calls_total Leituras executadas (leader) e atendidas pela execução de outra (shared)",
+        "# TYPE single_flight_calls_total counter",
+    ]
+    for group in FLIGHT_GROUPS:
+        snapshot = group.snapshot()
+        lines.append(f'single_flight_calls_total{{group="{group.name}",role="leader"}} {snapshot["leaders"]}')
+        lines.append(f'single_flight_calls_total{{group="{group.name}",role="shared"}} {snapshot["shared"]}')
+    return lines
+
+
+def _list_cache_lines() -> List[str]:
+    snapshot = list_cache.snapshot()
+    return [
+        "# HELP list_cache_requests_total Consultas ao cache de páginas da listagem de produtos",
+        "# TYPE list_cache_requests_total counter",
+        f'list_cache_requests_total{{result="hit"}} {snapshot["hits"]}',
+        f'list_cache_requests_total{{result="miss"}} {snapshot["misses"]}',
+        "# HELP list_cache_evictions_total Páginas removidas do cache para respeitar o limite de memória",
+        "# TYPE list_cache_evictions_total counter",
+        f"list_cache_evictions_total {snapshot['evictions']}",
+        "# HELP list_cache_entries Páginas em cache",
+        "# TYPE list_cache_entries gauge",
+        f"list_cache_entries {snapshot['entries']}",
+        "# HELP list_cache_bytes Bytes das páginas em cache (limite: LIST_CACHE_MAX_BYTES)",
+        "# TYPE list_cache_bytes gauge",
+        f"list_cache_bytes {snapshot['bytes']}",
+    ]
+
+
+def _cache_sync_lines() -> List[str]:
+    if not product_cache_sync.enabled:
+        return []
+    return [
+        "# HELP product_cache_sync_clears_total Caches de produtos descartados por escritas de outros processos",
+        "# TYPE product_cache_sync_clears_total counter",
+        f"product_cache_sync_clears_total {product_cache_sync.snapshot()['clears']}",
+    ]
+
+
+def _stock_aggregator_lines() -> List[str]:
+    if not stock_aggregator.enabled:
+        return []
+    snapshot = stock_aggregator.snapshot()
+    return [
+        "# HELP stock_aggregator_pending Movimentações de estoque aguardando gravação",
+        "# TYPE stock_aggregator_pending gauge",
+        f"stock_aggregator_pending {snapshot['pending']}",
+        "# HELP stock_aggregator_flushed_total Movimentações de estoque gravadas pelo agregador",
+        "# TYPE stock_aggregator_flushed_total counter",
+        f"stock_aggregator_flushed_total {snapshot['flushed_movements']}",
+        "# HELP stock_aggregator_failures_total Gravações do agregador com erro (repetidas na descarga seguinte)",
+        "# TYPE stock_aggregator_failures_total counter",
+        f"stock_aggregator_failures_total {snapshot['failures']}",
+    ]
+
+
+def render_metrics() -> str:
+    """Renderiza todas as métricas no formato texto do Prometheus"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    lines.extend(_pool_lines([async_pool_stats, pool_stats] + [replica.stats for replica in read_router.replicas]))
+    lines.extend(_replica_lines())
+    lines.extend(_single_flight_lines())
+    lines.extend(_list_cache_lines())
+    lines.extend(_cache_sync_lines())
+    lines.extend(_stock_aggregator_lines())
+    return "\n".join(lines) + "\n"
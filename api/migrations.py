@@ -0,0 +1,167 @@
+"""
+Migrações de esquema versionadas.
+
+`create_all` só cria tabelas inexistentes: índices e ajustes em tabelas já
+criadas ficam nas migrações abaixo, aplicadas em ordem na inicialização
+(init_db) e registradas em `schema_migrations`. Toda migração deve ser
+idempotente (IF NOT EXISTS / checkfirst), pois também roda em bancos novos,
+cujas tabelas o create_all acabou de criar com os índices dos modelos.
+
+Uso:
+    python migrations.py            # aplica as migrações pendentes
+    python migrations.py --status   # lista as migrações e o estado de cada uma
+"""
+import argparse
+import logging
+import sys
+from typing import Callable, List, Optional, Sequence
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection, Engine
+
+from delta_sync import SYNC_INDEX_DDL
+from models.product import Product, ProductCategory
+from models.schema_migration import SchemaMigration
+from search import POSTGRES_SEARCH_DDL
+
+logger = logging.getLogger(__name__)
+
+# Chave do advisory lock que serializa as migrações entre workers (PostgreSQL)
+_ADVISORY_LOCK_KEY = 74_201_601
+
+
+class Migration:
+    """
+    Passo de migração.
+
+    `dialects` restringe a migração a alguns bancos (None para todos); uma
+    migração `optional` que falhe gera apenas um aviso e é tentada de novo
+    na próxima inicialização.
+    """
+    def __init__(
+        self,
+        version: int,
+        description: str,
+        apply: Callable[[Connection], None],
+        dialects: Optional[Sequence[str]] = None,
+        optional: bool = False
+    ):
+        self.version = version
+        self.description = description
+        self.apply = apply
+        self.dialects = dialects
+        self.optional = optional
+
+    def supports(self, dialect: str) -> bool:
+        return self.dialects is None or dialect in self.dialects
+
+
+def _statements(ddl: Sequence[str]) -> Callable[[Connection], None]:
+    def apply(connection: Connection) -> None:
+        for statement in ddl:
+            connection.execute(text(statement))
+    return apply
+
+
+def _create_model_indexes(*models, prefix: str = "idx_") -> Callable[[Connection], None]:
+    """Cria, em tabelas existentes, os índices declarados em `__table_args__`
+    dos modelos (os de `Field(index=True)` já vêm do create_all/Postgresql.sql)"""
+    def apply(connection: Connection) -> None:
+        for model in models:
+            for index in sorted(model.__table__.indexes, key=lambda item: item.name):
+                if index.name.startswith(prefix):
+                    index.create(connection, checkfirst=True)
+    return apply
+
+
+def _product_filter_indexes(connection: Connection) -> None:
+    _create_model_indexes(Product, ProductCategory)(connection)
+    # Substituído por idx_product_categories_category_product (category_id, product_id)
+    connection.execute(text("DROP INDEX IF EXISTS idx_product_categories_category_id"))
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Índices de updated_at da sincronização incremental", _statements(SYNC_INDEX_DDL)),
+    Migration(
+        2, "Busca textual e por trigramas (pg_trgm)", _statements(POSTGRES_SEARCH_DDL),
+        dialects=("postgresql",), optional=True
+    ),
+    Migration(
+        3, "Índices dos filtros de produtos (marca, medida, status, categoria)", _product_filter_indexes
+    ),
+]
+
+
+def applied_versions(connection: Connection) -> set:
+    return set(connection.execute(select(SchemaMigration.version)).scalars())
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """
+    Aplica as migrações pendentes, cada uma em sua própria transação.
+
+    Returns:
+        List[int]: Versões aplicadas nesta execução
+    """
+    dialect = engine.dialect.name
+    applied: List[int] = []
+    with engine.connect() as connection:
+        if dialect == "postgresql":
+            # Vários workers iniciando juntos: um migra, os outros aguardam
+            connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+            connection.commit()
+        try:
+            done = applied_versions(connection)
+            connection.commit()
+            for migration in MIGRATIONS:
+                if migration.version in done or not migration.supports(dialect):
+                    continue
+                try:
+                    with connection.begin():
+                        migration.apply(connection)
+                        connection.execute(SchemaMigration.__table__.insert().values(
+                            version=migration.version,
+                            description=migration.description
+                        ))
+                except Exception as e:
+                    if not migration.optional:
+                        logger.error(f"❌ Erro na migração {migration.version}: {str(e)}")
+                        raise
+                    logger.warning(f"⚠️ Migração opcional {migration.version} não aplicada: {str(e)}")
+                    continue
+                applied.append(migration.version)
+                logger.info(f"✅ Migração {migration.version} aplicada: {migration.description}")
+        finally:
+            if dialect == "postgresql":
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+                connection.commit()
+    return applied
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Aplica ou lista as migrações de esquema")
+    parser.add_argument("--status", action="store_true", help="Apenas listar o estado das migrações")
+    args = parser.parse_args(argv)
+
+    from database import create_db_and_tables, engine
+
+    if args.status:
+        SchemaMigration.__table__.create(engine, checkfirst=True)
+        with engine.connect() as connection:
+            done = applied_versions(connection)
+        for migration in MIGRATIONS:
+            if migration.version in done:
+                state = "aplicada"
+            elif migration.supports(engine.dialect.name):
+                state = "pendente"
+            else:
+                state = f"não se aplica ({engine.dialect.name})"
+            print(f"{migration.version:>4}  {state:<28} {migration.description}")
+        return 0
+
+    create_db_and_tables()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,6 @@
 from datetime import datetime, timezone
 from typing import Optional, List, TYPE_CHECKING
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import func
 
 if TYPE_CHECKING:
     from models.product import Product
@@ -20,7 +19,7 @@ class Brand(BrandBase, table=True):
     updated_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
         nullable=False,
-        sa_column_kwargs={"onupdate": func.now()}
+        sa_column_kwargs={"onupdate": lambda: datetime.now(timezone.utc)}
     )
     
     # Relacionamento com produtos
@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import BigInteger
+from sqlmodel import SQLModel, Field
+
+from models.product import MeasureEnum
+
+# Dimensões agregadas na tabela catalog_stats
+STAT_DIMENSIONS = ("total", "status", "brand", "category", "measure_type")
+
+class CatalogStat(SQLModel, table=True):
+    """Agregado do catálogo por dimensão, recalculado por catalog_stats.refresh"""
+    __tablename__ = "catalog_stats"
+
+    dimension: str = Field(primary_key=True, max_length=20)
+    # Valor da dimensão como texto ("" para produtos sem marca/medida)
+    key: str = Field(primary_key=True, max_length=50)
+    products: int = Field(0)
+    active: int = Field(0)
+    qtt: int = Field(0, sa_type=BigInteger)
+    refreshed_at: datetime = Field(nullable=False)
+
+class StatBucket(SQLModel):
+    # Produtos no grupo, produtos ativos e soma do estoque (qtt)
+    products: int
+    active: int
+    qtt: int
+
+class StatusStat(StatBucket):
+    status: bool
+
+class BrandStat(StatBucket):
+    # None agrupa os produtos sem marca
+    brand_id: Optional[int] = None
+    name: Optional[str] = None
+
+class CategoryStat(StatBucket):
+    category_id: int
+    name: Optional[str] = None
+
+class MeasureTypeStat(StatBucket):
+    # None agrupa os produtos sem tipo de medida
+    measure_type: Optional[MeasureEnum] = None
+
+class CatalogStatsRead(SQLModel):
+    # Momento do cálculo dos agregados e idade em segundos
+    refreshed_at: datetime
+    age_seconds: float
+
+    totals: StatBucket
+    by_status: List[StatusStat]
+    by_brand: List[BrandStat]
+    by_category: List[CategoryStat]
+    by_measure_type: List[MeasureTypeStat]
@@ -1,14 +1,19 @@
 from datetime import datetime, timezone
-from typing import Optional, List, TYPE_CHECKING
+from typing import Optional, List, Dict, TYPE_CHECKING
 from decimal import Decimal
 from enum import Enum
+from sqlalchemy import Index, text
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import func
+
+from models.product_image import ProductImageRead
 
 if TYPE_CHECKING:
     from models.brand import Brand
     from models.category import Category
 
+# Quantidade máxima de códigos por requisição de busca em lote
+MAX_BARCODE_BATCH = 1000
+
 # Enum para tipos de medida
 class MeasureEnum(str, Enum):
     LITER = "l"
@@ -20,6 +25,12 @@ class MeasureEnum(str, Enum):
 # Tabela de relacionamento N:N entre produtos e categorias
 class ProductCategory(SQLModel, table=True):
     __tablename__ = "product_categories"
+    __table_args__ = (
+        # Categorias de uma página de produtos (carregamento das relações)
+        Index("idx_product_categories_product_id", "product_id"),
+        # Filtro por categoria: a junção usa só o índice, sem ler a tabela
+        Index("idx_product_categories_category_product", "category_id", "product_id"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     product_id: int = Field(foreign_key="products.id")
@@ -44,8 +55,20 @@ class ProductBase(SQLModel):
     status: bool = Field(True)
     images: Optional[str] = Field(None)
 
+def _partial(condition: str) -> dict:
+    """Condição de índice parcial (PostgreSQL e SQLite)"""
+    return {"postgresql_where": text(condition), "sqlite_where": text(condition)}
+
 class Product(ProductBase, table=True):
     __tablename__ = "products"
+    # Índices dos filtros da listagem, paginada por id (ver migrations.py);
+    # os parciais deixam de fora produtos sem marca/medida, que esses
+    # filtros nunca retornam
+    __table_args__ = (
+        Index("idx_products_brand_id", "brand_id", "id", **_partial("brand_id IS NOT NULL")),
+        Index("idx_products_measure_type", "measure_type", "id", **_partial("measure_type IS NOT NULL")),
+        Index("idx_products_status", "status", "id"),
+    )
     
     id: Optional[int] = Field(default=None, primary_key=True)
     created_at: datetime = Field(
@@ -55,7 +78,7 @@ class Product(ProductBase, table=True):
     updated_at: datetime = Field(
         default_factory=lambda: datetime.now(timezone.utc),
         nullable=False,
-        sa_column_kwargs={"onupdate": func.now()}
+        sa_column_kwargs={"onupdate": lambda: datetime.now(timezone.utc)}
     )
     
     # Relacionamentos
@@ -75,6 +98,9 @@ class ProductRead(ProductBase):
     
     # Lista de categorias
     categories: Optional[List["Category"]] = None
+    
+    # Imagens enviadas com miniaturas prontas (URLs por tamanho)
+    gallery: List[ProductImageRead] = []
 
 class ProductUpdate(SQLModel):
     barcode: Optional[str] = Field(None, max_length=50)
@@ -88,4 +114,35 @@ class ProductUpdate(SQLModel):
     images: Optional[str] = Field(None)
     category_ids: Optional[List[int]] = Field(None, description="IDs das categorias")
 
-    
\ No newline at end of file
+class ProductBarcodeBatch(SQLModel):
+    barcodes: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_BARCODE_BATCH,
+        description="Códigos de barras a resolver"
+    )
+
+class ProductBarcodeBatchRead(SQLModel):
+    # Produtos encontrados, indexados pelo código enviado
+    found: Dict[str, ProductRead]
+    
+    # Códigos sem produto cadastrado
+    missing: List[str]
+
+class ProductImportError(SQLModel):
+    # Linha do arquivo (1 = primeiro registro)
+    line: int
+    barcode: Optional[str] = None
+    error: str
+
+class ProductImportChunk(SQLModel):
+    chunk: int
+    rows: int
+    upserted: int
+    errors: List[ProductImportError] = []
+
+class ProductImportReport(SQLModel):
+    total_rows: int = 0
+    upserted: int = 0
+    failed: int = 0
+    chunks: List[ProductImportChunk] = []
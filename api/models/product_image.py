@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+from typing import Dict, Optional
+from sqlmodel import SQLModel, Field
+
+# Estados do processamento das miniaturas
+IMAGE_STATUSES = ("pending", "ready", "failed")
+
+class ProductImage(SQLModel, table=True):
+    """Imagem enviada de um produto; as miniaturas são geradas em segundo plano"""
+    __tablename__ = "product_images"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    product_id: int = Field(foreign_key="products.id", index=True)
+    # Prefixo dos arquivos no armazenamento, derivado do conteúdo (sha256)
+    key: str = Field(..., max_length=100)
+    # Extensão do original (jpg, png ou webp)
+    original_format: str = Field(..., max_length=10)
+    width: int = Field(...)
+    height: int = Field(...)
+    status: str = Field(default="pending", max_length=20)
+    # Miniaturas geradas, separadas por vírgula (ex.: "160.webp,160.jpg")
+    variants: Optional[str] = Field(None)
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+    updated_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        nullable=False,
+        sa_column_kwargs={"onupdate": lambda: datetime.now(timezone.utc)}
+    )
+
+class ProductImageRead(SQLModel):
+    id: int
+    status: str
+    width: int
+    height: int
+    # URL do arquivo enviado
+    original: str
+    # URLs das miniaturas por tamanho (maior lado, em pixels) e formato,
+    # ex.: {"160": {"webp": "...", "jpg": "..."}}
+    thumbnails: Dict[str, Dict[str, str]] = {}
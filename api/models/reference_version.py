@@ -0,0 +1,12 @@
+from sqlmodel import SQLModel, Field
+
+class ReferenceVersion(SQLModel, table=True):
+    """Contador de versão dos dados de referência (marcas e categorias).
+
+    Incrementado na mesma transação de cada escrita; os workers comparam o
+    valor com a versão carregada para saber quando recarregar o cache.
+    """
+    __tablename__ = "reference_versions"
+    
+    name: str = Field(primary_key=True, max_length=50)
+    version: int = Field(default=0, nullable=False)
@@ -0,0 +1,14 @@
+from datetime import datetime, timezone
+
+from sqlmodel import SQLModel, Field
+
+class SchemaMigration(SQLModel, table=True):
+    """Migração de esquema já aplicada ao banco (ver migrations.py)"""
+    __tablename__ = "schema_migrations"
+    
+    version: int = Field(primary_key=True)
+    description: str = Field(max_length=255)
+    applied_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
@@ -0,0 +1,64 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+# Quantidade máxima de movimentações por requisição em lote
+MAX_STOCK_BATCH = 1000
+
+class StockMovement(SQLModel, table=True):
+    """Movimentação de estoque (somente inclusão), gravada com a alteração de products.qtt"""
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        # Histórico de um produto, paginado por id
+        Index("idx_stock_movements_product_id", "product_id", "id"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    # Sem chave estrangeira: o histórico é mantido após a exclusão do produto
+    product_id: int = Field(...)
+    delta: int = Field(...)
+    # Estoque do produto logo após a movimentação
+    qtt_after: int = Field(...)
+    # Movimentações somadas nesta linha (> 1 quando agregadas em memória)
+    movements: int = Field(1)
+    reason: Optional[str] = Field(None, max_length=50)
+    reference: Optional[str] = Field(None, max_length=100)
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        nullable=False
+    )
+
+class StockMovementCreate(SQLModel):
+    delta: int = Field(..., description="Quantidade a somar ao estoque (negativa para saídas)")
+    reason: Optional[str] = Field(None, max_length=50, description="Ex.: sale, purchase, adjustment")
+    reference: Optional[str] = Field(None, max_length=100, description="Documento de origem (pedido, nota)")
+
+class StockMovementBatchItem(StockMovementCreate):
+    product_id: int
+
+class StockMovementBatch(SQLModel):
+    movements: List[StockMovementBatchItem] = Field(
+        ...,
+        min_length=1,
+        max_length=MAX_STOCK_BATCH,
+        description="Movimentações aplicadas em uma única transação"
+    )
+
+class StockMovementRead(SQLModel):
+    id: int
+    product_id: int
+    delta: int
+    qtt_after: int
+    movements: int
+    reason: Optional[str] = None
+    reference: Optional[str] = None
+    created_at: datetime
+
+class StockMovementBatchRead(SQLModel):
+    movements: List[StockMovementRead]
+
+class StockMovementQueued(SQLModel):
+    # Movimentações aceitas pelo agregador, gravadas na próxima descarga
+    queued: int
+    flush_interval: float
@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import List
+from sqlmodel import SQLModel
+
+from models.brand import BrandRead
+from models.category import CategoryRead
+from models.product import ProductBase
+
+class SyncProduct(ProductBase):
+    id: int
+    created_at: datetime
+    updated_at: datetime
+
+class SyncProductCategory(SQLModel):
+    product_id: int
+    category_id: int
+
+class SyncDeleted(SQLModel):
+    products: List[int] = []
+    brands: List[int] = []
+    categories: List[int] = []
+
+class SyncRead(SQLModel):
+    # Token a ser enviado em `since` na próxima chamada
+    token: str
+    
+    # True quando há mais produtos a buscar antes de concluir esta sincronização
+    has_more: bool
+    
+    # True quando o cliente deve descartar os dados locais (token ausente ou expirado)
+    reset: bool
+    
+    products: List[SyncProduct]
+    brands: List[BrandRead]
+    categories: List[CategoryRead]
+    
+    # Conjunto completo de ligações de cada produto retornado em `products`
+    product_categories: List[SyncProductCategory]
+    
+    deleted: SyncDeleted
@@ -0,0 +1,19 @@
+from datetime import datetime, timezone
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+# Entidades com exclusão registrada para a sincronização incremental
+TOMBSTONE_ENTITIES = ("product", "brand", "category")
+
+class Tombstone(SQLModel, table=True):
+    """Registro de uma exclusão física, consultado por GET /sync"""
+    __tablename__ = "tombstones"
+    
+    id: Optional[int] = Field(default=None, primary_key=True)
+    entity: str = Field(..., max_length=20)
+    entity_id: int = Field(...)
+    deleted_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        nullable=False,
+        index=True
+    )
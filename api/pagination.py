@@ -0,0 +1,81 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, Response, status
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+# Header com o cursor da próxima página (ausente na última página)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """Gera um cursor opaco (base64 url-safe) a partir da posição na listagem"""
+    raw = json.dumps(position, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decodifica um cursor gerado por encode_cursor.
+
+    Raises:
+        HTTPException: 400 se o cursor for inválido
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+        if not isinstance(position, dict):
+            raise ValueError("cursor must encode an object")
+        return position
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+async def keyset_page(
+    session: AsyncSession,
+    query,
+    column,
+    limit: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = 0
+) -> List[Any]:
+    """
+    Executa uma consulta paginada por chave (keyset) sobre uma coluna única.
+
+    A consulta é ordenada pela coluna e filtrada por `column > último valor`,
+    de forma que o custo não cresce com a profundidade da página. Um registro
+    extra é buscado para saber se existe próxima página; nesse caso o cursor
+    é enviado no header X-Next-Cursor.
+
+    `skip` é mantido apenas para compatibilidade e é ignorado quando há cursor.
+    """
+    query = query.order_by(column)
+    
+    if cursor:
+        position = decode_cursor(cursor)
+        try:
+            # Valor do tipo da coluna: um cursor forjado não chega ao driver
+            after = column.type.python_type(position[column.key])
+        except (KeyError, TypeError, ValueError, OverflowError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        query = query.where(column > after)
+    elif skip:
+        query = query.offset(skip)
+    
+    rows = (await session.exec(query.limit(limit + 1))).all()
+    
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            {column.key: getattr(rows[-1], column.key)}
+        )
+    
+    return rows
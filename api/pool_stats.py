@@ -0,0 +1,136 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class PoolStats:
+    """
+    Estatísticas de um pool de conexões, alimentadas por eventos do SQLAlchemy.
+
+    Guarda contadores acumulados (checkouts, conexões abertas, timeouts) e os
+    tempos de espera no checkout e de abertura de conexão. Os valores
+    instantâneos (conexões em uso, overflow) são lidos do próprio pool.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self.engine: Optional[Engine] = None
+        self.max_connections: Optional[int] = None
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_timeouts = 0
+        self.checkout_wait_seconds = 0.0
+        self.checkout_wait_max_seconds = 0.0
+        self.connects = 0
+        self.connect_seconds = 0.0
+        self.connect_max_seconds = 0.0
+        self.disconnect_errors = 0
+        self.last_checkout_at: Optional[float] = None
+        self.last_error_at: Optional[float] = None
+    
+    def observe_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkout_wait_seconds += seconds
+            self.checkout_wait_max_seconds = max(self.checkout_wait_max_seconds, seconds)
+            if timed_out:
+                self.checkout_timeouts += 1
+    
+    def observe_connect(self, seconds: float) -> None:
+        with self._lock:
+            self.connects += 1
+            self.connect_seconds += seconds
+            self.connect_max_seconds = max(self.connect_max_seconds, seconds)
+    
+    def observe_checkout(self) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.last_checkout_at = time.monotonic()
+    
+    def observe_disconnect(self) -> None:
+        with self._lock:
+            self.disconnect_errors += 1
+            self.last_error_at = time.monotonic()
+    
+    def recently_healthy(self, window: float) -> bool:
+        """True se houve checkout bem-sucedido na janela e nenhum erro depois dele"""
+        last_checkout = self.last_checkout_at
+        if last_checkout is None or time.monotonic() - last_checkout > window:
+            return False
+        return self.last_error_at is None or self.last_error_at < last_checkout
+    
+    def snapshot(self) -> Dict[str, float]:
+        """Valores atuais do pool e contadores acumulados"""
+        pool = self.engine.pool if self.engine is not None else None
+        checked_out = pool.checkedout() if isinstance(pool, QueuePool) else 0
+        data = {
+            "size": pool.size() if isinstance(pool, QueuePool) else 0,
+            "checked_out": checked_out,
+            "overflow": max(pool.overflow(), 0) if isinstance(pool, QueuePool) else 0,
+            "max_connections": self.max_connections or 0,
+            "saturation": round(checked_out / self.max_connections, 4) if self.max_connections else 0.0,
+        }
+        with self._lock:
+            data.update({
+                "checkouts_total": self.checkouts,
+                "checkout_timeouts_total": self.checkout_timeouts,
+                "checkout_wait_seconds_total": round(self.checkout_wait_seconds, 6),
+                "checkout_wait_seconds_max": round(self.checkout_wait_max_seconds, 6),
+                "connects_total": self.connects,
+                "connect_seconds_total": round(self.connect_seconds, 6),
+                "connect_seconds_max": round(self.connect_max_seconds, 6),
+                "disconnect_errors_total": self.disconnect_errors,
+            })
+        return data
+
+
+def instrumented_pool_class(base, stats: PoolStats):
+    """
+    Cria uma subclasse do pool que mede o tempo de espera no checkout.
+
+    A classe fica ligada às estatísticas, então continua instrumentada quando
+    o SQLAlchemy recria o pool (ex.: engine.dispose()).
+    """
+    class InstrumentedPool(base):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                connection = super()._do_get()
+            except TimeoutError:
+                stats.observe_wait(time.perf_counter() - start, timed_out=True)
+                raise
+            stats.observe_wait(time.perf_counter() - start)
+            return connection
+    
+    InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+    return InstrumentedPool
+
+
+def attach_pool_stats(engine: Engine, stats: PoolStats, max_connections: Optional[int] = None) -> PoolStats:
+    """Registra os eventos do engine que alimentam as estatísticas do pool"""
+    stats.engine = engine
+    stats.max_connections = max_connections
+    
+    @event.listens_for(engine, "do_connect")
+    def _before_connect(dialect, connection_record, cargs, cparams):
+        connection_record.info["connect_started_at"] = time.perf_counter()
+    
+    @event.listens_for(engine, "connect")
+    def _after_connect(dbapi_connection, connection_record):
+        started = connection_record.info.pop("connect_started_at", None)
+        if started is not None:
+            stats.observe_connect(time.perf_counter() - started)
+    
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        stats.observe_checkout()
+    
+    @event.listens_for(engine, "handle_error")
+    def _on_error(context):
+        if context.is_disconnect:
+            stats.observe_disconnect()
+    
+    return stats
@@ -0,0 +1,113 @@
+"""
+Projeção das leituras de produtos (parâmetros `fields` e `expand`).
+
+Sem os parâmetros a resposta é a completa (formato de ProductRead). Com
+qualquer um deles, cada produto traz só as colunas de `fields` (todas, se
+omitido; `id` sempre) e só as relações de `expand` (`brand`, `categories`,
+`gallery`). A consulta seleciona apenas as colunas necessárias e as
+relações não pedidas não são carregadas.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Bundle
+
+from models.product import Product
+from serialization import BRAND_COLUMNS, CATEGORY_COLUMNS, PRODUCT_COLUMNS, model_payload, product_payloads
+
+# Relações que podem ser incluídas com `expand`
+PRODUCT_RELATIONS = ("brand", "categories", "gallery")
+
+# Descrições dos parâmetros nas rotas
+FIELDS_DESCRIPTION = f"Colunas do produto, separadas por vírgula ({', '.join(PRODUCT_COLUMNS)})"
+EXPAND_DESCRIPTION = f"Relações incluídas, separadas por vírgula ({', '.join(PRODUCT_RELATIONS)})"
+
+
+class ProductProjection:
+    """Colunas e relações de uma leitura de produtos"""
+    def __init__(self, fields: Tuple[str, ...] = PRODUCT_COLUMNS, expand: Tuple[str, ...] = PRODUCT_RELATIONS):
+        self.fields = fields
+        self.expand = expand
+        self.full = fields == PRODUCT_COLUMNS and expand == PRODUCT_RELATIONS
+        # Identifica a projeção em chaves de cache e ETags
+        self.key = (fields, expand)
+
+        # Colunas lidas: as pedidas e as usadas internamente (marca da
+        # resposta, validadores de cache)
+        internal = ("id", "brand_id", "updated_at") if "brand" in expand else ("id", "updated_at")
+        names = [name for name in PRODUCT_COLUMNS if name in fields or name in internal]
+        self.entity = Product if self.full else Bundle("product", *[getattr(Product, name) for name in names])
+
+    def payloads(
+        self,
+        rows: Iterable[Any],
+        brands: Dict[int, Any],
+        categories_by_product: Dict[int, List[Any]],
+        gallery_by_product: Optional[Dict[int, List[Dict[str, Any]]]] = None
+    ) -> List[Dict[str, Any]]:
+        """Respostas das linhas lidas com `entity`"""
+        if self.full:
+            return product_payloads(rows, brands, categories_by_product, gallery_by_product)
+
+        brand_payloads: Dict[int, Optional[Dict[str, Any]]] = {}
+        category_payloads: Dict[int, Dict[str, Any]] = {}
+        payloads = []
+        for row in rows:
+            values = row._mapping
+            payload = {name: values[name] for name in self.fields}
+
+            if "brand" in self.expand:
+                brand_id = values["brand_id"]
+                if brand_id not in brand_payloads:
+                    brand = brands.get(brand_id)
+                    brand_payloads[brand_id] = model_payload(brand, BRAND_COLUMNS) if brand is not None else None
+                payload["brand"] = brand_payloads[brand_id]
+
+            if "categories" in self.expand:
+                categories = []
+                for category in categories_by_product.get(values["id"], []):
+                    key = id(category)
+                    if key not in category_payloads:
+                        category_payloads[key] = model_payload(category, CATEGORY_COLUMNS)
+                    categories.append(category_payloads[key])
+                payload["categories"] = categories
+
+            if "gallery" in self.expand:
+                payload["gallery"] = gallery_by_product.get(values["id"], []) if gallery_by_product else []
+
+            payloads.append(payload)
+
+        return payloads
+
+
+FULL_PROJECTION = ProductProjection()
+
+
+def _parse_list(value: str, allowed: Tuple[str, ...], name: str) -> Tuple[str, ...]:
+    requested = {item.strip() for item in value.split(",") if item.strip()}
+    unknown = sorted(requested - set(allowed))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown {name}: {', '.join(unknown)}"
+        )
+    # Ordem canônica: a mesma projeção sempre gera a mesma chave
+    return tuple(item for item in allowed if item in requested)
+
+
+def parse_projection(fields: Optional[str], expand: Optional[str]) -> ProductProjection:
+    """
+    Projeção dos parâmetros `fields` e `expand` da requisição.
+
+    Raises:
+        HTTPException: 400 para colunas ou relações desconhecidas
+    """
+    if fields is None and expand is None:
+        return FULL_PROJECTION
+    selected = _parse_list(fields, PRODUCT_COLUMNS, "fields") if fields is not None else PRODUCT_COLUMNS
+    if "id" not in selected:
+        selected = tuple(name for name in PRODUCT_COLUMNS if name in selected or name == "id")
+    return ProductProjection(
+        selected,
+        _parse_list(expand, PRODUCT_RELATIONS, "expand") if expand is not None else ()
+    )
@@ -0,0 +1,227 @@
+from dotenv import load_dotenv
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.brand import Brand
+from models.category import Category
+from models.reference_version import ReferenceVersion
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Nome da linha usada pelo backend "database" na tabela reference_versions
+REFERENCE_VERSION_NAME = "brands_categories"
+
+
+class LocalVersionBackend:
+    """
+    Backend sem contador compartilhado: o próprio processo invalida o cache
+    nas suas escritas e, sem como saber das escritas de outros processos,
+    recarrega tudo a cada `poll_interval` segundos.
+
+    Adequado para um único worker; com vários workers, use o backend
+    "database" (padrão) para que escritas em um worker cheguem aos demais.
+    """
+    def __init__(self, poll_interval: float = 30.0):
+        self.poll_interval = poll_interval
+
+    def version_query(self):
+        return None
+
+    def bump_statement(self):
+        return None
+
+
+class DatabaseVersionBackend:
+    """
+    Backend padrão, com contador de versão em uma tabela do banco.
+
+    Cada escrita incrementa o contador na mesma transação; os workers
+    consultam o valor no máximo uma vez a cada `poll_interval` segundos.
+    """
+    def __init__(self, poll_interval: float = 1.0):
+        self.poll_interval = poll_interval
+
+    def version_query(self):
+        return select(ReferenceVersion.version).where(ReferenceVersion.name == REFERENCE_VERSION_NAME)
+
+    def bump_statement(self):
+        return (
+            update(ReferenceVersion)
+            .where(ReferenceVersion.name == REFERENCE_VERSION_NAME)
+            .values(version=ReferenceVersion.version + 1)
+        )
+
+
+def _backend_from_env():
+    name = os.getenv("REFERENCE_CACHE_BACKEND", "database").lower()
+    if name == "database":
+        return DatabaseVersionBackend(float(os.getenv("REFERENCE_CACHE_POLL_INTERVAL", "1.0")))
+    if name != "local":
+        raise ValueError(f"Unknown REFERENCE_CACHE_BACKEND '{name}'")
+    return LocalVersionBackend(float(os.getenv("REFERENCE_CACHE_REFRESH_INTERVAL", "30")))
+
+
+class ReferenceCache:
+    """
+    Cache em memória de marcas e categorias, indexado por id e por nome.
+
+    As consultas são síncronas e não acessam o banco; antes de usá-las, as
+    rotas chamam `resolve` para garantir que o cache está carregado, atual e
+    contém os ids necessários. Os objetos em cache não pertencem a nenhuma
+    sessão e devem ser tratados como somente leitura.
+    """
+    def __init__(self, backend=None):
+        self.backend = backend or DatabaseVersionBackend()
+        self.brands_by_id: Dict[int, Brand] = {}
+        self.brands_by_name: Dict[str, Brand] = {}
+        self.categories_by_id: Dict[int, Category] = {}
+        self.categories_by_name: Dict[str, Category] = {}
+        self.loaded = False
+        self.loads = 0
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        # Incrementado a cada invalidação, para detectar recargas concorrentes
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    async def _read_version(self, session: AsyncSession) -> Optional[int]:
+        query = self.backend.version_query()
+        if query is None:
+            return None
+        return (await session.exec(query)).first()
+
+    async def _ensure_version_row(self, session: AsyncSession) -> None:
+        """Cria a linha do contador de versão, se o backend usar uma"""
+        if self.backend.version_query() is None or await self._read_version(session) is not None:
+            return
+        session.add(ReferenceVersion(name=REFERENCE_VERSION_NAME))
+        try:
+            await session.commit()
+        except IntegrityError:
+            # Outro worker criou a linha ao mesmo tempo
+            await session.rollback()
+
+    async def reload(self, session: AsyncSession) -> None:
+        """Recarrega marcas e categorias do banco"""
+        generation = self._generation
+        async with self._lock:
+            version = await self._read_version(session)
+            # Cópias fora da sessão: o cache não compartilha instâncias com a rota
+            brands = [
+                Brand.model_validate(brand.model_dump())
+                for brand in (await session.exec(select(Brand))).all()
+            ]
+            categories = [
+                Category.model_validate(category.model_dump())
+                for category in (await session.exec(select(Category))).all()
+            ]
+
+            self.brands_by_id = {brand.id: brand for brand in brands}
+            self.brands_by_name = {brand.name: brand for brand in brands}
+            self.categories_by_id = {category.id: category for category in categories}
+            self.categories_by_name = {category.name: category for category in categories}
+            self._version = version
+            self._checked_at = time.monotonic()
+            # Se houve invalidação durante a recarga, os dados podem estar
+            # desatualizados: são usados, mas recarregados no próximo acesso
+            self.loaded = generation == self._generation
+            self.loads += 1
+
+    async def warm(self, session: AsyncSession) -> None:
+        """Carrega o cache na inicialização da aplicação"""
+        await self._ensure_version_row(session)
+        await self.reload(session)
+        logger.info(
+            f"✅ Cache de referência carregado: {len(self.brands_by_id)} marcas, "
+            f"{len(self.categories_by_id)} categorias"
+        )
+
+    async def ensure_fresh(self, session: AsyncSession) -> None:
+        """Recarrega se o cache foi invalidado ou se outro worker alterou os dados"""
+        if not self.loaded:
+            await self.reload(session)
+            return
+
+        if time.monotonic() - self._checked_at < self.backend.poll_interval:
+            return
+        self._checked_at = time.monotonic()
+        # Sem contador de versão (backend local), o intervalo vence o cache
+        if self.backend.version_query() is None or await self._read_version(session) != self._version:
+            await self.reload(session)
+
+    async def resolve(
+        self,
+        session: AsyncSession,
+        brand_ids: Iterable[int] = (),
+        category_ids: Iterable[int] = ()
+    ) -> None:
+        """
+        Garante que o cache está atual e contém os ids informados.
+
+        Ids desconhecidos (por exemplo, criados por outro worker ainda não
+        percebido pelo polling) são buscados pela chave primária; ids
+        inexistentes não provocam recarga das tabelas.
+        """
+        await self.ensure_fresh(session)
+        missing_brands = {brand_id for brand_id in brand_ids if brand_id and brand_id not in self.brands_by_id}
+        missing_categories = {
+            category_id for category_id in category_ids if category_id not in self.categories_by_id
+        }
+        if missing_brands:
+            for brand in (await session.exec(select(Brand).where(Brand.id.in_(missing_brands)))).all():
+                brand = Brand.model_validate(brand.model_dump())
+                self.brands_by_id[brand.id] = brand
+                self.brands_by_name[brand.name] = brand
+        if missing_categories:
+            for category in (await session.exec(
+                select(Category).where(Category.id.in_(missing_categories))
+            )).all():
+                category = Category.model_validate(category.model_dump())
+                self.categories_by_id[category.id] = category
+                self.categories_by_name[category.name] = category
+
+    def brand(self, brand_id: Optional[int]) -> Optional[Brand]:
+        return self.brands_by_id.get(brand_id) if brand_id else None
+
+    def category(self, category_id: int) -> Optional[Category]:
+        return self.categories_by_id.get(category_id)
+
+    def categories(self, category_ids: Iterable[int]) -> List[Category]:
+        """Categorias conhecidas, na ordem dos ids informados"""
+        return [
+            self.categories_by_id[category_id]
+            for category_id in category_ids
+            if category_id in self.categories_by_id
+        ]
+
+    async def mark_changed(self, session: AsyncSession) -> None:
+        """Registra uma escrita; deve ser chamado antes do commit da transação"""
+        statement = self.backend.bump_statement()
+        if statement is not None:
+            await session.exec(statement)
+
+    def mark_changed_sync(self, session: Session) -> None:
+        """Versão síncrona de `mark_changed` (importação em lote)"""
+        statement = self.backend.bump_statement()
+        if statement is not None:
+            session.exec(statement)
+
+    def invalidate(self) -> None:
+        """Descarta o conteúdo local; deve ser chamado após o commit"""
+        self._generation += 1
+        self.loaded = False
+
+
+# Cache compartilhado pelas rotas
+reference_cache = ReferenceCache(_backend_from_env())
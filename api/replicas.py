@@ -0,0 +1,239 @@
+"""
+Roteamento de leituras para réplicas do banco.
+
+Com DATABASE_REPLICA_URLS (ou DATABASE_REPLICA_URL) configurada, a
+dependência `get_async_session` envia requisições GET/HEAD às réplicas em
+rodízio e as demais ao primário. Depois de uma escrita, o mesmo cliente lê
+do primário por REPLICA_STICKY_SECONDS (read-your-writes), reconhecido por
+cookie ou, no mesmo worker, pelo endereço. Uma réplica que falha na
+verificação periódica (ou cujo atraso de replicação passa de
+REPLICA_MAX_LAG_SECONDS) sai do rodízio até voltar a responder; sem
+réplicas saudáveis, tudo vai para o primário.
+"""
+from dotenv import load_dotenv
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from pool_stats import PoolStats
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Janela de leitura no primário após uma escrita do cliente (segundos)
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+# Intervalo e timeout das verificações de saúde das réplicas (segundos)
+REPLICA_HEALTH_INTERVAL = float(os.getenv("REPLICA_HEALTH_INTERVAL", "5"))
+REPLICA_HEALTH_TIMEOUT = float(os.getenv("REPLICA_HEALTH_TIMEOUT", "2"))
+# Atraso de replicação máximo aceito (PostgreSQL)
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "30"))
+
+# Cookie que mantém o cliente no primário logo após uma escrita
+STICKY_COOKIE = "obc_read_primary"
+
+# Métodos atendidos pelas réplicas; os demais vão ao primário
+READ_METHODS = ("GET", "HEAD")
+# Métodos que mantêm o cliente no primário (OPTIONS, p. ex., não altera nada)
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+# Atraso de replicação em segundos (0 quando tudo o que foi recebido já foi
+# aplicado, para não acusar atraso em um primário sem escritas)
+_POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """Erro que indica banco indisponível (e não um erro da consulta)"""
+    if isinstance(error, DBAPIError):
+        return error.connection_invalidated or isinstance(error, OperationalError)
+    return isinstance(error, (OSError, asyncio.TimeoutError))
+
+
+class Replica:
+    """Engine de uma réplica e seu estado de saúde"""
+    def __init__(self, name: str, engine: AsyncEngine, stats: PoolStats):
+        self.name = name
+        self.engine = engine
+        self.stats = stats
+        self.session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        self.healthy = True
+        self.lag_seconds = 0.0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def snapshot(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "lag_seconds": round(self.lag_seconds, 3),
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class ReplicaRouter:
+    """Escolhe o banco de cada requisição: réplica em rodízio ou primário"""
+    def __init__(self, replicas: List[Replica], sticky_seconds: float = REPLICA_STICKY_SECONDS):
+        self.replicas = replicas
+        self.sticky_seconds = sticky_seconds
+        self._next = 0
+        # Endereço do cliente -> instante (monotônico) até o qual lê do primário
+        self._recent_writers: Dict[str, float] = {}
+        # Fim da janela da última escrita de qualquer cliente neste processo
+        self._last_write_until = 0.0
+        self._health_task: Optional[asyncio.Task] = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def pick(self) -> Optional[Replica]:
+        """Próxima réplica saudável no rodízio (None se nenhuma)"""
+        count = len(self.replicas)
+        for _ in range(count):
+            replica = self.replicas[self._next % count]
+            self._next = (self._next + 1) % count
+            if replica.healthy:
+                return replica
+        return None
+
+    def route(self, method: str, client: Optional[str], cookies: Dict[str, str]) -> Optional[Replica]:
+        """Réplica que deve atender a requisição, ou None para o primário"""
+        if not self.replicas or method not in READ_METHODS:
+            return None
+        if STICKY_COOKIE in cookies or self.is_sticky(client):
+            self.primary_reads += 1
+            return None
+        replica = self.pick()
+        if replica is None:
+            self.primary_reads += 1
+        else:
+            self.replica_reads += 1
+        return replica
+
+    def record_write(self, client: Optional[str]) -> None:
+        if not self.replicas:
+            return
+        now = time.monotonic()
+        self._last_write_until = now + self.sticky_seconds
+        if not client:
+            return
+        if len(self._recent_writers) > 10_000:
+            self._recent_writers = {
+                key: until for key, until in self._recent_writers.items() if until > now
+            }
+        self._recent_writers[client] = now + self.sticky_seconds
+
+    def is_sticky(self, client: Optional[str]) -> bool:
+        until = self._recent_writers.get(client) if client else None
+        return until is not None and until > time.monotonic()
+
+    def stale_read_risk(self, session: AsyncSession) -> bool:
+        """Sessão de réplica logo após uma escrita neste processo: o resultado
+        pode não refletir a escrita e não deve ser guardado em cache"""
+        return self._last_write_until > time.monotonic() and any(
+            session.bind is replica.engine for replica in self.replicas
+        )
+
+    def mark_down(self, replica: Replica, error: BaseException) -> None:
+        """Tira a réplica do rodízio até a próxima verificação bem-sucedida"""
+        replica.failures += 1
+        replica.last_error = str(error)
+        if replica.healthy:
+            replica.healthy = False
+            logger.warning(f"⚠️ Réplica {replica.name} fora do rodízio: {str(error)}")
+
+    async def _probe(self, replica: Replica) -> float:
+        async with replica.engine.connect() as connection:
+            if connection.dialect.name == "postgresql":
+                return float(await connection.scalar(_POSTGRES_LAG_QUERY) or 0)
+            await connection.execute(text("SELECT 1"))
+            return 0.0
+
+    async def check(self, replica: Replica) -> bool:
+        """Verifica se a réplica responde e se o atraso está dentro do limite"""
+        try:
+            lag = await asyncio.wait_for(self._probe(replica), REPLICA_HEALTH_TIMEOUT)
+        except Exception as e:
+            self.mark_down(replica, e)
+            return False
+
+        replica.lag_seconds = lag
+        if replica.lag_seconds > REPLICA_MAX_LAG_SECONDS:
+            self.mark_down(replica, RuntimeError(f"replication lag {replica.lag_seconds:.1f}s"))
+            return False
+        if not replica.healthy:
+            logger.info(f"✅ Réplica {replica.name} de volta ao rodízio")
+        replica.healthy = True
+        return True
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+
+    async def _health_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.check_all()
+
+    async def start(self, interval: float = REPLICA_HEALTH_INTERVAL) -> None:
+        """Verifica as réplicas e inicia as verificações periódicas"""
+        if not self.replicas or self._health_task is not None:
+            return
+        await self.check_all()
+        self._health_task = asyncio.get_running_loop().create_task(self._health_loop(interval))
+
+    async def stop(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def snapshot(self) -> dict:
+        return {
+            "replicas": {replica.name: replica.snapshot() for replica in self.replicas},
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+        }
+
+
+class ReadYourWritesMiddleware:
+    """
+    Middleware ASGI que registra as escritas bem-sucedidas de cada cliente.
+
+    O cookie STICKY_COOKIE vale em qualquer worker; clientes sem cookies são
+    reconhecidos pelo endereço apenas no worker que atendeu a escrita.
+    """
+    def __init__(self, app, router: ReplicaRouter):
+        self.app = app
+        self.router = router
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.router.enabled or scope["method"] not in WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                client = scope.get("client")
+                self.router.record_write(client[0] if client else None)
+                cookie = f"{STICKY_COOKIE}=1; Max-Age={int(self.router.sticky_seconds) or 1}; Path=/; HttpOnly; SameSite=Lax"
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"set-cookie", cookie.encode("latin-1"))]
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
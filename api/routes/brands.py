@@ -1,8 +1,19 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
-from database import get_session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import delete, update
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import get_async_session
+from cache import barcode_cache, list_cache
+from pagination import keyset_page, NEXT_CURSOR_HEADER
+from http_cache import conditional_response, latest, make_etag
+from reference_cache import reference_cache
+from delta_sync import record_deletion
+from search import search_by_name, invalidate_search_indexes
+from cache_sync import product_cache_sync
+from single_flight import invalidate_flights
 from models.brand import Brand, BrandCreate, BrandRead, BrandUpdate
+from models.product import Product
 
 router = APIRouter(
     prefix="/brands",
@@ -11,15 +22,15 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=BrandRead, status_code=status.HTTP_201_CREATED)
-def create_brand(
+async def create_brand(
     brand_data: BrandCreate,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Criar uma nova marca"""
     # Verificar se já existe uma marca com esse nome
-    existing_brand = session.exec(
+    existing_brand = (await session.exec(
         select(Brand).where(Brand.name == brand_data.name)
-    ).first()
+    )).first()
     
     if existing_brand:
         raise HTTPException(
@@ -30,31 +41,50 @@ def create_brand(
     # Criar nova marca
     brand = Brand.model_validate(brand_data)
     session.add(brand)
-    session.commit()
-    session.refresh(brand)
+    await reference_cache.mark_changed(session)
+    await session.commit()
+    reference_cache.invalidate()
+    invalidate_search_indexes()
+    list_cache.bump("brands")
+    await session.refresh(brand)
     
     return brand
 
 @router.get("/", response_model=List[BrandRead])
-def list_brands(
+async def list_brands(
+    request: Request,
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
-    session: Session = Depends(get_session)
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Listar todas as marcas"""
-    brands = session.exec(
-        select(Brand).offset(skip).limit(limit)
-    ).all()
+    """Listar todas as marcas
+
+    Paginação por cursor: quando houver próxima página, o header
+    `X-Next-Cursor` traz o valor a ser enviado no parâmetro `cursor`.
+    """
+    # Versão da coleção (quantidade e última alteração) para requisições condicionais
+    count, last_updated = (await session.exec(
+        select(func.count(Brand.id), func.max(Brand.updated_at))
+    )).one()
+    not_modified = conditional_response(
+        request, response, make_etag("brands", request.url.query, count, last_updated), None
+    )
+    if not_modified:
+        return not_modified
     
-    return brands
+    return await keyset_page(session, select(Brand), Brand.id, limit, response, cursor=cursor, skip=skip)
 
 @router.get("/{brand_id}", response_model=BrandRead)
-def get_brand(
+async def get_brand(
     brand_id: int,
-    session: Session = Depends(get_session)
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Obter uma marca específica por ID"""
-    brand = session.get(Brand, brand_id)
+    brand = await session.get(Brand, brand_id)
     
     if not brand:
         raise HTTPException(
@@ -62,16 +92,22 @@ def get_brand(
             detail="Brand not found"
         )
     
+    not_modified = conditional_response(
+        request, response, make_etag("brand", brand.id, brand.updated_at), latest([brand.updated_at])
+    )
+    if not_modified:
+        return not_modified
+    
     return brand
 
 @router.put("/{brand_id}", response_model=BrandRead)
-def update_brand(
+async def update_brand(
     brand_id: int,
     brand_data: BrandUpdate,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Atualizar uma marca existente"""
-    brand = session.get(Brand, brand_id)
+    brand = await session.get(Brand, brand_id)
     
     if not brand:
         raise HTTPException(
@@ -81,9 +117,9 @@ def update_brand(
     
     # Verificar se o novo nome já existe (se fornecido)
     if brand_data.name and brand_data.name != brand.name:
-        existing_brand = session.exec(
+        existing_brand = (await session.exec(
             select(Brand).where(Brand.name == brand_data.name)
-        ).first()
+        )).first()
         
         if existing_brand:
             raise HTTPException(
@@ -97,18 +133,24 @@ def update_brand(
         setattr(brand, key, value)
     
     session.add(brand)
-    session.commit()
-    session.refresh(brand)
+    await reference_cache.mark_changed(session)
+    await session.commit()
+    reference_cache.invalidate()
+    invalidate_search_indexes()
+    await session.refresh(brand)
+    barcode_cache.clear()  # Produtos em cache embutem os dados da marca
+    invalidate_flights()
+    list_cache.bump("brands")
     
     return brand
 
 @router.delete("/{brand_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_brand(
+async def delete_brand(
     brand_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Deletar uma marca"""
-    brand = session.get(Brand, brand_id)
+    brand = await session.get(Brand, brand_id)
     
     if not brand:
         raise HTTPException(
@@ -116,19 +158,38 @@ def delete_brand(
             detail="Brand not found"
         )
     
-    session.delete(brand)
-    session.commit()
+    # Desvincular produtos e remover a marca com comandos diretos, sem
+    # carregar a coleção brand.products (lazy load não é suportado em async);
+    # o UPDATE também atualiza updated_at dos produtos (sincronização)
+    await session.exec(
+        update(Product).where(Product.brand_id == brand_id).values(brand_id=None)
+    )
+    await session.exec(delete(Brand).where(Brand.id == brand_id))
+    record_deletion(session, "brand", brand_id)
+    await reference_cache.mark_changed(session)
+    await session.commit()
+    reference_cache.invalidate()
+    invalidate_search_indexes()
+    barcode_cache.clear()  # Produtos em cache embutem os dados da marca
+    invalidate_flights()
+    list_cache.bump("brands", "products")
     
     return None
 
 @router.get("/search/", response_model=List[BrandRead])
-def search_brands(
+async def search_brands(
+    response: Response,
     name: str,
-    session: Session = Depends(get_session)
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Buscar marcas por nome (busca parcial)"""
-    brands = session.exec(
-        select(Brand).where(Brand.name.ilike(f"%{name}%"))
-    ).all()
+    """Buscar marcas por nome (busca parcial, ordenada por similaridade)"""
+    await product_cache_sync.ensure_fresh(session)
+    brands, next_cursor = await session.run_sync(
+        search_by_name, Brand, name, limit, cursor
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     return brands
\ No newline at end of file
@@ -1,8 +1,20 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
-from database import get_session
+from typing import List, Optional
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from sqlalchemy import delete, update
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import get_async_session
+from cache import barcode_cache, list_cache
+from pagination import keyset_page, NEXT_CURSOR_HEADER
+from http_cache import conditional_response, latest, make_etag
+from reference_cache import reference_cache
+from delta_sync import record_deletion
+from search import search_by_name, invalidate_search_indexes
+from cache_sync import product_cache_sync
+from single_flight import invalidate_flights
 from models.category import Category, CategoryCreate, CategoryRead, CategoryUpdate
+from models.product import Product, ProductCategory
 
 router = APIRouter(
     prefix="/categories",
@@ -11,15 +23,15 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=CategoryRead, status_code=status.HTTP_201_CREATED)
-def create_category(
+async def create_category(
     category_data: CategoryCreate,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Criar uma nova categoria"""
     # Verificar se já existe uma categoria com esse nome
-    existing_category = session.exec(
+    existing_category = (await session.exec(
         select(Category).where(Category.name == category_data.name)
-    ).first()
+    )).first()
     
     if existing_category:
         raise HTTPException(
@@ -30,31 +42,50 @@ def create_category(
     # Criar nova categoria
     category = Category.model_validate(category_data)
     session.add(category)
-    session.commit()
-    session.refresh(category)
+    await reference_cache.mark_changed(session)
+    await session.commit()
+    reference_cache.invalidate()
+    invalidate_search_indexes()
+    list_cache.bump("categories")
+    await session.refresh(category)
     
     return category
 
 @router.get("/", response_model=List[CategoryRead])
-def list_categories(
+async def list_categories(
+    request: Request,
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
-    session: Session = Depends(get_session)
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Listar todas as categorias"""
-    categories = session.exec(
-        select(Category).offset(skip).limit(limit)
-    ).all()
+    """Listar todas as categorias
+
+    Paginação por cursor: quando houver próxima página, o header
+    `X-Next-Cursor` traz o valor a ser enviado no parâmetro `cursor`.
+    """
+    # Versão da coleção (quantidade e última alteração) para requisições condicionais
+    count, last_updated = (await session.exec(
+        select(func.count(Category.id), func.max(Category.updated_at))
+    )).one()
+    not_modified = conditional_response(
+        request, response, make_etag("categories", request.url.query, count, last_updated), None
+    )
+    if not_modified:
+        return not_modified
     
-    return categories
+    return await keyset_page(session, select(Category), Category.id, limit, response, cursor=cursor, skip=skip)
 
 @router.get("/{category_id}", response_model=CategoryRead)
-def get_category(
+async def get_category(
     category_id: int,
-    session: Session = Depends(get_session)
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Obter uma categoria específica por ID"""
-    category = session.get(Category, category_id)
+    category = await session.get(Category, category_id)
     
     if not category:
         raise HTTPException(
@@ -62,16 +93,22 @@ def get_category(
             detail="Category not found"
         )
     
+    not_modified = conditional_response(
+        request, response, make_etag("category", category.id, category.updated_at), latest([category.updated_at])
+    )
+    if not_modified:
+        return not_modified
+    
     return category
 
 @router.put("/{category_id}", response_model=CategoryRead)
-def update_category(
+async def update_category(
     category_id: int,
     category_data: CategoryUpdate,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Atualizar uma categoria existente"""
-    category = session.get(Category, category_id)
+    category = await session.get(Category, category_id)
     
     if not category:
         raise HTTPException(
@@ -81,9 +118,9 @@ def update_category(
     
     # Verificar se o novo nome já existe (se fornecido)
     if category_data.name and category_data.name != category.name:
-        existing_category = session.exec(
+        existing_category = (await session.exec(
             select(Category).where(Category.name == category_data.name)
-        ).first()
+        )).first()
         
         if existing_category:
             raise HTTPException(
@@ -97,18 +134,24 @@ def update_category(
         setattr(category, key, value)
     
     session.add(category)
-    session.commit()
-    session.refresh(category)
+    await reference_cache.mark_changed(session)
+    await session.commit()
+    reference_cache.invalidate()
+    invalidate_search_indexes()
+    await session.refresh(category)
+    barcode_cache.clear()  # Produtos em cache embutem os dados da categoria
+    invalidate_flights()
+    list_cache.bump("categories")
     
     return category
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_category(
+async def delete_category(
     category_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Deletar uma categoria"""
-    category = session.get(Category, category_id)
+    category = await session.get(Category, category_id)
     
     if not category:
         raise HTTPException(
@@ -116,19 +159,45 @@ def delete_category(
             detail="Category not found"
         )
     
-    session.delete(category)
-    session.commit()
+    # Produtos ligados mudam de categorias: atualizar updated_at para que
+    # apareçam na sincronização incremental e nos validadores HTTP
+    await session.exec(
+        update(Product)
+        .where(Product.id.in_(
+            select(ProductCategory.product_id).where(ProductCategory.category_id == category_id)
+        ))
+        .values(updated_at=datetime.now(timezone.utc))
+    )
+    
+    # Remover ligações com produtos e a categoria com comandos diretos, sem
+    # carregar a coleção category.product_categories (lazy load não é suportado em async)
+    await session.exec(delete(ProductCategory).where(ProductCategory.category_id == category_id))
+    await session.exec(delete(Category).where(Category.id == category_id))
+    record_deletion(session, "category", category_id)
+    await reference_cache.mark_changed(session)
+    await session.commit()
+    reference_cache.invalidate()
+    invalidate_search_indexes()
+    barcode_cache.clear()  # Produtos em cache embutem os dados da categoria
+    invalidate_flights()
+    list_cache.bump("categories", "products")
     
     return None
 
 @router.get("/search/", response_model=List[CategoryRead])
-def search_categories(
+async def search_categories(
+    response: Response,
     name: str,
-    session: Session = Depends(get_session)
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Buscar categorias por nome (busca parcial)"""
-    categories = session.exec(
-        select(Category).where(Category.name.ilike(f"%{name}%"))
-    ).all()
+    """Buscar categorias por nome (busca parcial, ordenada por similaridade)"""
+    await product_cache_sync.ensure_fresh(session)
+    categories, next_cursor = await session.run_sync(
+        search_by_name, Category, name, limit, cursor
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
     return categories
\ No newline at end of file
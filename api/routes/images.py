@@ -0,0 +1,147 @@
+import mimetypes
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import get_async_session
+from image_pipeline import (
+    IMAGE_MAX_PIXELS, IMAGE_MAX_UPLOAD_BYTES,
+    image_key, image_payload, image_pipeline, original_path, product_changed, remove_unused_files, touch_product
+)
+from image_storage import IMMUTABLE_CACHE_CONTROL, image_storage
+from serialization import json_response
+from single_flight import SingleFlight
+from thumbnails import CONTENT_TYPES, InvalidImageError, inspect_image
+from models.product import Product
+from models.product_image import ProductImage, ProductImageRead
+
+# Downloads simultâneos do mesmo arquivo no S3 viram uma única leitura
+image_reads = SingleFlight("image")
+
+router = APIRouter(
+    tags=["images"]
+)
+
+async def _get_product_or_404(session: AsyncSession, product_id: int) -> None:
+    if not (await session.exec(select(Product.id).where(Product.id == product_id))).first():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+
+@router.post(
+    "/products/{product_id}/images",
+    response_model=ProductImageRead,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def upload_product_image(
+    product_id: int,
+    file: UploadFile = File(...),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Enviar uma imagem de produto (JPEG, PNG ou WebP)
+
+    O original é gravado e a resposta volta com `status: "pending"`; as
+    miniaturas são geradas em segundo plano e aparecem em `gallery` do
+    produto quando a imagem fica pronta. Reenviar o mesmo arquivo para o
+    mesmo produto retorna a imagem já existente.
+    """
+    await _get_product_or_404(session, product_id)
+
+    data = await file.read(IMAGE_MAX_UPLOAD_BYTES + 1)
+    if len(data) > IMAGE_MAX_UPLOAD_BYTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Image larger than {IMAGE_MAX_UPLOAD_BYTES} bytes"
+        )
+
+    try:
+        extension, width, height = await run_in_threadpool(inspect_image, data, IMAGE_MAX_PIXELS)
+    except InvalidImageError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    key = await run_in_threadpool(image_key, data)
+    existing = (await session.exec(
+        select(ProductImage).where(ProductImage.product_id == product_id, ProductImage.key == key)
+    )).first()
+    if existing:
+        return json_response(image_payload(existing), status_code=status.HTTP_202_ACCEPTED)
+
+    image = ProductImage(
+        product_id=product_id,
+        key=key,
+        original_format=extension,
+        width=width,
+        height=height
+    )
+    await run_in_threadpool(image_storage.write, original_path(image), data, CONTENT_TYPES[extension])
+    session.add(image)
+    await session.commit()
+
+    image_pipeline.submit(image.id)
+
+    return json_response(image_payload(image), status_code=status.HTTP_202_ACCEPTED)
+
+@router.get("/products/{product_id}/images", response_model=List[ProductImageRead])
+async def list_product_images(
+    product_id: int,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Listar as imagens de um produto, inclusive pendentes e com falha"""
+    await _get_product_or_404(session, product_id)
+
+    images = (await session.exec(
+        select(ProductImage).where(ProductImage.product_id == product_id).order_by(ProductImage.id)
+    )).all()
+    return json_response([image_payload(image) for image in images])
+
+@router.delete("/products/{product_id}/images/{image_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_product_image(
+    product_id: int,
+    image_id: int,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Deletar uma imagem de produto"""
+    image = await session.get(ProductImage, image_id)
+
+    if not image or image.product_id != product_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not found"
+        )
+
+    await session.delete(image)
+    barcode = await touch_product(session, product_id)
+    await session.commit()
+    product_changed(barcode)
+    await remove_unused_files(session, [image])
+
+    return None
+
+@router.get("/images/{path:path}", include_in_schema=False)
+async def get_image(path: str):
+    """Arquivo de imagem (original ou miniatura)
+
+    Os caminhos mudam com o conteúdo, então as respostas podem ficar em
+    cache indefinidamente (navegador, proxy ou CDN).
+    """
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    media_type = CONTENT_TYPES.get(path.rpartition(".")[2]) or mimetypes.guess_type(path)[0]
+
+    local_path = image_storage.local_path(path)
+    if local_path is not None:
+        return FileResponse(local_path, media_type=media_type, headers=headers)
+
+    try:
+        data = await run_in_threadpool(image_reads.do_sync, path, image_storage.read, path)
+    except (FileNotFoundError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Image not found"
+        )
+    return Response(content=data, media_type=media_type, headers=headers)
@@ -1,14 +1,43 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlmodel import Session, select
-from database import get_session
-from models.product import Product, ProductCreate, ProductRead, ProductUpdate, ProductCategory, MeasureEnum
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import get_session, get_async_session, async_session_maker, read_router
+from barcode import InvalidBarcodeError, normalize_barcode, barcode_variants, try_normalize_barcode
+from cache import barcode_cache, list_cache, BARCODE_NEGATIVE_TTL, MISSING
+from cache_sync import product_cache_sync
+from pagination import keyset_page, NEXT_CURSOR_HEADER
+import search as search_engine
+from reference_cache import reference_cache
+from serialization import json_response, dumps, product_payloads
+from delta_sync import record_deletion
+from image_pipeline import load_gallery, remove_unused_files
+from http_cache import conditional_response, latest, make_etag
+from projection import EXPAND_DESCRIPTION, FIELDS_DESCRIPTION, FULL_PROJECTION, ProductProjection, parse_projection
+from single_flight import SingleFlight, invalidate_flights
+import exporter
+from importer import DEFAULT_CHUNK_SIZE, ImportFormatError, detect_format, import_products as run_product_import
+from models.product import (
+    Product, ProductCreate, ProductRead, ProductUpdate, ProductCategory, MeasureEnum,
+    ProductBarcodeBatch, ProductBarcodeBatchRead, ProductImportReport
+)
 from models.brand import Brand
 from models.category import Category
+from models.product_image import ProductImage
+
+# Leituras idênticas simultâneas compartilham uma única consulta e serialização
+product_flights = SingleFlight("product")
+barcode_flights = SingleFlight("barcode")
+list_flights = SingleFlight("list")
 
 # Adicionado para resolver referências circulares (forward references) no Pydantic V2
 # https://docs.pydantic.dev/latest/concepts/models/#circular-references
 ProductRead.model_rebuild()
+ProductBarcodeBatchRead.model_rebuild()
 
 
 router = APIRouter(
@@ -17,42 +46,214 @@ router = APIRouter(
     responses={404: {"description": "Product not found"}}
 )
 
-def _get_product_with_relations(session: Session, product_id: int) -> Optional[Product]:
-    """Helper para buscar produto com relacionamentos"""
-    return session.exec(
-        select(Product)
-        .where(Product.id == product_id)
-    ).first()
+def _links_query(product_ids: List[int]):
+    return (
+        select(ProductCategory.product_id, ProductCategory.category_id)
+        .where(ProductCategory.product_id.in_(product_ids))
+        .order_by(ProductCategory.id)
+    )
+
+async def _load_relations(
+    session: AsyncSession,
+    products: List[Product],
+    expand: Tuple[str, ...] = FULL_PROJECTION.expand
+) -> Tuple[Dict[int, Brand], Dict[int, List[Category]], Dict[int, List[dict]]]:
+    """Helper para carregar marcas, categorias e imagens de uma página de produtos
+
+    Marcas e categorias vêm do cache de referência; as ligações
+    produto-categoria e as imagens prontas são consultadas com uma query IN cada.
+    Só as relações de `expand` são carregadas (as demais vêm vazias).
+    """
+    product_ids = [product.id for product in products]
+    links = (await session.exec(_links_query(product_ids))).all() if "categories" in expand else []
+    
+    category_ids_by_product = {product_id: [] for product_id in product_ids}
+    for product_id, category_id in links:
+        category_ids_by_product[product_id].append(category_id)
+    
+    brand_ids = {product.brand_id for product in products} if "brand" in expand else set()
+    await reference_cache.resolve(
+        session,
+        brand_ids=brand_ids,
+        category_ids={category_id for _, category_id in links}
+    )
+    brands = {
+        brand_id: reference_cache.brand(brand_id)
+        for brand_id in brand_ids
+        if reference_cache.brand(brand_id)
+    }
+    categories_by_product = {
+        product_id: reference_cache.categories(category_ids)
+        for product_id, category_ids in category_ids_by_product.items()
+    }
+    
+    gallery_by_product = await load_gallery(session, product_ids) if "gallery" in expand else {}
+    
+    return brands, categories_by_product, gallery_by_product
+
+async def _validate_references(
+    session: AsyncSession,
+    brand_id: Optional[int],
+    category_ids: Optional[List[int]]
+) -> None:
+    """Helper para validar marca e categorias informadas, pelo cache de referência"""
+    category_ids = category_ids or []
+    await reference_cache.resolve(session, brand_ids=[brand_id], category_ids=category_ids)
+    
+    # Verificar se brand existe (se fornecido)
+    if brand_id and not reference_cache.brand(brand_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Brand not found"
+        )
+    
+    # Verificar se categorias existem (se fornecidas)
+    for category_id in category_ids:
+        if not reference_cache.category(category_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Category with id {category_id} not found"
+            )
+
+async def _build_product_responses(
+    session: AsyncSession,
+    products: List[Product],
+    projection: ProductProjection = FULL_PROJECTION
+) -> List[dict]:
+    """Helper para construir respostas (formato ProductRead ou a projeção pedida)
+    de uma página inteira de produtos lidos com `projection.entity`"""
+    if not products:
+        return []
+    
+    return projection.payloads(products, *await _load_relations(session, products, projection.expand))
 
-def _build_product_response(session: Session, product: Product) -> ProductRead:
+async def _build_product_response(session: AsyncSession, product: Product) -> dict:
     """Helper para construir resposta com relacionamentos"""
-    # Buscar brand
-    brand = None
-    if product.brand_id:
-        brand = session.get(Brand, product.brand_id)
+    return (await _build_product_responses(session, [product]))[0]
+
+def _invalidate_product_caches(*barcodes: Optional[str]) -> None:
+    """Remove dos caches de leitura as entradas afetadas por uma escrita"""
+    keys = [try_normalize_barcode(barcode) for barcode in barcodes if barcode]
+    barcode_cache.invalidate(*[key for key in keys if key])
+    search_engine.invalidate_search_indexes()
+    invalidate_flights()
+    list_cache.bump("products")
+
+def _flight_key(session: AsyncSession, *parts) -> tuple:
+    """Chave de agrupamento; sessões de bancos diferentes (primário e
+    réplicas) não compartilham resultados"""
+    return (id(session.bind),) + parts
+
+def _filtered_products_query(
+    status_filter: Optional[bool] = None,
+    brand_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    measure_type: Optional[MeasureEnum] = None,
+    entity=Product
+):
+    """Consulta de produtos com os filtros da listagem (ver idx_products_* em models/product.py)"""
+    query = select(entity)
+    
+    if status_filter is not None:
+        query = query.where(Product.status == status_filter)
     
-    # Buscar categorias
-    categories = []
-    product_categories = session.exec(
-        select(ProductCategory).where(ProductCategory.product_id == product.id)
-    ).all()
+    if brand_id:
+        query = query.where(Product.brand_id == brand_id)
     
-    for pc in product_categories:
-        category = session.get(Category, pc.category_id)
-        if category:
-            categories.append(category)
+    if measure_type:
+        query = query.where(Product.measure_type == measure_type)
     
-    # Criar response
-    product_dict = product.model_dump()
-    product_dict["brand"] = brand
-    product_dict["categories"] = categories
+    # Filtro por categoria (mais complexo devido ao relacionamento N:N)
+    if category_id:
+        query = query.join(ProductCategory).where(ProductCategory.category_id == category_id)
     
-    return ProductRead(**product_dict)
+    return query
+
+def _collection_versions_query(query):
+    """Versão da coleção para requisições condicionais: agregados baratos dos
+    produtos filtrados e das tabelas embutidas na resposta"""
+    filtered = query.subquery()
+    return select(
+        func.count(filtered.c.id),
+        func.max(filtered.c.updated_at),
+        select(func.max(Brand.updated_at)).correlate(None).scalar_subquery(),
+        select(func.max(Category.updated_at)).correlate(None).scalar_subquery(),
+        select(func.count(ProductCategory.id)).correlate(None).scalar_subquery(),
+        select(func.max(ProductCategory.id)).correlate(None).scalar_subquery(),
+    )
+
+def _brand_products_query(brand_id: int, entity=Product):
+    return select(entity).where(Product.brand_id == brand_id)
+
+def _category_products_query(category_id: int, entity=Product):
+    return (
+        select(entity)
+        .join(ProductCategory)
+        .where(ProductCategory.category_id == category_id)
+    )
+
+def _barcode_query(normalized: str):
+    return select(Product).where(Product.barcode.in_(barcode_variants(normalized)))
+
+async def _insert_category_links(session: AsyncSession, product_id: int, category_ids: List[int]) -> None:
+    if category_ids:
+        now = datetime.now(timezone.utc)
+        await session.exec(insert(ProductCategory), params=[
+            {"product_id": product_id, "category_id": category_id, "created_at": now}
+            for category_id in category_ids
+        ])
+
+async def _sync_category_links(session: AsyncSession, product_id: int, category_ids: List[int]) -> List[int]:
+    """Aplica às ligações do produto apenas a diferença para `category_ids`
+
+    Retorna as categorias na ordem em que a leitura do produto as devolve
+    (ligações mantidas, depois as novas).
+    """
+    wanted = list(dict.fromkeys(category_ids))
+    current = (await session.exec(
+        select(ProductCategory.category_id)
+        .where(ProductCategory.product_id == product_id)
+        .order_by(ProductCategory.id)
+    )).all()
+    
+    removed = [category_id for category_id in current if category_id not in wanted]
+    added = [category_id for category_id in wanted if category_id not in current]
+    if removed:
+        await session.exec(delete(ProductCategory).where(
+            ProductCategory.product_id == product_id,
+            ProductCategory.category_id.in_(removed)
+        ))
+    await _insert_category_links(session, product_id, added)
+    
+    return [category_id for category_id in current if category_id not in removed] + added
+
+def _product_payload_from_state(product: Product, category_ids: List[int], gallery: Optional[List[dict]] = None) -> dict:
+    """Resposta (formato ProductRead) de um produto recém-gravado, sem reler do banco"""
+    brand = reference_cache.brand(product.brand_id)
+    return product_payloads(
+        [product],
+        {product.brand_id: brand} if brand else {},
+        {product.id: reference_cache.categories(category_ids)},
+        {product.id: gallery or []}
+    )[0]
+
+async def _write_integrity_error(session: AsyncSession, barcode: Optional[str], error: IntegrityError) -> HTTPException:
+    """Erro de integridade de uma escrita de produto; o caso comum (código de
+    barras repetido) é identificado só aqui, sem consulta prévia"""
+    if barcode and (await session.exec(select(Product.id).where(Product.barcode == barcode))).first():
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Product with this barcode already exists"
+        )
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Erro de integridade: {str(error)}"
+    )
 
 @router.post("/", response_model=ProductRead, status_code=status.HTTP_201_CREATED)
-def create_product(
+async def create_product(
     product: ProductCreate,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Cria um novo produto no sistema
 
@@ -75,200 +276,316 @@ def create_product(
     }
     ```
     """
+    # Verificar se brand e categorias existem (se fornecidos), pelo cache
+    category_ids = list(dict.fromkeys(product.category_ids or []))
+    await _validate_references(session, product.brand_id, category_ids)
+    
+    db_product = Product.model_validate(product.model_dump(exclude={"category_ids"}))
+    
     try:
-        # Verificar se barcode já existe (se fornecido)
-        if product.barcode:
-            existing_product = session.exec(
-                select(Product).where(Product.barcode == product.barcode)
-            ).first()
-            
-            if existing_product:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Product with this barcode already exists"
-                )
-        
-        # Verificar se brand existe (se fornecido)
-        if product.brand_id:
-            brand = session.get(Brand, product.brand_id)
-            if not brand:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Brand not found"
-                )
-        
-        # Verificar se categorias existem (se fornecidas)
-        category_ids = product.category_ids or []
-        if category_ids:
-            for category_id in category_ids:
-                category = session.get(Category, category_id)
-                if not category:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail=f"Category with id {category_id} not found"
-                    )
-        
-        # Cria instância do produto
-        db_product = Product.model_validate(product.model_dump(exclude={"category_ids"}))
-        
-        # Adiciona ao banco de dados
+        # Uma única transação: o flush envia INSERT ... RETURNING id e as
+        # ligações com categorias vão em um só INSERT em lote
         session.add(db_product)
-        session.commit()
-        session.refresh(db_product)
-        
-        # Adiciona categorias ao produto
-        for category_id in category_ids:
-            session.add(ProductCategory(
-                product_id=db_product.id,
-                category_id=category_id
-            ))
-        session.commit()
-        
-        # Retorna o produto com relacionamentos
-        return _build_product_response(session, db_product)
-        
+        await session.flush()
+        await _insert_category_links(session, db_product.id, category_ids)
+        await product_cache_sync.mark_changed(session)
+        await session.commit()
     except IntegrityError as e:
-        session.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Erro de integridade: {str(e)}"
-        )
+        await session.rollback()
+        raise await _write_integrity_error(session, product.barcode, e)
     except Exception as e:
-        session.rollback()
+        await session.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Erro interno ao criar produto: {str(e)}"
         )
+    
+    _invalidate_product_caches(db_product.barcode)
+    
+    # Resposta montada do estado em memória (marca e categorias do cache)
+    return json_response(
+        _product_payload_from_state(db_product, category_ids),
+        status_code=status.HTTP_201_CREATED
+    )
+
+# Rota síncrona (executada no threadpool): a importação lê o arquivo enviado
+# e grava os lotes com a sessão síncrona, sem bloquear o event loop
+@router.post("/import", response_model=ProductImportReport)
+def import_products(
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=5000),
+    create_missing: bool = False,
+    session: Session = Depends(get_session)
+):
+    """Importar produtos em lote a partir de um arquivo CSV ou NDJSON
+
+    Os produtos são gravados com upsert pelo código de barras, em lotes de
+    `chunk_size` registros por transação. Marcas e categorias são informadas
+    pelo nome (`brand`, `categories`) ou id (`brand_id`, `category_ids`);
+    no CSV, várias categorias são separadas por `|`.
+
+    Retorna um relatório com os totais e os erros de cada lote.
+    """
+    try:
+        file_format = file_format or detect_format(file.filename, file.content_type)
+        report = run_product_import(
+            session,
+            file.file,
+            file_format,
+            chunk_size=chunk_size,
+            create_missing=create_missing
+        )
+    except ImportFormatError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    barcode_cache.clear()
+    search_engine.invalidate_search_indexes()
+    invalidate_flights()
+    list_cache.bump("products")
+    if create_missing:
+        reference_cache.invalidate()
+        list_cache.bump("brands", "categories")
+    return report
 
 @router.get("/", response_model=List[ProductRead])
-def list_products(
+async def list_products(
+    request: Request,
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
     status_filter: Optional[bool] = Query(None, alias="status"),
     brand_id: Optional[int] = None,
     category_id: Optional[int] = None,
     measure_type: Optional[MeasureEnum] = None,
-    session: Session = Depends(get_session)
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Listar produtos com filtros opcionais"""
-    query = select(Product)
+    """Listar produtos com filtros opcionais
+
+    Paginação por cursor: quando houver próxima página, o header
+    `X-Next-Cursor` traz o valor a ser enviado no parâmetro `cursor`.
+    Com `fields` e/ou `expand`, cada produto traz só as colunas e relações
+    pedidas (ex.: `?fields=name,barcode` para telas de lista).
+    """
+    projection = parse_projection(fields, expand)
+    filters = (status_filter, brand_id, category_id, measure_type)
+    # skip é ignorado quando há cursor (ver keyset_page)
+    page = (limit, cursor, 0 if cursor else skip)
     
-    # Aplicar filtros
-    if status_filter is not None:
-        query = query.where(Product.status == status_filter)
+    # Só as tabelas que a resposta lê invalidam a página em cache
+    tables = ("products",) + tuple(
+        table for relation, table in (("brand", "brands"), ("categories", "categories"))
+        if relation in projection.expand
+    )
+    await product_cache_sync.ensure_fresh(session)
+    cache_key = (filters, projection.key, page, list_cache.versions(*tables))
+    cached = list_cache.get(cache_key)
     
-    if brand_id:
-        query = query.where(Product.brand_id == brand_id)
+    if cached is MISSING:
+        query = _filtered_products_query(*filters)
+        
+        async def load_versions():
+            return tuple((await session.exec(_collection_versions_query(query))).one())
+        
+        versions = await list_flights.do(_flight_key(session, "versions", filters), load_versions)
+        etag = make_etag("products", filters, projection.key, page, *versions)
+        not_modified = conditional_response(request, response, etag, None)
+        if not_modified:
+            return not_modified
+        
+        async def load_page():
+            page_response = Response()
+            page_query = _filtered_products_query(*filters, entity=projection.entity)
+            products = await keyset_page(session, page_query, Product.id, limit, page_response, cursor=cursor, skip=skip)
+            body = dumps(await _build_product_responses(session, products, projection))
+            result = (etag, body, page_response.headers.get(NEXT_CURSOR_HEADER))
+            # Uma réplica atrasada pode não ter a escrita que mudou a versão
+            if not read_router.stale_read_risk(session):
+                list_cache.set(cache_key, result, len(body))
+            return result
+        
+        cached = await list_flights.do(_flight_key(session, "page", cache_key, versions), load_page)
+    else:
+        not_modified = conditional_response(request, response, cached[0], None)
+        if not_modified:
+            return not_modified
     
-    if measure_type:
-        query = query.where(Product.measure_type == measure_type)
+    _, body, next_cursor = cached
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
-    # Filtro por categoria (mais complexo devido ao relacionamento N:N)
-    if category_id:
-        query = query.join(ProductCategory).where(ProductCategory.category_id == category_id)
+    return json_response(body, response)
+
+async def _export_catalog(file_format: str, batch_size: int) -> AsyncIterator[bytes]:
+    """Gera o catálogo completo, um lote do cursor do servidor por vez
+
+    Usa uma sessão própria, aberta durante todo o streaming da resposta.
+    O mapa de identidade da sessão guarda referências fracas, então cada
+    lote é liberado depois de enviado e a memória não cresce com a tabela.
+    """
+    async with async_session_maker() as session:
+        if file_format == "csv":
+            yield exporter.csv_header()
+        
+        result = await session.stream_scalars(
+            select(Product)
+            .order_by(Product.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for products in result.partitions():
+            yield exporter.encode_batch(await _build_product_responses(session, products), file_format)
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_products(
+    file_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(exporter.DEFAULT_BATCH_SIZE, ge=1, le=10000)
+):
+    """Exportar o catálogo completo em NDJSON ou CSV
+
+    A resposta é enviada em streaming a partir de um cursor no servidor
+    (`yield_per`), sem paginação. No NDJSON cada linha é um produto no mesmo
+    formato das demais rotas; o CSV usa marca e categorias pelo nome e pode
+    ser reimportado em `/products/import`.
+    """
+    return StreamingResponse(
+        _export_catalog(file_format, batch_size),
+        media_type=exporter.MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="products.{file_format}"'}
+    )
+
+async def _load_product_read(session: AsyncSession, product_id: int, projection: ProductProjection):
+    """Validadores (ETag, Last-Modified), produto e relações lidos, ou None"""
+    product = (await session.exec(select(projection.entity).where(Product.id == product_id))).first()
+    if not product:
+        return None
     
-    query = query.offset(skip).limit(limit)
-    products = session.exec(query).all()
+    relations = await _load_relations(session, [product], projection.expand)
+    brands, categories_by_product, _ = relations
+    brand = brands.get(product.brand_id) if "brand" in projection.expand else None
+    categories = categories_by_product.get(product.id, [])
     
-    return [_build_product_response(session, product) for product in products]
+    # Validadores calculados antes de qualquer serialização (mudanças nas
+    # imagens atualizam product.updated_at)
+    etag = make_etag(
+        "product", product.id, product.updated_at,
+        brand.id if brand else None, brand.updated_at if brand else None,
+        [(category.id, category.updated_at) for category in categories],
+        None if projection.full else projection.key
+    )
+    last_modified = latest(
+        [product.updated_at, brand.updated_at if brand else None]
+        + [category.updated_at for category in categories]
+    )
+    return etag, last_modified, product, relations
 
 @router.get("/{product_id}", response_model=ProductRead)
-def get_product(
+async def get_product(
     product_id: int,
-    session: Session = Depends(get_session)
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Obter um produto específico por ID"""
-    product = _get_product_with_relations(session, product_id)
+    """Obter um produto específico por ID
+
+    Suporta requisições condicionais (If-None-Match / If-Modified-Since);
+    o ETag considera o produto, a marca e as categorias. `fields` e
+    `expand` limitam as colunas e relações da resposta.
+    """
+    projection = parse_projection(fields, expand)
+    loaded = await product_flights.do(
+        _flight_key(session, product_id, projection.key),
+        lambda: _load_product_read(session, product_id, projection)
+    )
     
-    if not product:
+    if loaded is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
     
-    return _build_product_response(session, product)
+    etag, last_modified, product, relations = loaded
+    not_modified = conditional_response(request, response, etag, last_modified)
+    if not_modified:
+        return not_modified
+    
+    # Serializado só quando o cliente não tem a versão atual
+    return json_response(projection.payloads([product], *relations)[0], response)
 
 @router.put("/{product_id}", response_model=ProductRead)
-def update_product(
+async def update_product(
     product_id: int,
     product_data: ProductUpdate,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Atualizar um produto existente"""
-    product = session.get(Product, product_id)
+    """Atualizar um produto existente
+
+    Executado em uma única transação: um UPDATE ... RETURNING grava e
+    devolve o produto, e apenas as ligações com categorias que mudaram são
+    inseridas ou removidas. A resposta é montada sem reler o produto.
+    """
+    # Verificar se brand e categorias existem (se fornecidos), pelo cache
+    await _validate_references(session, product_data.brand_id, product_data.category_ids)
     
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found"
-        )
+    values = product_data.model_dump(exclude_unset=True, exclude={"category_ids"})
     
-    # Verificar se novo barcode já existe (se fornecido)
-    if product_data.barcode and product_data.barcode != product.barcode:
-        existing_product = session.exec(
-            select(Product).where(Product.barcode == product_data.barcode)
-        ).first()
+    try:
+        # O código anterior só é necessário para invalidar o cache quando muda
+        previous_barcode = None
+        if "barcode" in values:
+            previous_barcode = (await session.exec(
+                select(Product.barcode).where(Product.id == product_id)
+            )).first()
         
-        if existing_product:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Product with this barcode already exists"
-            )
-    
-    # Verificar se brand existe (se fornecido)
-    if product_data.brand_id:
-        brand = session.get(Brand, product_data.brand_id)
-        if not brand:
+        if product_data.category_ids is not None:
+            # Alterar apenas as categorias não marca a linha do produto como
+            # modificada; atualizar updated_at mantém ETag/Last-Modified corretos
+            values["updated_at"] = datetime.now(timezone.utc)
+        
+        if values:
+            product = (await session.exec(
+                update(Product).where(Product.id == product_id).values(**values).returning(Product)
+            )).scalars().first()
+        else:
+            product = await session.get(Product, product_id)
+        
+        if not product:
+            await session.rollback()
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Brand not found"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product not found"
             )
-    
-    # Atualizar campos do produto (excluindo category_ids)
-    product_dict = product_data.model_dump(exclude_unset=True, exclude={"category_ids"})
-    for key, value in product_dict.items():
-        setattr(product, key, value)
-    
-    # Atualizar categorias se fornecidas
-    if product_data.category_ids is not None:
-        # Verificar se categorias existem
-        for category_id in product_data.category_ids:
-            category = session.get(Category, category_id)
-            if not category:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Category with id {category_id} not found"
-                )
         
-        # Remover relacionamentos existentes
-        existing_relations = session.exec(
-            select(ProductCategory).where(ProductCategory.product_id == product_id)
-        ).all()
+        if product_data.category_ids is not None:
+            category_ids = await _sync_category_links(session, product_id, product_data.category_ids)
+        else:
+            category_ids = [category_id for _, category_id in (await session.exec(_links_query([product_id]))).all()]
+        gallery = (await load_gallery(session, [product_id])).get(product_id, [])
         
-        for relation in existing_relations:
-            session.delete(relation)
-        
-        # Criar novos relacionamentos
-        for category_id in product_data.category_ids:
-            product_category = ProductCategory(
-                product_id=product_id,
-                category_id=category_id
-            )
-            session.add(product_category)
+        await product_cache_sync.mark_changed(session)
+        await session.commit()
+    except IntegrityError as e:
+        await session.rollback()
+        raise await _write_integrity_error(session, values.get("barcode"), e)
     
-    session.add(product)
-    session.commit()
-    session.refresh(product)
+    _invalidate_product_caches(previous_barcode, product.barcode)
     
-    return _build_product_response(session, product)
+    return json_response(_product_payload_from_state(product, category_ids, gallery))
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_product(
+async def delete_product(
     product_id: int,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Deletar um produto"""
-    product = session.get(Product, product_id)
+    product = await session.get(Product, product_id)
     
     if not product:
         raise HTTPException(
@@ -276,74 +593,180 @@ def delete_product(
             detail="Product not found"
         )
     
-    session.delete(product)
-    session.commit()
+    barcode = product.barcode
+    images = (await session.exec(select(ProductImage).where(ProductImage.product_id == product_id))).all()
+    
+    # Remover ligações com categorias, imagens e o produto com comandos
+    # diretos, sem carregar os relacionamentos (lazy load não é suportado em async)
+    await session.exec(delete(ProductCategory).where(ProductCategory.product_id == product_id))
+    await session.exec(delete(ProductImage).where(ProductImage.product_id == product_id))
+    await session.exec(delete(Product).where(Product.id == product_id))
+    await product_cache_sync.mark_changed(session)
+    record_deletion(session, "product", product_id)
+    await session.commit()
+    _invalidate_product_caches(barcode)
+    await remove_unused_files(session, images)
     
     return None
 
-@router.get("/search/", response_model=List[ProductRead])
-def search_products(
-    name: Optional[str] = None,
-    barcode: Optional[str] = None,
-    session: Session = Depends(get_session)
+async def _load_barcode_payload(session: AsyncSession, normalized: str) -> Optional[bytes]:
+    """Corpo serializado do produto com o código (None se não existe), já em cache"""
+    # Uma escrita durante a leitura invalida o cache: o resultado não é guardado
+    generation = barcode_cache.generation
+    product = (await session.exec(_barcode_query(normalized))).first()
+    # Uma réplica atrasada pode não ter a escrita que acabou de invalidar a entrada
+    cacheable = not read_router.stale_read_risk(session)
+    
+    if product is None:
+        payload = None
+        if cacheable:
+            barcode_cache.set(normalized, payload, ttl=BARCODE_NEGATIVE_TTL, generation=generation)
+    else:
+        payload = dumps(await _build_product_response(session, product))
+        if cacheable:
+            barcode_cache.set(normalized, payload, generation=generation)
+    return payload
+
+@router.get("/barcode/{code}", response_model=ProductRead)
+async def get_product_by_barcode(
+    code: str,
+    session: AsyncSession = Depends(get_async_session)
 ):
-    """Buscar produtos por nome ou código de barras"""
-    query = select(Product)
+    """Obter um produto pelo código de barras exato (EAN-13, UPC-A ou EAN-8)
+
+    O código é validado e normalizado antes da consulta, que usa o índice
+    único de `products.barcode`. As respostas (inclusive "não encontrado")
+    ficam em cache até expirarem ou o produto ser alterado.
+    """
+    try:
+        normalized = normalize_barcode(code)
+    except InvalidBarcodeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
     
-    if name:
-        query = query.where(Product.name.ilike(f"%{name}%"))
+    await product_cache_sync.ensure_fresh(session)
+    payload = barcode_cache.get(normalized)
+    if payload is MISSING:
+        payload = await barcode_flights.do(
+            _flight_key(session, normalized), lambda: _load_barcode_payload(session, normalized)
+        )
     
-    if barcode:
-        query = query.where(Product.barcode.ilike(f"%{barcode}%"))
+    if payload is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
     
+    return Response(content=payload, media_type="application/json")
+
+@router.post("/barcodes:batch", response_model=ProductBarcodeBatchRead)
+async def get_products_by_barcodes(
+    batch: ProductBarcodeBatch,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Resolver vários códigos de barras em uma única requisição
+
+    Todos os códigos são buscados com uma única consulta por igualdade e as
+    marcas/categorias são carregadas em lote. Códigos EAN/UPC válidos são
+    normalizados; os demais são buscados como foram enviados.
+    """
+    # Mapear cada representação armazenável para os códigos enviados
+    requested = {}
+    for code in dict.fromkeys(batch.barcodes):
+        normalized = try_normalize_barcode(code)
+        variants = barcode_variants(normalized) if normalized else [code.strip()]
+        for variant in variants:
+            requested.setdefault(variant, []).append(code)
+    
+    products = (await session.exec(
+        select(Product).where(Product.barcode.in_(list(requested)))
+    )).all()
+    
+    found = {}
+    for payload in await _build_product_responses(session, products):
+        for code in requested.get(payload["barcode"], []):
+            found[code] = payload
+    
+    missing = [code for code in dict.fromkeys(batch.barcodes) if code not in found]
+    
+    return json_response({"found": found, "missing": missing})
+
+@router.get("/search/", response_model=List[ProductRead])
+async def search_products(
+    response: Response,
+    name: Optional[str] = None,
+    barcode: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Buscar produtos por nome ou código de barras
+
+    O termo `name` é buscado no nome, na descrição e na marca, com
+    correspondência por prefixo e tolerância a erros de digitação; os
+    resultados vêm ordenados por relevância. `barcode` filtra por parte
+    do código. Quando houver próxima página, o header `X-Next-Cursor`
+    traz o valor a ser enviado no parâmetro `cursor`. `fields` e `expand`
+    funcionam como na listagem.
+    """
+    projection = parse_projection(fields, expand)
     if not name and not barcode:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="At least one search parameter (name or barcode) is required"
         )
     
-    products = session.exec(query).all()
+    await product_cache_sync.ensure_fresh(session)
+    products, next_cursor = await session.run_sync(
+        search_engine.search_products, name, barcode, limit, cursor, projection.entity
+    )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     
-    return [_build_product_response(session, product) for product in products]
+    return json_response(await _build_product_responses(session, products, projection), response)
 
 @router.get("/by-brand/{brand_id}", response_model=List[ProductRead])
-def get_products_by_brand(
+async def get_products_by_brand(
     brand_id: int,
-    session: Session = Depends(get_session)
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Obter todos os produtos de uma marca específica"""
+    projection = parse_projection(fields, expand)
     # Verificar se a marca existe
-    brand = session.get(Brand, brand_id)
-    if not brand:
+    await reference_cache.resolve(session, brand_ids=[brand_id])
+    if not reference_cache.brand(brand_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Brand not found"
         )
     
-    products = session.exec(
-        select(Product).where(Product.brand_id == brand_id)
-    ).all()
+    products = (await session.exec(_brand_products_query(brand_id, projection.entity))).all()
     
-    return [_build_product_response(session, product) for product in products]
+    return json_response(await _build_product_responses(session, products, projection))
 
 @router.get("/by-category/{category_id}", response_model=List[ProductRead])
-def get_products_by_category(
+async def get_products_by_category(
     category_id: int,
-    session: Session = Depends(get_session)
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    expand: Optional[str] = Query(None, description=EXPAND_DESCRIPTION),
+    session: AsyncSession = Depends(get_async_session)
 ):
     """Obter todos os produtos de uma categoria específica"""
+    projection = parse_projection(fields, expand)
     # Verificar se a categoria existe
-    category = session.get(Category, category_id)
-    if not category:
+    await reference_cache.resolve(session, category_ids=[category_id])
+    if not reference_cache.category(category_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found"
         )
     
-    products = session.exec(
-        select(Product)
-        .join(ProductCategory)
-        .where(ProductCategory.category_id == category_id)
-    ).all()
+    products = (await session.exec(_category_products_query(category_id, projection.entity))).all()
     
-    return [_build_product_response(session, product) for product in products]
\ No newline at end of file
+    return json_response(await _build_product_responses(session, products, projection))
\ No newline at end of file
@@ -0,0 +1,37 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import get_async_session
+from catalog_stats import STATS_MAX_AGE_SECONDS, catalog_stats
+from http_cache import conditional_response, make_etag
+from serialization import json_response
+from models.catalog_stat import CatalogStatsRead
+
+router = APIRouter(
+    prefix="/stats",
+    tags=["stats"]
+)
+
+@router.get("", response_model=CatalogStatsRead)
+async def get_catalog_stats(
+    request: Request,
+    response: Response,
+    max_age: Optional[float] = Query(None, ge=0, le=STATS_MAX_AGE_SECONDS),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Estatísticas do catálogo para painéis
+
+    Quantidade de produtos (total e ativos) e soma do estoque (`qtt`) no
+    geral e por status, marca, categoria e tipo de medida. Os números vêm
+    de agregados pré-calculados com no máximo STATS_MAX_AGE_SECONDS de idade
+    (`age_seconds`); `max_age` pede dados mais recentes.
+    """
+    stats = await catalog_stats.load(session, max_age)
+
+    not_modified = conditional_response(
+        request, response, make_etag("stats", stats["refreshed_at"]), stats["refreshed_at"]
+    )
+    if not_modified:
+        return not_modified
+
+    return json_response(stats, response)
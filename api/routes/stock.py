@@ -0,0 +1,108 @@
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import get_async_session
+from pagination import keyset_page
+from serialization import STOCK_MOVEMENT_COLUMNS, json_response, model_payload
+from stock import missing_products, record_movements, stock_aggregator
+from models.stock_movement import (
+    StockMovement, StockMovementBatch, StockMovementBatchRead, StockMovementCreate,
+    StockMovementQueued, StockMovementRead
+)
+
+router = APIRouter(
+    prefix="/products",
+    tags=["stock"]
+)
+
+def _check_deltas(movements: List[Dict[str, Any]]) -> None:
+    if any(movement["delta"] == 0 for movement in movements):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Stock movement delta must not be zero"
+        )
+
+async def _queue(session: AsyncSession, movements: List[Dict[str, Any]]):
+    """Entrega as movimentações ao agregador (gravadas na próxima descarga)"""
+    missing = await missing_products(session, [movement["product_id"] for movement in movements])
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Products not found: {', '.join(str(product_id) for product_id in missing)}"
+        )
+    queued = stock_aggregator.add(movements)
+    return json_response(
+        {"queued": queued, "flush_interval": stock_aggregator.interval},
+        status_code=status.HTTP_202_ACCEPTED
+    )
+
+@router.post(
+    "/stock:batch",
+    response_model=StockMovementBatchRead,
+    status_code=status.HTTP_201_CREATED,
+    responses={202: {"model": StockMovementQueued}}
+)
+async def create_stock_movements(
+    batch: StockMovementBatch,
+    defer: bool = False,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Aplicar várias movimentações de estoque em uma única transação
+
+    Todas são aplicadas ou nenhuma: um produto inexistente retorna 404 e
+    um saldo que ficaria negativo retorna 409 (exceto com
+    STOCK_ALLOW_NEGATIVE). Com `defer=true` e o agregador ativo
+    (STOCK_AGGREGATE_INTERVAL), as movimentações são somadas em memória e
+    gravadas em lote na próxima descarga (resposta 202, sem verificação
+    de saldo).
+    """
+    movements = [movement.model_dump() for movement in batch.movements]
+    _check_deltas(movements)
+    if defer and stock_aggregator.enabled:
+        return await _queue(session, movements)
+
+    entries = await record_movements(session, movements)
+    return json_response({"movements": entries}, status_code=status.HTTP_201_CREATED)
+
+@router.post(
+    "/{product_id}/stock",
+    response_model=StockMovementRead,
+    status_code=status.HTTP_201_CREATED,
+    responses={202: {"model": StockMovementQueued}}
+)
+async def create_stock_movement(
+    product_id: int,
+    movement: StockMovementCreate,
+    defer: bool = False,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Somar `delta` ao estoque do produto (negativo para saídas)
+
+    A alteração é atômica no banco e fica registrada no histórico de
+    movimentações com o saldo resultante (`qtt_after`).
+    """
+    movements = [{"product_id": product_id, **movement.model_dump()}]
+    _check_deltas(movements)
+    if defer and stock_aggregator.enabled:
+        return await _queue(session, movements)
+
+    entries = await record_movements(session, movements)
+    return json_response(entries[0], status_code=status.HTTP_201_CREATED)
+
+@router.get("/{product_id}/stock/movements", response_model=List[StockMovementRead])
+async def list_stock_movements(
+    product_id: int,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Histórico de movimentações do produto, da mais antiga para a mais recente
+
+    Quando houver próxima página, o header `X-Next-Cursor` traz o valor a
+    ser enviado no parâmetro `cursor`.
+    """
+    query = select(StockMovement).where(StockMovement.product_id == product_id)
+    movements = await keyset_page(session, query, StockMovement.id, limit, response, cursor=cursor)
+    return json_response([model_payload(movement, STOCK_MOVEMENT_COLUMNS) for movement in movements], response)
@@ -0,0 +1,35 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import get_primary_session
+from delta_sync import build_delta, prune_tombstones
+from serialization import json_response
+from models.sync import SyncRead
+
+router = APIRouter(
+    prefix="/sync",
+    tags=["sync"]
+)
+
+@router.get("", response_model=SyncRead)
+async def sync_catalog(
+    since: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=5000),
+    session: AsyncSession = Depends(get_primary_session)
+):
+    """Sincronização incremental do catálogo para clientes offline
+
+    Retorna produtos, marcas, categorias e ligações produto-categoria
+    alterados desde o token `since`, além dos ids excluídos em `deleted`.
+    Sem `since` (ou com token expirado) o catálogo completo é enviado com
+    `reset: true`. Enquanto `has_more` for verdadeiro, chame novamente com o
+    `token` recebido; a última página traz o token da próxima sincronização.
+
+    O cliente deve aplicar `deleted` antes de gravar os demais itens, e
+    substituir as ligações de cada produto recebido pelas de
+    `product_categories`. Itens podem vir repetidos entre sincronizações.
+    Sempre lê do primário: um token gerado em uma réplica atrasada faria o
+    cliente pular alterações.
+    """
+    await prune_tombstones(session)
+    return json_response(await build_delta(session, since, limit))
@@ -0,0 +1,306 @@
+import logging
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Type
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, func, literal, literal_column, or_
+from sqlmodel import Session, SQLModel, select
+
+from models.brand import Brand
+from models.category import Category
+from models.product import Product
+from pagination import decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# Similaridade mínima de trigramas (mesmo padrão do pg_trgm)
+SIMILARITY_THRESHOLD = 0.3
+
+# Documento de busca dos produtos; deve ser idêntico à expressão do índice GIN
+PRODUCT_DOCUMENT_SQL = (
+    "to_tsvector('simple', coalesce(products.name, '') || ' ' || coalesce(products.description, ''))"
+)
+
+# Índices usados pela busca no PostgreSQL (migração 2, em migrations.py);
+# nos demais bancos a busca usa o índice em memória
+POSTGRES_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS idx_products_search_document ON products USING GIN (({PRODUCT_DOCUMENT_SQL}))",
+    "CREATE INDEX IF NOT EXISTS idx_products_name_trgm ON products USING GIN (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_products_barcode_trgm ON products USING GIN (barcode gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_brands_name_trgm ON brands USING GIN (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_categories_name_trgm ON categories USING GIN (name gin_trgm_ops)",
+]
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _words(term: str) -> List[str]:
+    return [word.lower() for word in _WORD_RE.findall(term or "")]
+
+
+def _trigrams(word: str) -> Set[str]:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _after_position(cursor: Optional[str]) -> Optional[Tuple[float, int]]:
+    if not cursor:
+        return None
+    position = decode_cursor(cursor)
+    try:
+        return float(position["rank"]), int(position["id"])
+    except (KeyError, TypeError, ValueError):
+        # Cursor de outra listagem
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+class InMemorySearchIndex:
+    """
+    Índice invertido em memória, usado quando o banco não é PostgreSQL.
+
+    Cada palavra da busca precisa casar com alguma palavra do documento, de
+    forma exata, por prefixo ou por similaridade de trigramas (tolerância a
+    erros de digitação). O índice é reconstruído sob demanda após invalidate().
+    """
+    def __init__(self, loader):
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._stale = True
+        self._version = 0
+        self._documents: Dict[str, Set[int]] = {}
+        self._trigram_words: Dict[str, Set[str]] = {}
+    
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._stale = True
+    
+    def _build(self, session: Session) -> None:
+        # A leitura do banco acontece fora do lock: nas rotas assíncronas
+        # (run_sync), a I/O devolve o controle ao event loop, e outra busca
+        # na mesma thread bloquearia esperando o lock
+        version = self._version
+        documents: Dict[str, Set[int]] = {}
+        trigram_words: Dict[str, Set[str]] = {}
+        for doc_id, content in self._loader(session):
+            for word in _words(content):
+                documents.setdefault(word, set()).add(doc_id)
+        for word in documents:
+            for trigram in _trigrams(word):
+                trigram_words.setdefault(trigram, set()).add(word)
+        with self._lock:
+            self._documents = documents
+            self._trigram_words = trigram_words
+            # Invalidado durante a leitura: reconstruir na próxima busca
+            self._stale = self._version != version
+    
+    def _match_word(self, query_word: str) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        
+        def add(doc_ids: Iterable[int], score: float) -> None:
+            for doc_id in doc_ids:
+                if score > scores.get(doc_id, 0.0):
+                    scores[doc_id] = score
+        
+        query_trigrams = _trigrams(query_word)
+        candidates = set()
+        for trigram in query_trigrams:
+            candidates |= self._trigram_words.get(trigram, set())
+        
+        for word in candidates:
+            if word == query_word:
+                add(self._documents[word], 1.0)
+            elif word.startswith(query_word):
+                add(self._documents[word], 0.8)
+            elif query_word in word:
+                add(self._documents[word], 0.6)
+            else:
+                word_trigrams = _trigrams(word)
+                similarity = len(query_trigrams & word_trigrams) / len(query_trigrams | word_trigrams)
+                if similarity >= SIMILARITY_THRESHOLD:
+                    add(self._documents[word], similarity * 0.5)
+        return scores
+    
+    def search(self, session: Session, term: str) -> List[Tuple[float, int]]:
+        """Retorna (rank, id) ordenados por relevância e id"""
+        if self._stale:
+            self._build(session)
+        
+        with self._lock:
+            totals: Optional[Dict[int, float]] = None
+            for query_word in _words(term):
+                scores = self._match_word(query_word)
+                if totals is None:
+                    totals = scores
+                else:
+                    totals = {
+                        doc_id: total + scores[doc_id]
+                        for doc_id, total in totals.items() if doc_id in scores
+                    }
+        
+        return sorted(((rank, doc_id) for doc_id, rank in (totals or {}).items()), key=lambda item: (-item[0], item[1]))
+
+
+def _load_products(session: Session):
+    rows = session.exec(
+        select(Product.id, Product.name, Product.description, Brand.name)
+        .outerjoin(Brand, Brand.id == Product.brand_id)
+    ).all()
+    for product_id, name, description, brand_name in rows:
+        yield product_id, " ".join(filter(None, (name, description, brand_name)))
+
+
+def _name_loader(model: Type[SQLModel]):
+    def load(session: Session):
+        return session.exec(select(model.id, model.name)).all()
+    return load
+
+
+# Índices em memória (fallback para SQLite)
+product_index = InMemorySearchIndex(_load_products)
+name_indexes = {
+    Brand: InMemorySearchIndex(_name_loader(Brand)),
+    Category: InMemorySearchIndex(_name_loader(Category)),
+}
+
+
+def invalidate_search_indexes() -> None:
+    """Marca os índices em memória para reconstrução na próxima busca"""
+    product_index.invalidate()
+    for index in name_indexes.values():
+        index.invalidate()
+
+
+def _page(rows: List[Tuple[float, SQLModel]], limit: int) -> Tuple[List[SQLModel], Optional[str]]:
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        rank, last = rows[-1]
+        next_cursor = encode_cursor({"rank": rank, "id": last.id})
+    return [item for _, item in rows], next_cursor
+
+
+def _ranked_keyset(query, rank, id_column, after: Optional[Tuple[float, int]], limit: int):
+    if after:
+        after_rank, after_id = after
+        query = query.where(or_(rank < after_rank, and_(rank == after_rank, id_column > after_id)))
+    return query.order_by(rank.desc(), id_column).limit(limit + 1)
+
+
+def _fallback_page(
+    session: Session,
+    model: Type[SQLModel],
+    ranked: List[Tuple[float, int]],
+    after: Optional[Tuple[float, int]],
+    limit: int,
+    query=None,
+    entity=None
+) -> List[Tuple[float, SQLModel]]:
+    if after:
+        ranked = [(rank, doc_id) for rank, doc_id in ranked if (-rank, doc_id) > (-after[0], after[1])]
+    
+    # Filtros adicionais (ex.: barcode) são aplicados no banco
+    if query is not None and ranked:
+        allowed = set(session.exec(query.where(model.id.in_([doc_id for _, doc_id in ranked]))).all())
+        ranked = [(rank, doc_id) for rank, doc_id in ranked if doc_id in allowed]
+    
+    ranked = ranked[:limit + 1]
+    objects = {
+        obj.id: obj
+        for obj in session.exec(
+            select(model if entity is None else entity).where(model.id.in_([doc_id for _, doc_id in ranked]))
+        ).all()
+    } if ranked else {}
+    return [(rank, objects[doc_id]) for rank, doc_id in ranked if doc_id in objects]
+
+
+def search_products(
+    session: Session,
+    name: Optional[str],
+    barcode: Optional[str],
+    limit: int,
+    cursor: Optional[str] = None,
+    entity=Product
+) -> Tuple[List[Product], Optional[str]]:
+    """
+    Busca produtos por nome/descrição/marca (ranqueada) e/ou parte do barcode.
+
+    No PostgreSQL usa tsvector (prefixo) e pg_trgm (similaridade) com índices
+    GIN; nos demais bancos usa o índice em memória para o termo de nome.
+    `entity` é o que cada resultado traz (o modelo ou um Bundle de colunas).
+
+    Returns:
+        Tuple: Produtos da página e cursor da próxima página (ou None)
+    """
+    after = _after_position(cursor)
+    words = _words(name)
+    
+    # Termo sem nenhuma palavra pesquisável
+    if name and not words:
+        return [], None
+    
+    if words and session.get_bind().dialect.name != "postgresql":
+        query = select(Product.id)
+        if barcode:
+            query = query.where(Product.barcode.ilike(f"%{barcode}%"))
+        ranked = product_index.search(session, name)
+        rows = _fallback_page(session, Product, ranked, after, limit, query if barcode else None, entity)
+        return _page(rows, limit)
+    
+    if words:
+        document = literal_column(PRODUCT_DOCUMENT_SQL)
+        tsquery = func.to_tsquery("simple", " & ".join(f"{word}:*" for word in words))
+        rank = (
+            func.ts_rank(document, tsquery)
+            + func.greatest(func.similarity(Product.name, name), func.similarity(func.coalesce(Brand.name, ""), name))
+        )
+        query = (
+            select(Product.id.label("id"), rank.label("rank"))
+            .outerjoin(Brand, Brand.id == Product.brand_id)
+            .where(or_(
+                document.op("@@")(tsquery),
+                Product.name.op("%")(name),
+                Brand.name.op("%")(name),
+                Brand.name.ilike(f"%{name}%")
+            ))
+        )
+    else:
+        query = select(Product.id.label("id"), literal(0.0).label("rank"))
+    
+    if barcode:
+        query = query.where(Product.barcode.ilike(f"%{barcode}%"))
+    
+    ranked = query.subquery()
+    page_query = _ranked_keyset(
+        select(ranked.c.rank, entity).join(ranked, ranked.c.id == Product.id),
+        ranked.c.rank, ranked.c.id, after, limit
+    )
+    return _page(session.exec(page_query).all(), limit)
+
+
+def search_by_name(
+    session: Session,
+    model: Type[SQLModel],
+    name: str,
+    limit: int,
+    cursor: Optional[str] = None
+) -> Tuple[List[SQLModel], Optional[str]]:
+    """
+    Busca marcas ou categorias pelo nome, ordenadas por similaridade.
+
+    Returns:
+        Tuple: Registros da página e cursor da próxima página (ou None)
+    """
+    after = _after_position(cursor)
+    
+    if session.get_bind().dialect.name != "postgresql":
+        ranked = name_indexes[model].search(session, name)
+        return _page(_fallback_page(session, model, ranked, after, limit), limit)
+    
+    rank = func.similarity(model.name, name)
+    query = select(rank.label("rank"), model).where(
+        or_(model.name.op("%")(name), model.name.ilike(f"%{name}%"))
+    )
+    return _page(session.exec(_ranked_keyset(query, rank, model.id, after, limit)).all(), limit)
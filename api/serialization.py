@@ -0,0 +1,109 @@
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import orjson
+from fastapi import Response, status
+
+from models.brand import Brand
+from models.category import Category
+from models.product import Product, ProductRead
+from models.stock_movement import StockMovementRead
+
+# Campos serializados de cada modelo, na mesma ordem usada pelo pydantic
+PRODUCT_COLUMNS = tuple(name for name in ProductRead.model_fields if name not in ("brand", "categories", "gallery"))
+BRAND_COLUMNS = tuple(Brand.model_fields)
+CATEGORY_COLUMNS = tuple(Category.model_fields)
+STOCK_MOVEMENT_COLUMNS = tuple(StockMovementRead.model_fields)
+
+# UTC como "Z", igual ao pydantic
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def _default(value: Any) -> Any:
+    # Decimal vira string, como no modo JSON do pydantic
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(value: Any) -> bytes:
+    """Serializa para JSON com orjson, no mesmo formato do pydantic"""
+    return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+
+
+def model_payload(instance: Any, columns: Sequence[str]) -> Dict[str, Any]:
+    """
+    Copia as colunas de uma instância carregada do banco para um dicionário.
+
+    Lê direto do `__dict__`, evitando o custo do acesso instrumentado do
+    SQLAlchemy; atributos expirados caem no `getattr` normal.
+    """
+    values = instance.__dict__
+    return {
+        name: values[name] if name in values else getattr(instance, name)
+        for name in columns
+    }
+
+
+def product_payloads(
+    products: Iterable[Product],
+    brands: Dict[int, Brand],
+    categories_by_product: Dict[int, List[Category]],
+    gallery_by_product: Optional[Dict[int, List[Dict[str, Any]]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Monta as respostas de produtos (formato de ProductRead) como dicionários.
+
+    Os dados vêm do banco e já são válidos, então não há validação; marcas e
+    categorias repetidas na página são convertidas uma única vez. As imagens
+    (`gallery_by_product`) já vêm no formato de ProductImageRead.
+    """
+    # Memorizados pela chave da marca e pela identidade da categoria, sem
+    # acessar atributos instrumentados
+    brand_payloads: Dict[int, Optional[Dict[str, Any]]] = {}
+    category_payloads: Dict[int, Dict[str, Any]] = {}
+    payloads = []
+    for product in products:
+        payload = model_payload(product, PRODUCT_COLUMNS)
+
+        brand_id = payload["brand_id"]
+        if brand_id not in brand_payloads:
+            brand = brands.get(brand_id)
+            brand_payloads[brand_id] = model_payload(brand, BRAND_COLUMNS) if brand is not None else None
+        payload["brand"] = brand_payloads[brand_id]
+
+        categories = []
+        for category in categories_by_product[payload["id"]]:
+            key = id(category)
+            if key not in category_payloads:
+                category_payloads[key] = model_payload(category, CATEGORY_COLUMNS)
+            categories.append(category_payloads[key])
+        payload["categories"] = categories
+        payload["gallery"] = gallery_by_product.get(payload["id"], []) if gallery_by_product else []
+
+        payloads.append(payload)
+
+    return payloads
+
+
+def json_response(
+    content: Any,
+    response: Optional[Response] = None,
+    status_code: int = status.HTTP_200_OK
+) -> Response:
+    """
+    Resposta JSON serializada com orjson, sem passar pelo `response_model`.
+
+    Destinada a dados montados internamente: retornar um `Response` faz o
+    FastAPI pular a revalidação, e o `response_model` da rota continua
+    servindo para a documentação. Cabeçalhos definidos na resposta injetada
+    (`response`) são preservados.
+    """
+    result = Response(
+        content=content if isinstance(content, bytes) else dumps(content),
+        media_type="application/json",
+        status_code=status_code
+    )
+    if response is not None:
+        result.headers.raw.extend(response.headers.raw)
+    return result
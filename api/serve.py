@@ -0,0 +1,140 @@
+"""
+Servidor de produção da API.
+
+Executa init_db (conexão, create_all e migrações) uma única vez no processo
+principal e só então inicia os workers do uvicorn, que pulam essa etapa
+(DB_INIT_ON_STARTUP=false). Usa uvloop e httptools quando instalados
+(uvicorn[standard]); sem eles, asyncio e h11.
+
+Com mais de um worker, os caches em memória de cada processo precisam
+saber das escritas atendidas pelos outros: o cache de referência usa o
+backend "database" e a sincronização dos caches de produtos
+(PRODUCT_CACHE_SYNC, ver cache_sync.py) é ativada.
+
+No SIGTERM/SIGINT os workers param de aceitar conexões e aguardam as
+requisições em andamento por até GRACEFUL_TIMEOUT segundos.
+
+Uso:
+    python serve.py                          # WEB_CONCURRENCY workers (padrão: núcleos)
+    python serve.py --workers 4 --port 8000
+    python serve.py --skip-init              # banco já migrado (ex.: job separado)
+"""
+from dotenv import load_dotenv
+import argparse
+import importlib.util
+import logging
+import os
+import pkgutil
+import sys
+
+import uvicorn
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def default_workers() -> int:
+    if os.getenv("WEB_CONCURRENCY"):
+        return int(os.environ["WEB_CONCURRENCY"])
+    # Núcleos disponíveis para o processo (respeita cpuset de contêineres)
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def server_options(args: argparse.Namespace) -> dict:
+    """Parâmetros do uvicorn.run"""
+    return {
+        "host": args.host,
+        "port": args.port,
+        "workers": args.workers,
+        "loop": "uvloop" if _available("uvloop") else "asyncio",
+        "http": "httptools" if _available("httptools") else "h11",
+        "backlog": args.backlog,
+        "timeout_keep_alive": args.keep_alive,
+        "timeout_graceful_shutdown": args.graceful_timeout,
+        "limit_concurrency": args.limit_concurrency,
+        "limit_max_requests": args.max_requests,
+        "proxy_headers": True,
+        "forwarded_allow_ips": os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+        # O MetricsMiddleware já registra cada requisição (LOG_REQUESTS)
+        "access_log": False,
+        "log_level": args.log_level,
+    }
+
+
+def configure_workers(workers: int) -> None:
+    """Configura os caches para vários workers (lido na importação, nos workers)"""
+    if workers <= 1:
+        return
+    required = {"REFERENCE_CACHE_BACKEND": "database", "PRODUCT_CACHE_SYNC": "true"}
+    for name, value in required.items():
+        current = os.getenv(name)
+        if current is not None and current.lower() != value:
+            logger.warning(f"⚠️ {name}={current} ignorado com {workers} workers; usando {value}")
+        os.environ[name] = value
+
+
+def prepare_database() -> None:
+    """Inicializa o banco no processo principal, antes dos workers"""
+    # Antes de importar database: lido na importação, aqui e nos workers
+    os.environ["DB_INIT_ON_STARTUP"] = "false"
+    from database import async_engine, engine, init_db
+    import models
+
+    # Tabelas registradas no metadata antes do create_all (os workers as
+    # registram ao importar as rotas)
+    for module in pkgutil.iter_modules(models.__path__):
+        importlib.import_module(f"models.{module.name}")
+    init_db()
+    # Cada worker abre as próprias conexões
+    engine.dispose()
+    async_engine.sync_engine.dispose()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Servidor de produção da API")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="Processos do uvicorn (padrão: WEB_CONCURRENCY ou núcleos)")
+    parser.add_argument("--backlog", type=int, default=int(os.getenv("SERVER_BACKLOG", "2048")),
+                        help="Fila de conexões pendentes do socket")
+    parser.add_argument("--keep-alive", type=int, default=int(os.getenv("KEEPALIVE_TIMEOUT", "15")),
+                        help="Segundos que uma conexão ociosa é mantida (acima do timeout do balanceador)")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+                        help="Espera pelas requisições em andamento no desligamento")
+    parser.add_argument("--limit-concurrency", type=int, default=int(os.getenv("LIMIT_CONCURRENCY", "0")) or None,
+                        help="Conexões simultâneas por worker antes de responder 503")
+    parser.add_argument("--max-requests", type=int, default=int(os.getenv("MAX_REQUESTS", "0")) or None,
+                        help="Reinicia o worker após N requisições (vazamentos de memória)")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    parser.add_argument("--skip-init", action="store_true", help="Não executar init_db antes dos workers")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    configure_workers(args.workers)
+    if not args.skip_init:
+        prepare_database()
+    else:
+        os.environ["DB_INIT_ON_STARTUP"] = "false"
+
+    options = server_options(args)
+    logger.info(
+        f"🚀 {options['workers']} worker(s), loop={options['loop']}, http={options['http']}, "
+        f"{options['host']}:{options['port']}"
+    )
+    # Caminho de importação do app para os workers (iniciados por spawn)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    uvicorn.run("main:app", **options)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Agrupamento de leituras idênticas simultâneas (single-flight).
+
+Chamadas concorrentes com a mesma chave compartilham uma única execução: a
+primeira (líder) executa a função e as demais aguardam e recebem o mesmo
+resultado ou a mesma exceção. Não é um cache: terminada a execução, a
+chave é liberada e a próxima chamada executa de novo.
+
+`do` atende handlers assíncronos (no event loop); `do_sync` atende código
+síncrono em threads do threadpool. `do_sync` bloqueia a thread enquanto
+aguarda, então nunca deve ser chamado no event loop (nem dentro de
+`session.run_sync`, que roda na mesma thread).
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, TypeVar
+
+T = TypeVar("T")
+
+# Grupos criados, exportados em /metrics
+FLIGHT_GROUPS: List["SingleFlight"] = []
+
+
+class _SyncCall:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+class SingleFlight:
+    """Grupo de chamadas agrupadas por chave, com contadores de uso"""
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self._sync_calls: Dict[Hashable, _SyncCall] = {}
+        self._lock = threading.Lock()
+        # Execuções reais e chamadas atendidas pela execução de outra
+        self.leaders = 0
+        self.shared = 0
+        FLIGHT_GROUPS.append(self)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            flight = self._flights.get(key)
+            if flight is None:
+                break
+            try:
+                result = await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                # Líder cancelado (ex.: cliente desconectou): tenta de novo
+                if flight.cancelled():
+                    continue
+                raise
+            self.shared += 1
+            return result
+
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        self.leaders += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Marca a exceção como lida quando ninguém mais aguarda
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+
+    def do_sync(self, key: Hashable, fn: Callable[..., T], *args: Any) -> T:
+        with self._lock:
+            call = self._sync_calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._sync_calls[key] = _SyncCall()
+                self.leaders += 1
+
+        if not leader:
+            call.done.wait()
+            with self._lock:
+                self.shared += 1
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._sync_calls.get(key) is call:
+                    del self._sync_calls[key]
+            call.done.set()
+
+    def invalidate(self) -> None:
+        """Chamadas seguintes não aproveitam execuções já em andamento
+        (usado após escritas, que elas podem não ter visto)"""
+        self._flights.clear()
+        with self._lock:
+            self._sync_calls.clear()
+
+    def snapshot(self) -> Dict[str, int]:
+        return {"leaders": self.leaders, "shared": self.shared}
+
+
+def invalidate_flights() -> None:
+    """Invalida as execuções em andamento de todos os grupos"""
+    for group in FLIGHT_GROUPS:
+        group.invalidate()
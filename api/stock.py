@@ -0,0 +1,268 @@
+"""
+Movimentações de estoque.
+
+O estoque (products.qtt) é alterado só por UPDATE atômico no banco
+(`qtt = coalesce(qtt, 0) + delta`), nunca por leitura seguida de escrita:
+movimentações simultâneas do mesmo produto não se perdem. Um lote vira um
+único UPDATE (CASE por produto) e um único INSERT em várias linhas no
+histórico `stock_movements`, na mesma transação.
+
+Para feeds de alta frequência (ex.: caixas), o StockAggregator soma em
+memória as movimentações de cada produto e grava uma linha por produto a
+cada STOCK_AGGREGATE_INTERVAL segundos (0 desativa). Cada worker tem o
+próprio agregador; como a gravação é atômica, isso não afeta o resultado.
+"""
+from dotenv import load_dotenv
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, func, insert, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from barcode import try_normalize_barcode
+from cache import barcode_cache, list_cache
+from database import async_session_maker
+from models.product import Product
+from models.stock_movement import MAX_STOCK_BATCH, StockMovement
+from single_flight import invalidate_flights
+
+# Carregar variáveis de ambiente
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Permite estoque negativo (venda acima do saldo registrado)
+STOCK_ALLOW_NEGATIVE = os.getenv("STOCK_ALLOW_NEGATIVE", "false").lower() in ("1", "true", "yes")
+
+# Intervalo (segundos) entre gravações do agregador; 0 desativa
+STOCK_AGGREGATE_INTERVAL = float(os.getenv("STOCK_AGGREGATE_INTERVAL", "0"))
+
+# Movimentações pendentes que antecipam a gravação do agregador
+STOCK_AGGREGATE_MAX_PENDING = int(os.getenv("STOCK_AGGREGATE_MAX_PENDING", "10000"))
+
+
+def _product_list(product_ids: Iterable[int]) -> str:
+    return ", ".join(str(product_id) for product_id in product_ids)
+
+
+async def apply_movements(
+    session: AsyncSession,
+    movements: Sequence[Dict[str, Any]],
+    allow_negative: bool = STOCK_ALLOW_NEGATIVE,
+    skip_missing: bool = False
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Aplica movimentações (product_id, delta, reason, reference e,
+    opcionalmente, movements) na transação da sessão, sem commit.
+
+    Retorna as linhas gravadas no histórico, na ordem recebida, e os códigos
+    de barras dos produtos alterados (para invalidar caches após o commit).
+
+    Raises:
+        HTTPException: 404 para produtos inexistentes (exceto com
+            skip_missing) e 409 para estoque insuficiente; a transação
+            deve ser desfeita pelo chamador
+    """
+    totals: Dict[int, int] = {}
+    for movement in movements:
+        totals[movement["product_id"]] = totals.get(movement["product_id"], 0) + movement["delta"]
+    product_ids = sorted(totals)
+
+    now = datetime.now(timezone.utc)
+    new_qtt = func.coalesce(Product.qtt, 0) + case(totals, value=Product.id)
+    statement = (
+        update(Product)
+        .where(Product.id.in_(product_ids))
+        .values(qtt=new_qtt, updated_at=now)
+        .returning(Product.id, Product.qtt, Product.barcode)
+        .execution_options(synchronize_session=False)
+    )
+    if not allow_negative:
+        statement = statement.where(new_qtt >= 0)
+    updated = {row.id: row for row in (await session.exec(statement)).all()}
+
+    rejected = [product_id for product_id in product_ids if product_id not in updated]
+    if rejected:
+        existing = set((await session.exec(select(Product.id).where(Product.id.in_(rejected)))).all())
+        insufficient = [product_id for product_id in rejected if product_id in existing]
+        missing = [product_id for product_id in rejected if product_id not in existing]
+        if insufficient:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Insufficient stock for products: {_product_list(insufficient)}"
+            )
+        if not skip_missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Products not found: {_product_list(missing)}"
+            )
+
+    # Saldo após cada movimentação: o final do produto menos as posteriores
+    remaining = {product_id: row.qtt for product_id, row in updated.items()}
+    entries = []
+    for movement in reversed(movements):
+        product_id = movement["product_id"]
+        if product_id not in remaining:
+            continue
+        entries.append({
+            "product_id": product_id,
+            "delta": movement["delta"],
+            "qtt_after": remaining[product_id],
+            "movements": movement.get("movements", 1),
+            "reason": movement.get("reason"),
+            "reference": movement.get("reference"),
+            "created_at": now,
+        })
+        remaining[product_id] -= movement["delta"]
+    entries.reverse()
+
+    if entries:
+        ids = (await session.exec(
+            insert(StockMovement).returning(StockMovement.id, sort_by_parameter_order=True),
+            params=entries
+        )).scalars().all()
+        entries = [{"id": movement_id, **entry} for entry, movement_id in zip(entries, ids)]
+
+    return entries, [row.barcode for row in updated.values() if row.barcode]
+
+
+def invalidate_stock_caches(barcodes: Iterable[str]) -> None:
+    """Limpa as respostas em cache dos produtos alterados"""
+    keys = [try_normalize_barcode(barcode) for barcode in barcodes]
+    barcode_cache.invalidate(*[key for key in keys if key])
+    invalidate_flights()
+    list_cache.bump("products")
+
+
+async def record_movements(
+    session: AsyncSession,
+    movements: Sequence[Dict[str, Any]],
+    **options: Any
+) -> List[Dict[str, Any]]:
+    """Aplica as movimentações, faz o commit e invalida os caches"""
+    entries, barcodes = await apply_movements(session, movements, **options)
+    await session.commit()
+    invalidate_stock_caches(barcodes)
+    return entries
+
+
+async def missing_products(session: AsyncSession, product_ids: Iterable[int]) -> List[int]:
+    """Produtos da lista que não existem"""
+    wanted = set(product_ids)
+    existing = set((await session.exec(select(Product.id).where(Product.id.in_(wanted)))).all())
+    return sorted(wanted - existing)
+
+
+class StockAggregator:
+    """
+    Soma em memória as movimentações por (produto, motivo) e as grava em
+    lote periodicamente.
+
+    As movimentações aceitas ainda não estão no banco: um processo encerrado
+    sem o desligamento normal perde as pendentes. O saldo não é verificado
+    (as saídas já aconteceram); produtos excluídos antes da gravação são
+    ignorados. A referência de cada movimentação não é mantida.
+    """
+    def __init__(self, interval: float = STOCK_AGGREGATE_INTERVAL, max_pending: int = STOCK_AGGREGATE_MAX_PENDING):
+        self.interval = interval
+        self.max_pending = max_pending
+        # (produto, motivo) -> [soma dos deltas, movimentações]
+        self._pending: Dict[Tuple[int, Optional[str]], List[int]] = {}
+        self._pending_movements = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.flushes = 0
+        self.flushed_movements = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending_movements
+
+    def add(self, movements: Iterable[Dict[str, Any]]) -> int:
+        count = 0
+        for movement in movements:
+            entry = self._pending.setdefault((movement["product_id"], movement.get("reason")), [0, 0])
+            entry[0] += movement["delta"]
+            entry[1] += movement.get("movements", 1)
+            count += movement.get("movements", 1)
+        self._pending_movements += count
+        if self._pending_movements >= self.max_pending and self._wake is not None:
+            self._wake.set()
+        return count
+
+    async def flush(self) -> int:
+        """Grava as movimentações pendentes (um lote por transação); em caso
+        de erro, as não gravadas voltam para a fila"""
+        pending, self._pending = self._pending, {}
+        self._pending_movements = 0
+        items = list(pending.items())
+        written = 0
+        for start in range(0, len(items), MAX_STOCK_BATCH):
+            chunk = items[start:start + MAX_STOCK_BATCH]
+            movements = [
+                {"product_id": product_id, "reason": reason, "delta": delta, "movements": count}
+                for (product_id, reason), (delta, count) in chunk
+            ]
+            try:
+                async with async_session_maker() as session:
+                    await record_movements(session, movements, allow_negative=True, skip_missing=True)
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"❌ Erro ao gravar movimentações de estoque: {str(e)}")
+                self.add(movements + [
+                    {"product_id": product_id, "reason": reason, "delta": delta, "movements": count}
+                    for (product_id, reason), (delta, count) in items[start + MAX_STOCK_BATCH:]
+                ])
+                break
+            written += sum(count for _, (_, count) in chunk)
+        if written:
+            self.flushes += 1
+            self.flushed_movements += written
+        return written
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._stopping = False
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Interrompe o agendamento e grava o que estiver pendente"""
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "pending": self.pending,
+            "flushes": self.flushes,
+            "flushed_movements": self.flushed_movements,
+            "failures": self.failures,
+        }
+
+
+stock_aggregator = StockAggregator()
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Banco SQLite temporário, definido antes de importar os módulos da API
+# (database.py lê DATABASE_URL na importação)
+_db_dir = tempfile.mkdtemp(prefix="openbarcode-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("LOG_REQUESTS", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,22 @@
+from cache import MISSING, TTLCache
+
+
+def test_set_skips_value_read_before_invalidation():
+    cache = TTLCache(maxsize=10, ttl=60)
+    generation = cache.generation
+    # Escrita concluída enquanto a leitura estava em andamento
+    cache.invalidate("7891000100103")
+    cache.set("7891000100103", b"stale", generation=generation)
+    assert cache.get("7891000100103") is MISSING
+
+    generation = cache.generation
+    cache.set("7891000100103", b"fresh", generation=generation)
+    assert cache.get("7891000100103") == b"fresh"
+
+
+def test_clear_changes_generation():
+    cache = TTLCache(maxsize=10, ttl=60)
+    generation = cache.generation
+    cache.clear()
+    cache.set("key", None, generation=generation)
+    assert cache.get("key") is MISSING
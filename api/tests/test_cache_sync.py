@@ -0,0 +1,69 @@
+"""
+Sincronização dos caches de produtos entre dois "workers" (instâncias)
+sobre o mesmo banco, e a configuração do serve.py para vários workers.
+"""
+import asyncio
+
+import serve
+from cache import MISSING, barcode_cache
+from cache_sync import ProductCacheSync
+from database import async_engine, async_session_maker, create_db_and_tables
+
+
+def test_write_in_other_worker_clears_product_caches():
+    async def run():
+        writer = ProductCacheSync(enabled=True, poll_interval=0.01)
+        reader = ProductCacheSync(enabled=True, poll_interval=0.01)
+        async with async_session_maker() as session:
+            await writer.warm(session)
+            await reader.warm(session)
+
+        barcode_cache.set("7891000000001", b"{}")
+        async with async_session_maker() as session:
+            await reader.ensure_fresh(session)
+        unchanged = barcode_cache.get("7891000000001")
+
+        async with async_session_maker() as session:
+            await writer.mark_changed(session)
+            await session.commit()
+        await asyncio.sleep(0.05)
+        async with async_session_maker() as session:
+            await reader.ensure_fresh(session)
+        await async_engine.dispose()
+        return unchanged, barcode_cache.get("7891000000001"), reader.clears
+
+    create_db_and_tables()
+    unchanged, after_write, clears = asyncio.run(run())
+    assert unchanged == b"{}"
+    assert after_write is MISSING
+    assert clears == 1
+
+
+def test_disabled_sync_does_not_bump():
+    async def run():
+        async with async_session_maker() as session:
+            enabled = ProductCacheSync(enabled=True)
+            await enabled.warm(session)
+            before = await enabled._read_versions(session)
+            await ProductCacheSync(enabled=False).mark_changed(session)
+            await session.commit()
+            after = await enabled._read_versions(session)
+        await async_engine.dispose()
+        return before, after
+
+    create_db_and_tables()
+    before, after = asyncio.run(run())
+    assert before == after
+
+
+def test_serve_configures_caches_for_several_workers(monkeypatch):
+    monkeypatch.setenv("REFERENCE_CACHE_BACKEND", "local")
+    monkeypatch.setenv("PRODUCT_CACHE_SYNC", "false")
+
+    serve.configure_workers(1)
+    assert serve.os.environ["REFERENCE_CACHE_BACKEND"] == "local"
+    assert serve.os.environ["PRODUCT_CACHE_SYNC"] == "false"
+
+    serve.configure_workers(4)
+    assert serve.os.environ["REFERENCE_CACHE_BACKEND"] == "database"
+    assert serve.os.environ["PRODUCT_CACHE_SYNC"] == "true"
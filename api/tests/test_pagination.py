@@ -0,0 +1,13 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from pagination import encode_cursor
+
+
+@pytest.mark.parametrize("position", [{"id": "x"}, {"id": None}, {"id": [1]}, {"rank": 1}])
+def test_forged_cursor_is_rejected(position):
+    with TestClient(main.app) as client:
+        response = client.get("/api/v1/brands/", params={"cursor": encode_cursor(position)})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,102 @@
+"""
+Regressão de N+1: a quantidade de queries das leituras em lote de produtos
+não pode crescer com o tamanho da página. Uma leitura condicional que
+resulta em 304 não serializa o produto.
+"""
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import main
+from projection import ProductProjection
+from database import async_engine
+
+PRODUCTS = 60
+
+
+def _ean13(prefix: str) -> str:
+    total = sum(int(digit) * (3 if index % 2 else 1) for index, digit in enumerate(prefix))
+    return prefix + str((10 - total % 10) % 10)
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _count)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", _count)
+
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(main.app) as client:
+        brands = [client.post("/api/v1/brands/", json={"name": f"Brand {index}"}).json()["id"] for index in range(3)]
+        categories = [
+            client.post("/api/v1/categories/", json={"name": f"Category {index}"}).json()["id"]
+            for index in range(4)
+        ]
+        for index in range(PRODUCTS):
+            response = client.post("/api/v1/products/", json={
+                "name": f"Product {index}",
+                "barcode": _ean13(f"789100{index:06d}"),
+                "brand_id": brands[index % len(brands)],
+                "category_ids": categories[:index % len(categories) + 1],
+            })
+            assert response.status_code == 201, response.text
+        yield client
+
+
+def _queries(client: TestClient, method: str, url: str, **kwargs) -> int:
+    with count_queries() as statements:
+        response = client.request(method, url, **kwargs)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+@pytest.mark.parametrize("params", ["", "&fields=name,barcode", "&expand=brand,categories"])
+def test_list_queries_do_not_grow_with_page_size(client, params):
+    small = _queries(client, "GET", f"/api/v1/products/?limit=5{params}")
+    large = _queries(client, "GET", f"/api/v1/products/?limit=50{params}")
+    assert large == small
+
+
+def test_search_queries_do_not_grow_with_page_size(client):
+    # A primeira busca monta o índice em memória (fora do SQLite)
+    _queries(client, "GET", "/api/v1/products/search/?name=warmup")
+    small = _queries(client, "GET", "/api/v1/products/search/?name=product&limit=5")
+    large = _queries(client, "GET", "/api/v1/products/search/?name=product&limit=50")
+    assert large == small
+
+
+def test_brand_and_category_queries_do_not_grow_with_result_size(client):
+    small = _queries(client, "GET", "/api/v1/products/by-category/4")
+    large = _queries(client, "GET", "/api/v1/products/by-category/1")
+    assert large == small
+    assert _queries(client, "GET", "/api/v1/products/by-brand/1") == small
+
+
+def test_barcode_batch_queries_do_not_grow_with_batch_size(client):
+    codes = [_ean13(f"789100{index:06d}") for index in range(PRODUCTS)]
+    small = _queries(client, "POST", "/api/v1/products/barcodes:batch", json={"barcodes": codes[:5]})
+    large = _queries(client, "POST", "/api/v1/products/barcodes:batch", json={"barcodes": codes[5:55]})
+    assert large == small
+
+
+def test_not_modified_skips_serialization(client, monkeypatch):
+    response = client.get("/api/v1/products/1")
+    assert response.status_code == 200
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("produto serializado em uma resposta 304")
+
+    monkeypatch.setattr(ProductProjection, "payloads", _fail)
+    response = client.get("/api/v1/products/1", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 304
@@ -0,0 +1,81 @@
+"""
+Cache de referência com dois "workers" (instâncias) sobre o mesmo banco:
+uma escrita feita por um deles precisa chegar ao outro.
+"""
+import asyncio
+
+from database import async_engine, async_session_maker, create_db_and_tables
+from models.brand import Brand
+from reference_cache import DatabaseVersionBackend, LocalVersionBackend, ReferenceCache
+
+
+def _rename_elsewhere(writer: ReferenceCache, brand_id: int, name: str):
+    async def rename():
+        async with async_session_maker() as session:
+            brand = await session.get(Brand, brand_id)
+            brand.name = name
+            session.add(brand)
+            await writer.mark_changed(session)
+            await session.commit()
+    return rename()
+
+
+def _scenario(backend_factory) -> str:
+    async def run() -> str:
+        async with async_session_maker() as session:
+            brand = Brand(name="Reference Cache Brand")
+            session.add(brand)
+            await session.commit()
+            brand_id = brand.id
+
+        writer, reader = ReferenceCache(backend_factory()), ReferenceCache(backend_factory())
+        async with async_session_maker() as session:
+            await writer.warm(session)
+            await reader.warm(session)
+
+        await _rename_elsewhere(writer, brand_id, "Renamed Reference Cache Brand")
+        await asyncio.sleep(0.05)
+
+        async with async_session_maker() as session:
+            await reader.resolve(session, brand_ids=[brand_id])
+            name = reader.brand(brand_id).name
+            await session.delete(await session.get(Brand, brand_id))
+            await session.commit()
+        # Conexões do pool pertencem a este event loop
+        await async_engine.dispose()
+        return name
+
+    create_db_and_tables()
+    return asyncio.run(run())
+
+
+def test_database_backend_sees_other_workers_writes():
+    assert _scenario(lambda: DatabaseVersionBackend(poll_interval=0.01)) == "Renamed Reference Cache Brand"
+
+
+def test_local_backend_refreshes_after_interval():
+    assert _scenario(lambda: LocalVersionBackend(poll_interval=0.01)) == "Renamed Reference Cache Brand"
+
+
+def test_unknown_ids_are_loaded_by_primary_key():
+    async def run():
+        cache = ReferenceCache(DatabaseVersionBackend(poll_interval=60))
+        async with async_session_maker() as session:
+            await cache.warm(session)
+            loads = cache.loads
+            # Criada sem mark_changed: o polling não a percebe
+            brand = Brand(name="Brand Created Elsewhere")
+            session.add(brand)
+            await session.commit()
+            brand_id = brand.id
+
+            await cache.resolve(session, brand_ids=[999999], category_ids=[999999])
+            await cache.resolve(session, brand_ids=[brand_id])
+            found = cache.brand(brand_id).name
+            await session.delete(await session.get(Brand, brand_id))
+            await session.commit()
+        await async_engine.dispose()
+        return cache.loads - loads, found, cache.brand(999999)
+
+    create_db_and_tables()
+    assert asyncio.run(run()) == (0, "Brand Created Elsewhere", None)
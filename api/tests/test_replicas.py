@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from replicas import STICKY_COOKIE, ReadYourWritesMiddleware, ReplicaRouter
+
+
+async def _ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _call(router: ReplicaRouter, method: str):
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": method, "client": ("10.0.0.1", 1234)}
+    asyncio.run(ReadYourWritesMiddleware(_ok, router)(scope, None, send))
+    return dict(messages[0]["headers"])
+
+
+@pytest.mark.parametrize("method", ["GET", "HEAD", "OPTIONS"])
+def test_non_write_methods_do_not_stick_to_primary(method):
+    router = ReplicaRouter([object()])
+    headers = _call(router, method)
+    assert b"set-cookie" not in headers
+    assert not router.is_sticky("10.0.0.1")
+
+
+@pytest.mark.parametrize("method", ["POST", "PUT", "PATCH", "DELETE"])
+def test_writes_stick_to_primary(method):
+    router = ReplicaRouter([object()])
+    headers = _call(router, method)
+    assert headers[b"set-cookie"].startswith(STICKY_COOKIE.encode())
+    assert router.is_sticky("10.0.0.1")
@@ -0,0 +1,100 @@
+"""
+Leitura e redimensionamento de imagens com Pillow.
+
+Funções puras (bytes -> bytes), executadas nos processos do pool de
+image_pipeline; por isso este módulo não importa nada da aplicação.
+"""
+import io
+from typing import Dict, Sequence, Tuple
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Formatos aceitos no upload (nome do Pillow -> extensão)
+SUPPORTED_FORMATS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+
+# Formatos gerados para cada tamanho (extensão -> nome do Pillow)
+OUTPUT_FORMATS = {"webp": "WEBP", "jpg": "JPEG"}
+
+CONTENT_TYPES = {"jpg": "image/jpeg", "png": "image/png", "webp": "image/webp"}
+
+
+class InvalidImageError(ValueError):
+    """Arquivo que não é uma imagem suportada"""
+
+
+def inspect_image(data: bytes, max_pixels: int) -> Tuple[str, int, int]:
+    """
+    Valida a imagem enviada sem decodificá-la por inteiro.
+
+    Returns:
+        Tuple: Extensão do formato, largura e altura
+
+    Raises:
+        InvalidImageError: Formato não suportado, arquivo corrompido ou
+            imagem maior que `max_pixels`
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image_format = image.format
+            width, height = image.size
+            image.verify()
+    except UnidentifiedImageError:
+        raise InvalidImageError("Invalid image file")
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise InvalidImageError(f"Invalid image: {e}")
+
+    if image_format not in SUPPORTED_FORMATS:
+        raise InvalidImageError(f"Unsupported image format: {image_format}")
+    if width * height > max_pixels:
+        raise InvalidImageError(f"Image too large: {width}x{height}")
+    return SUPPORTED_FORMATS[image_format], width, height
+
+
+def render_variants(
+    data: bytes,
+    sizes: Sequence[int],
+    formats: Sequence[str],
+    quality: int
+) -> Dict[str, bytes]:
+    """
+    Gera as miniaturas da imagem original.
+
+    Cada tamanho é o maior lado em pixels (a proporção é mantida e imagens
+    menores não são ampliadas). Retorna {"<tamanho>.<extensão>": bytes}.
+    """
+    with Image.open(io.BytesIO(data)) as original:
+        # Aplica a rotação do EXIF, que é descartado nas miniaturas
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+
+    variants = {}
+    # Do maior para o menor: cada redução parte da anterior, mais barata
+    current = image
+    for size in sorted(set(sizes), reverse=True):
+        current = current.copy()
+        current.thumbnail((size, size), Image.Resampling.LANCZOS)
+        for extension in formats:
+            output_format = OUTPUT_FORMATS[extension]
+            frame = current
+            if output_format == "JPEG":
+                # JPEG não tem transparência: fundo branco
+                if has_alpha:
+                    background = Image.new("RGB", frame.size, (255, 255, 255))
+                    background.paste(frame, mask=frame.convert("RGBA").getchannel("A"))
+                    frame = background
+                elif frame.mode != "RGB":
+                    frame = frame.convert("RGB")
+            elif frame.mode not in ("RGB", "RGBA"):
+                frame = frame.convert("RGBA" if has_alpha else "RGB")
+
+            buffer = io.BytesIO()
+            options = {"quality": quality}
+            if output_format == "JPEG":
+                options.update(optimize=True, progressive=True)
+            else:
+                options["method"] = 4
+            frame.save(buffer, output_format, **options)
+            variants[f"{size}.{extension}"] = buffer.getvalue()
+    return variants
@@ -53,15 +53,23 @@ export default function ScanScreen() {
     setProduct(null);
 
     try {
-      // A rota na API é /api/v1/products/search/?barcode=...
-      const response = await fetch(`${API_URL}/api/v1/products/search/?barcode=${code}`);
-      
-      if (!response.ok) {
+      // Busca exata por EAN/UPC: /api/v1/products/barcode/{code}
+      let data: Product[] = [];
+      const response = await fetch(`${API_URL}/api/v1/products/barcode/${encodeURIComponent(code)}`);
+
+      if (response.ok) {
+        data = [await response.json()];
+      } else if (response.status === 422) {
+        // Código fora do padrão EAN/UPC: usa a busca parcial
+        const searchResponse = await fetch(`${API_URL}/api/v1/products/search/?barcode=${encodeURIComponent(code)}`);
+        if (!searchResponse.ok) {
+          throw new Error('Falha ao buscar o produto.');
+        }
+        data = await searchResponse.json();
+      } else if (response.status !== 404) {
         throw new Error('Falha ao buscar o produto.');
       }
 
-      const data: Product[] = await response.json();
-
       if (data.length > 0) {
         setProduct(data[0]);
         setProductFound(true);
@@ -2,6 +2,7 @@ import { View, StyleSheet, TouchableOpacity } from 'react-native';
 import { Image } from 'expo-image';
 import { useRouter } from 'expo-router';
 import { Product } from '@/types';
+import { API_URL } from '@/constants/Api';
 import { ThemedText } from '@/components/ThemedText';
 import { ThemedView } from '@/components/ThemedView';
 
@@ -9,6 +10,23 @@ interface ProductCardProps {
   product: Product;
 }
 
+// Menor miniatura com pelo menos 160px (imagem de 80pt em telas 2x), em WebP
+// quando disponível; sem galeria, usa o campo livre `images`
+function thumbnailUrl(product: Product): string | null {
+  const thumbnails = product.gallery?.[0]?.thumbnails;
+  if (!thumbnails) {
+    return product.images;
+  }
+  const sizes = Object.keys(thumbnails).map(Number).sort((a, b) => a - b);
+  const size = sizes.find((value) => value >= 160) ?? sizes[sizes.length - 1];
+  const formats = thumbnails[String(size)];
+  const url = formats?.webp ?? formats?.jpg;
+  if (!url) {
+    return product.images;
+  }
+  return url.startsWith('/') ? `${API_URL}${url}` : url;
+}
+
 export function ProductCard({ product }: ProductCardProps) {
   const router = useRouter();
 
@@ -16,12 +34,14 @@ export function ProductCard({ product }: ProductCardProps) {
     router.push(`/product/${product.id}`);
   };
 
+  const imageUrl = thumbnailUrl(product);
+
   return (
     <TouchableOpacity onPress={handlePress}>
       <ThemedView style={styles.card}>
-        {product.images ? (
+        {imageUrl ? (
           <Image
-            source={{ uri: product.images }}
+            source={{ uri: imageUrl }}
             style={styles.image}
             contentFit="cover"
             transition={300}
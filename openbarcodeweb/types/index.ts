@@ -9,6 +9,16 @@ export interface Category {
   name: string;
 }
 
+export interface ProductImage {
+  id: number;
+  status: 'pending' | 'ready' | 'failed';
+  width: number;
+  height: number;
+  original: string;
+  // URLs por tamanho (maior lado, em pixels) e formato: { "160": { webp, jpg } }
+  thumbnails: Record<string, Record<string, string>>;
+}
+
 export interface Product {
   id: number;
   name: string;
@@ -24,4 +34,5 @@ export interface Product {
   updated_at: string;
   brand: Brand | null;
   categories: Category[];
+  gallery: ProductImage[];
 }